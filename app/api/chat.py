@@ -2,12 +2,17 @@
 import uuid
 import time
 
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Response
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 
+from app.core import conversation_store, entity_memory, load_shed, rate_limit, tracing, traffic
 from app.core.logging_config import get_logger
 from app.schema.chat_schema import ChatRequest, ChatResponse
 from app.core.llm import LLMClient
+from app.core.deadline import Deadline
+from app.core.metrics import CHAT_IN_FLIGHT, CHAT_LATENCY
+from app.config.config import get_settings
 from app.schema.Auth import AuthContext
 
 router = APIRouter()
@@ -50,13 +55,72 @@ def _build_auth_context(
 
 
 logger = get_logger("chat")
+settings = get_settings()
+
+_RATE_LIMIT_MESSAGES = {
+    "requests": "تعداد درخواست‌های شما بیش از حد مجاز است. لطفاً کمی بعد دوباره تلاش کنید.",
+    "concurrency": "درخواست قبلی شما هنوز در حال پردازش است. لطفاً تا پایان آن صبر کنید.",
+    "llm_tokens": "سهمیه استفاده شما از دستیار در این بازه زمانی به پایان رسیده است. لطفاً بعداً تلاش کنید.",
+}
+
+
+def _chat_turn(
+    llm: LLMClient,
+    request: ChatRequest,
+    auth_context: AuthContext,
+    conversation_id: str,
+    deadline: Deadline,
+) -> tuple[str, list]:
+    """
+    One conversation turn (blocking — runs in the threadpool).
+
+    A client that sends conversation_history keeps full control of the context;
+    otherwise the history is loaded from the conversation store. Either way the
+    turn is appended to the store, so the next turn can land on any worker. The
+    conversation's entity memory (current unit, last date range) is loaded from
+    and saved to the store's state.
+    """
+    store = conversation_store.get_store()
+    history = request.conversation_history
+    conversation = conversation_store.Conversation()
+    if request.conversation_id and (history is None or settings.entity_memory_enabled):
+        with tracing.span("conversation_load"):
+            conversation = store.load(auth_context.user_id, conversation_id)
+    if history is None:
+        history = conversation.history
+    memory = entity_memory.EntityMemory.from_state(conversation.state)
+
+    with entity_memory.activate(memory):
+        response_message, tool_calls = llm.chat(
+            user_message=request.message,
+            auth_context=auth_context,
+            conversation_history=history or [],
+            deadline=deadline,
+        )
+
+    store.save_turn(auth_context.user_id, conversation_id, [
+        {"role": "user", "content": request.message},
+        {"role": "assistant", "content": response_message},
+    ], state={**conversation.state, **memory.to_state()} if memory.changed else None)
+    return response_message, tool_calls
+
+
+def _request_deadline(x_request_timeout: Optional[float]) -> Deadline:
+    """Per-request deadline: X-Request-Timeout header if given (capped), else Settings."""
+    budget = settings.request_timeout
+    if x_request_timeout is not None and x_request_timeout > 0:
+        budget = min(x_request_timeout, settings.request_timeout_max)
+    return Deadline(budget)
 
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(
     request: ChatRequest,
+    response: Response,
     authorization: Optional[str] = Header(default=None),
     x_user_id: Optional[str] = Header(default=None),
+    x_request_timeout: Optional[float] = Header(default=None),
+    traceparent: Optional[str] = Header(default=None),
     # x_tenant_id is disabled — backend does not support multi-tenancy
     # x_tenant_id: Optional[str] = Header(default=None),
 ):
@@ -67,32 +131,88 @@ async def chat(
     Required headers:
       Authorization: Bearer <token>
       X-User-Id:    <user id>
-    """
-    start = time.time()
-    logger.info(f"REQUEST  conv={request.conversation_id} user={x_user_id} msg_len={len(request.message)}")
-    try:
-        auth_context = _build_auth_context(authorization, x_user_id)
 
-        llm = LLMClient()
+    Optional headers:
+      X-Request-Timeout: <seconds>  end-to-end budget (defaults to settings.request_timeout)
+      traceparent:       W3C trace context; the request's trace joins the caller's trace
 
-        response_message, tool_calls = llm.chat(
-            user_message=request.message,
-            auth_context=auth_context,
-            conversation_history=request.conversation_history or [],
-        )
-
-        conversation_id = request.conversation_id or str(uuid.uuid4())
-        elapsed = time.time() - start
-        logger.info(f"RESPONSE conv={conversation_id} tool_calls={len(tool_calls)} elapsed={elapsed:.2f}s")
-        return ChatResponse(
-            message=response_message,
-            conversation_id=conversation_id,
-            tool_calls=tool_calls,
-        )
+    Per-user limits (settings.rate_limit_*) answer 429 with Retry-After; when the
+    worker is at its adaptive concurrency limit and the wait queue is full or the
+    wait times out (settings.load_shed_*), the answer is 503 with Retry-After.
 
-    except HTTPException as e:
-        logger.warning(f"HTTP {e.status_code} conv={request.conversation_id} detail={e.detail}")
-        raise
-    except Exception as e:
-        logger.error(f"UNHANDLED conv={request.conversation_id} error={e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
+    Response headers:
+      Server-Timing: time per phase (llm, tool, prompt_build, ...) and total
+      X-Trace-Id:    id of this request's trace in the trace export
+    """
+    start = time.time()
+    deadline = _request_deadline(x_request_timeout)
+    logger.info(f"REQUEST  conv={request.conversation_id} user={x_user_id} msg_len={len(request.message)}")
+    status = "500"
+    n_tool_calls = 0
+    CHAT_IN_FLIGHT.inc()
+    with tracing.start_trace("chat", traceparent=traceparent, budget_s=deadline.budget) as trace:
+        try:
+            auth_context = _build_auth_context(authorization, x_user_id)
+
+            conversation_id = request.conversation_id or str(uuid.uuid4())
+
+            with rate_limit.limiter.admit(auth_context.user_id) as ticket:
+                try:
+                    async with load_shed.limiter.slot(max_wait=deadline.remaining()) as slot:
+                        llm = LLMClient()
+                        try:
+                            # LLMClient.chat is blocking (OpenAI + requests) — run it off the event loop
+                            # so concurrent chats actually overlap and identical upstream calls can coalesce.
+                            response_message, tool_calls = await run_in_threadpool(
+                                _chat_turn, llm, request, auth_context, conversation_id, deadline,
+                            )
+                        finally:
+                            ticket.charge_tokens(llm.tokens_used)
+                            # out of budget = the last LLM call was skipped or cut short by the deadline
+                            slot.timed_out = deadline.remaining() < settings.llm_min_call_budget
+                except load_shed.Overloaded:
+                    ticket.refund()   # shed before any work — don't count it against the user's rate
+                    raise
+
+            n_tool_calls = len(tool_calls)
+            elapsed = time.time() - start
+            logger.info(f"RESPONSE conv={conversation_id} tool_calls={len(tool_calls)} elapsed={elapsed:.2f}s budget={deadline.budget:.1f}s")
+            status = "200"
+            if trace is not None:
+                trace.root.set("conversation_id", conversation_id)
+                trace.root.set("tool_calls", len(tool_calls))
+                response.headers["Server-Timing"] = trace.server_timing()
+                response.headers["X-Trace-Id"] = trace.trace_id
+            return ChatResponse(
+                message=response_message,
+                conversation_id=conversation_id,
+                tool_calls=tool_calls,
+            )
+
+        except rate_limit.RateLimited as e:
+            status = "429"
+            raise HTTPException(
+                status_code=429,
+                detail=_RATE_LIMIT_MESSAGES.get(e.reason, _RATE_LIMIT_MESSAGES["requests"]),
+                headers={"Retry-After": e.retry_after_header},
+            )
+        except load_shed.Overloaded as e:
+            status = "503"
+            raise HTTPException(
+                status_code=503,
+                detail="سرویس در حال حاضر بیش از ظرفیت مشغول است. لطفاً چند لحظه دیگر دوباره تلاش کنید.",
+                headers={"Retry-After": e.retry_after_header},
+            )
+        except HTTPException as e:
+            status = str(e.status_code)
+            logger.warning(f"HTTP {e.status_code} conv={request.conversation_id} detail={e.detail}")
+            raise
+        except Exception as e:
+            logger.error(f"UNHANDLED conv={request.conversation_id} error={e}", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
+        finally:
+            CHAT_IN_FLIGHT.dec()
+            CHAT_LATENCY.labels(status=status).observe(time.time() - start)
+            traffic.record(request, x_user_id, int(status), (time.time() - start) * 1000, n_tool_calls)
+            if trace is not None:
+                trace.root.set("http.status_code", int(status))
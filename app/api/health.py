@@ -1,8 +1,15 @@
 from fastapi import APIRouter
 from app.schema.chat_schema import HealthResponse
 
-from openai import OpenAI
 from app.config.config import get_settings
+from app.core import upstream
+from app.core import fast_path
+from app.core import answer_cache
+from app.core import health
+from app.core import cache
+from app.core import lanes, load_shed, rate_limit
+from app.core.serialization import ORJSONResponse
+from app.db import session as db_session
 
 router = APIRouter()
 settings = get_settings()
@@ -13,25 +20,52 @@ async def health_check():
     """
     Health check endpoint
 
+    Serves the background checker's cached results (see core/health.py) —
+    no dependency is called on the request path.
+
     Checks:
     - API is running
-    - Database connection
-    - OpenAI API access
-    """
+    - OpenAI API, fleet backend, geocoder and Elasticsearch reachability
+    - Upstream circuit breakers (any open breaker → degraded)
 
-    # Check OpenAI
-    openai_status = "healthy"
-    try:
-        client = OpenAI(
-            api_key=settings.openai_api_key,
-            base_url=settings.openai_api_base
-        )
-        # Quick test call
-        client.models.list()
-    except Exception as e:
-        openai_status = f"unhealthy: {str(e)}"
+    Any probed dependency down → degraded, independent of the readiness list.
+    """
+    health.checker.start()
+    healthy, dependencies = health.checker.healthy()
+    openai = dependencies["openai"]
+    openai_status = "healthy" if openai["status"] in (health.UP, health.DISABLED) else (
+        f"{openai['status']}: {openai['error']}" if openai["error"] else openai["status"]
+    )
 
     return HealthResponse(
-        status="healthy" if openai_status == "healthy" else "degraded",
-        openai=openai_status
+        status="healthy" if healthy and not upstream.any_breaker_open() else "degraded",
+        openai=openai_status,
+        upstream=upstream.stats(),
+        fast_path=fast_path.stats.snapshot(),
+        answer_cache=answer_cache.stats(),
+        caches=cache.stats(),
+        admission={
+            "rate_limit": rate_limit.limiter.stats(),
+            "load_shed": load_shed.limiter.stats(),
+            "lanes": lanes.stats(),
+        },
+        database=db_session.stats(),
+        dependencies=dependencies,
+    )
+
+
+@router.get("/health/live")
+async def liveness():
+    """Liveness: the process serves requests. Never depends on upstreams."""
+    return {"status": "alive", "health_checker": health.checker.alive()}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """Readiness: 200 when every dependency in settings.health_ready_dependencies is up, else 503."""
+    health.checker.start()
+    ready, dependencies = health.checker.ready()
+    return ORJSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "dependencies": dependencies},
     )
@@ -16,6 +16,19 @@ class Settings(BaseSettings):
     postgres_user: str = Field(default="postgres", alias="POSTGRES_USER")
     postgres_password: str = Field(default="", alias="POSTGRES_PASSWORD")
     postgres_db: str = Field(default="postgres", alias="POSTGRES_DB")
+    db_pool_size: int = Field(default=5, description="Connections kept open per engine (sync and async each)")
+    db_max_overflow: int = Field(default=5, description="Extra connections opened under burst, closed when returned")
+    db_pool_timeout: float = Field(default=5.0, description="Seconds to wait for a free pooled connection")
+    db_pool_recycle: int = Field(
+        default=1800, description="Seconds after which a pooled connection is replaced (PgBouncer / LB idle cuts)"
+    )
+    db_statement_timeout: float = Field(
+        default=15.0, description="Per-query Postgres statement_timeout in seconds (never beyond the request deadline)"
+    )
+    sql_stream_batch_size: int = Field(default=500, description="Rows fetched per round trip from the server-side cursor")
+    sql_max_result_bytes: int = Field(
+        default=1_000_000, description="Stop reading a query result once its rows add up to this many JSON bytes"
+    )
 
     # ═══════════════════════════════════════════════════════════
     # Backend API Configuration
@@ -28,6 +41,27 @@ class Settings(BaseSettings):
     backend_api_key: str = Field(default="", description="API key for backend")
     backend_api_token: str = Field(default="", description="API token for backend")
     api_timeout: int = Field(default=10, description="API request timeout in seconds")
+    single_flight_enabled: bool = Field(
+        default=True,
+        description="Share one in-flight upstream GET between identical concurrent requests",
+    )
+    breaker_failure_threshold: int = Field(
+        default=5, description="Consecutive upstream failures that open an endpoint's circuit breaker"
+    )
+    breaker_reset_timeout: float = Field(
+        default=30.0, description="Seconds an open breaker fails fast before letting a probe through"
+    )
+    upstream_max_retries: int = Field(default=2, description="Max retries for idempotent upstream GETs")
+    upstream_retry_base_delay: float = Field(default=0.2, description="Base backoff delay in seconds")
+    upstream_retry_max_delay: float = Field(default=2.0, description="Backoff delay cap in seconds")
+    upstream_retry_budget_ratio: float = Field(
+        default=0.2, description="Retries allowed per upstream request, as a fraction of traffic"
+    )
+    geocoder_url: str = Field(
+        default="https://nominatim.shonizcloud.ir/reverse",
+        description="Nominatim-compatible reverse geocoding endpoint",
+    )
+    geocoder_timeout: float = Field(default=5.0, description="Reverse geocoding timeout in seconds")
 
     # ═══════════════════════════════════════════════════════════
     # Authorization Service (optional)
@@ -46,12 +80,186 @@ class Settings(BaseSettings):
         alias="OPENAI_API_BASE",
     )
     openai_model: str = Field(default="gpt-4o-mini", alias="OPENAI_MODEL")
+    llm_min_call_budget: float = Field(
+        default=2.0,
+        description="Skip an LLM call when less than this many seconds of the request deadline remain",
+    )
+    model_routing_enabled: bool = Field(
+        default=True, description="Route simple lookups to model_fast; everything else uses OPENAI_MODEL"
+    )
+    model_fast: str = Field(default="gpt-4o-mini", description="Cheap, fast tier for single-tool lookups; routing is off while it equals OPENAI_MODEL")
+    model_fast_contexts: list[str] = Field(
+        default=["monitoring", "fleet", "sensor", "driver", "alarm", "history"],
+        description="detect_query_context() results eligible for the fast tier",
+    )
+    model_fast_max_chars: int = Field(
+        default=160, description="Longer messages are treated as multi-step and go to the strong tier"
+    )
+    model_fast_max_tool_calls: int = Field(
+        default=2, description="A fast-tier turn needing more tool calls than this escalates to the strong tier"
+    )
 
     # ═══════════════════════════════════════════════════════════
     # Application Settings
     # ═══════════════════════════════════════════════════════════
     environment: str = Field(default="development")
     debug: bool = Field(default=True)
+    fast_path_enabled: bool = Field(
+        default=True, description="Answer simple location/history lookups without the LLM"
+    )
+    answer_render_modes: dict[str, str] = Field(
+        default={"vehicle_tracking_current": "template", "Unit_history": "template"},
+        description=(
+            "Per-action final answer rendering: 'template' renders successful, unambiguous "
+            "results directly and skips the LLM synthesis call; 'llm' (default) always asks the LLM"
+        ),
+    )
+    answer_cache_enabled: bool = Field(default=True, description="Cache final answers to repeated questions")
+    answer_cache_max_entries: int = Field(default=2000, description="Max cached answers (LRU)")
+    answer_cache_ttls: dict[str, float] = Field(
+        default={
+            "monitoring": 30, "fleet": 30, "sensor": 30, "alarm": 30,
+            "driver": 60, "history": 120, "general": 0,
+        },
+        description="Answer cache TTL in seconds per query context (0 = never cache)",
+    )
+    answer_cache_closed_history_ttl: float = Field(
+        default=3600, description="Answer cache TTL for history answers whose date range has already ended"
+    )
+    request_timeout: float = Field(
+        default=60.0, description="Default end-to-end deadline for /api/chat in seconds"
+    )
+    request_timeout_max: float = Field(
+        default=120.0, description="Upper bound for a client-supplied X-Request-Timeout header"
+    )
+    tracing_enabled: bool = Field(
+        default=True, description="Record per-request spans and send a Server-Timing header"
+    )
+    tracing_exporter: str = Field(
+        default="none", description="Where finished traces go: 'none', 'file' or 'console'"
+    )
+    tracing_file_path: str = Field(
+        default="logs/traces.jsonl", description="OTLP/JSON trace file for the 'file' exporter"
+    )
+    tracing_file_max_bytes: int = Field(
+        default=5_000_000, description="Rotate the trace file once it reaches this size"
+    )
+    tracing_file_backups: int = Field(default=5, description="Rotated trace files to keep")
+    tracing_service_name: str = Field(default="ai-data-chatbot", description="OTel service.name resource attribute")
+    traffic_record_enabled: bool = Field(
+        default=False, description="Append sanitized /api/chat requests to traffic_record_path for replay"
+    )
+    traffic_record_path: str = Field(default="logs/traffic.jsonl", description="JSONL file for recorded traffic")
+    traffic_record_sample_rate: float = Field(default=1.0, description="Fraction of requests recorded (0-1)")
+    traffic_record_history: bool = Field(
+        default=False, description="Also record (digit-masked) conversation history, not just its length"
+    )
+    traffic_record_salt: str = Field(
+        default="", description="Salt for the pseudonymous user/conversation ids in recorded traffic (random per process when empty)"
+    )
+    cassette_mode: str = Field(
+        default="off", description="Upstream + LLM I/O cassettes: 'off', 'record' or 'replay'"
+    )
+    cassette_path: str = Field(default="cassettes/session.jsonl.gz", description="Cassette file (gzip JSONL)")
+    cassette_latency: str = Field(
+        default="original", description="Replay timing: 'original' (recorded durations) or 'zero'"
+    )
+    cache_backend: str = Field(
+        default="memory",
+        description=(
+            "Cache backend: 'memory' (per worker process), 'sqlite' (shared by the workers on a node) "
+            "or 'redis' (shared by every pod)"
+        ),
+    )
+    cache_sqlite_path: str = Field(
+        default="cache/shared_cache.db", description="SQLite cache file; put it on tmpfs (e.g. /dev/shm) in production"
+    )
+    cache_sqlite_busy_timeout: float = Field(
+        default=0.5, description="Seconds a cache write waits for another process's SQLite lock"
+    )
+    redis_url: str = Field(default="redis://localhost:6379/0", description="Redis for CACHE_BACKEND / CONVERSATION_STORE=redis")
+    redis_key_prefix: str = Field(default="aichat:", description="Prefix of every Redis key the app writes")
+    redis_socket_timeout: float = Field(
+        default=0.25, description="Redis connect/read timeout in seconds; a timeout is treated as a cache miss"
+    )
+    redis_max_connections: int = Field(default=64, description="Redis connection pool size per worker process")
+    redis_near_cache_ttl: float = Field(
+        default=2.0, description="Seconds Redis cache reads are kept in process (0 disables the near cache)"
+    )
+    redis_near_cache_max_entries: int = Field(default=2000, description="Max entries in the per-process near cache")
+    conversation_store: str = Field(
+        default="memory", description="Server-side conversation state: 'memory' (per process) or 'redis' (shared)"
+    )
+    conversation_ttl: float = Field(default=6 * 3600, description="Seconds a conversation is kept after its last turn")
+    conversation_max_messages: int = Field(default=20, description="Messages of history kept per conversation")
+    conversation_max_entries: int = Field(default=10000, description="Max conversations kept by the memory store")
+    entity_memory_enabled: bool = Field(
+        default=True, description="Remember the conversation's units and date range for follow-up questions"
+    )
+    entity_memory_max_units: int = Field(default=5, description="Units remembered per conversation")
+    unit_cache_ttl: float = Field(default=600, description="Seconds a resolved unit (name/plate → unitId) is cached")
+    unit_cache_max_entries: int = Field(default=5000, description="Max cached unit resolutions")
+    geocode_cache_ttl: float = Field(default=86400, description="Seconds a reverse-geocoded address is cached")
+    geocode_cache_max_entries: int = Field(default=20000, description="Max cached addresses")
+    geocode_cache_precision: int = Field(
+        default=4, description="Decimals of lat/lon in the geocode cache key (4 ≈ 11 m)"
+    )
+    sql_cache_enabled: bool = Field(default=True, description="Cache SQLTool results by normalized query fingerprint")
+    sql_cache_ttl: float = Field(default=60, description="Seconds a SQL result is cached")
+    sql_cache_table_ttls: dict[str, float] = Field(
+        default={}, description="Per-table TTL overrides; a query gets the smallest TTL of the tables it reads"
+    )
+    sql_cache_volatile_ttl: float = Field(
+        default=5, description="TTL for queries calling now(), random(), ... (0 = never cache them)"
+    )
+    sql_cache_max_entries: int = Field(default=2000, description="Max cached SQL results (LRU)")
+    sql_cache_max_entry_bytes: int = Field(
+        default=262_144, description="Results larger than this many JSON bytes are not cached"
+    )
+    rate_limit_enabled: bool = Field(default=True, description="Per-user admission control for /api/chat")
+    rate_limit_requests_per_minute: float = Field(
+        default=30, description="Sustained /api/chat requests per user per minute, per worker (0 = unlimited)"
+    )
+    rate_limit_burst: int = Field(default=10, description="Requests a user may burst above the sustained rate")
+    rate_limit_max_concurrent: int = Field(
+        default=3, description="Concurrent /api/chat requests per user, per worker (0 = unlimited)"
+    )
+    rate_limit_llm_tokens_per_window: int = Field(
+        default=200_000, description="LLM tokens per user per rate_limit_token_window, per worker (0 = unlimited)"
+    )
+    rate_limit_token_window: float = Field(default=3600, description="LLM token quota window in seconds")
+    load_shed_enabled: bool = Field(default=True, description="Adaptive concurrency limit with 503 load shedding")
+    load_shed_initial_limit: int = Field(default=20, description="Starting concurrency limit per worker")
+    load_shed_min_limit: int = Field(default=4, description="The limit never drops below this")
+    load_shed_max_limit: int = Field(default=200, description="The limit never grows above this")
+    load_shed_max_queue: int = Field(default=50, description="Requests that may wait for a slot; beyond that → 503")
+    load_shed_queue_timeout: float = Field(default=2.0, description="Max seconds a request waits for a slot")
+    load_shed_tolerance: float = Field(
+        default=1.5, description="Upstream latency may grow to this multiple of its baseline before the limit shrinks"
+    )
+    load_shed_smoothing: float = Field(default=0.2, description="Weight of each limit update (0-1)")
+    load_shed_backoff: float = Field(default=0.9, description="Limit multiplier after a request runs out of its budget")
+    lanes_enabled: bool = Field(default=True, description="Share the LLM / backend pools between priority lanes")
+    lane_llm_pool_size: int = Field(default=16, description="Concurrent LLM completions per worker, all lanes")
+    lane_backend_pool_size: int = Field(default=32, description="Concurrent upstream HTTP attempts per worker, all lanes")
+    lane_shares: dict[str, float] = Field(
+        default={"interactive": 1.0, "streaming": 0.75, "batch": 0.5, "background": 0.25},
+        description="Max fraction of each pool a lane may hold; the rest stays free for higher lanes",
+    )
+    lane_max_wait: float = Field(default=30.0, description="Max seconds work without a deadline waits for a slot")
+    health_check_interval: float = Field(default=15.0, description="Seconds between background dependency probes")
+    health_check_timeout: float = Field(default=3.0, description="Timeout of one dependency probe in seconds")
+    health_failure_threshold: int = Field(
+        default=2, description="Consecutive failed probes before a dependency is reported down"
+    )
+    health_stale_after: float = Field(
+        default=60.0, description="Probe results older than this many seconds are reported as unknown"
+    )
+    health_ready_dependencies: list[str] = Field(
+        default=[],
+        description="Dependencies that must be up for /health/ready (openai, backend, geocoder, elasticsearch); "
+                    "empty = ready whenever the process serves, so an upstream outage never drains every pod",
+    )
     max_query_rows: int = Field(default=1000)
     allowed_schemas: list[str] = Field(default=["public"])
 
@@ -71,6 +279,11 @@ class Settings(BaseSettings):
             f"@{self.host}:{self.port}/{self.postgres_db}"
         )
 
+    @computed_field
+    @property
+    def async_database_url(self) -> str:
+        return self.database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
+
     @computed_field
     @property
     def backend_api_url(self) -> str:
@@ -79,7 +292,7 @@ class Settings(BaseSettings):
 
     # ── Validators ───────────────────────────────────────────
 
-    @field_validator("base_url", "openai_api_base", mode="before")
+    @field_validator("base_url", "openai_api_base", "geocoder_url", mode="before")
     @classmethod
     def clean_urls(cls, v):
         if isinstance(v, str):
@@ -112,20 +325,37 @@ Database:
   User:     {self.postgres_user}
   Password: {masked_pw}
   Database: {self.postgres_db}
+  Pool:     {self.db_pool_size} (+{self.db_max_overflow} overflow), statement_timeout {self.db_statement_timeout}s
+  Results:  {self.max_query_rows} rows / {self.sql_max_result_bytes} bytes, {self.sql_stream_batch_size} per batch
+  Cache:    {f'{self.sql_cache_ttl:g}s TTL, {self.sql_cache_max_entries} entries' if self.sql_cache_enabled else 'disabled'}
 
 Backend API:
   URL:      {self.backend_api_url}
   Timeout:  {self.api_timeout}s
+  Breaker:  {self.breaker_failure_threshold} failures / {self.breaker_reset_timeout}s reset
+  Retries:  {self.upstream_max_retries} (budget ratio {self.upstream_retry_budget_ratio})
   Authz:    {self.authz_check_url or '(local policy check)'}
+  Geocoder: {self.geocoder_url}
 
 OpenAI / Metis:
   API Base: {self.openai_api_base}
   API Key:  {masked_key}
-  Model:    {self.openai_model}
+  Model:    {self.openai_model}{f' (fast tier {self.model_fast})' if self.model_routing_enabled and self.model_fast != self.openai_model else ''}
 
 Application:
   Environment: {self.environment}
   Debug:       {self.debug}
+  Deadline:    {self.request_timeout}s (max {self.request_timeout_max}s)
+  Tracing:     {self.tracing_exporter if self.tracing_enabled else 'disabled'}
+  Traffic log: {self.traffic_record_path if self.traffic_record_enabled else 'disabled'}
+  Cache:       {self.cache_backend}{f' ({self.cache_sqlite_path})' if self.cache_backend == 'sqlite' else ''}
+  Redis:       {self.redis_url.split('@')[-1]} (prefix {self.redis_key_prefix!r})
+  Convs:       {self.conversation_store} (last {self.conversation_max_messages} messages, {self.conversation_ttl:.0f}s){', entity memory' if self.entity_memory_enabled else ''}
+  Rate limit:  {f'{self.rate_limit_requests_per_minute:g}/min (burst {self.rate_limit_burst}), {self.rate_limit_max_concurrent} concurrent, {self.rate_limit_llm_tokens_per_window} tokens/{self.rate_limit_token_window:g}s per user' if self.rate_limit_enabled else 'disabled'}
+  Load shed:   {f'limit {self.load_shed_initial_limit} ({self.load_shed_min_limit}-{self.load_shed_max_limit}), queue {self.load_shed_max_queue} / {self.load_shed_queue_timeout}s' if self.load_shed_enabled else 'disabled'}
+  Lanes:       {f'llm {self.lane_llm_pool_size} / backend {self.lane_backend_pool_size} slots, shares ' + ', '.join(f'{k} {v:g}' for k, v in self.lane_shares.items()) if self.lanes_enabled else 'disabled'}
+  Health:      every {self.health_check_interval}s, ready needs {', '.join(self.health_ready_dependencies) or 'the process only'}
+  Cassette:    {self.cassette_mode}{'' if self.cassette_mode == 'off' else f' ({self.cassette_path}, {self.cassette_latency} latency)'}
 ═══════════════════════════════════════════════════════════
 """
 
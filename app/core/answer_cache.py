@@ -0,0 +1,145 @@
+"""
+answer_cache.py
+───────────────
+Final-answer cache for repeated questions.
+
+Key = (user scope, normalized message, query context, conversation-history
+fingerprint, entity-memory fingerprint, Iran-local day):
+  • user scope    — user_id + a hash of the access token: an answer is never served
+                    to a different user, or to the same user under a different token
+  • normalization — whitespace, Persian/ASCII digits, Arabic ي/ك, trailing ?/؟ and case
+  • context       — detect_query_context(), also selects the TTL
+  • history       — follow-ups only hit when the preceding conversation is identical
+  • entities      — "دمای همین ماشین" only hits for the same current unit / date range
+  • day           — relative dates ("دیروز", "امروز") never cross Iran-local midnight
+
+Freshness (settings.answer_cache_ttls, seconds, per context):
+  live data (monitoring / fleet / sensor / alarm) → short TTL (30 s by default)
+  history                                          → longer TTL; a history answer whose
+                                                     every range ended before now gets
+                                                     settings.answer_cache_closed_history_ttl
+  unknown context ("general")                      → not cached by default
+
+Answers built from any failed tool call, or cut short by the deadline, are not cached.
+An entry also keeps the entity memory the turn left behind (units resolved, date
+range used); a hit skips the tools that would have set it, so the caller
+restores it from the entry and the next follow-up sees the same memory.
+Entries live in the "answer" cache (see cache.py — per process, or shared by all
+workers on the node with CACHE_BACKEND=sqlite), bounded by settings.answer_cache_max_entries.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.config import get_settings
+from app.core.cache import get_cache, user_scope
+from app.core.date_utils import iran_day_number
+from app.core.logging_config import get_logger
+from app.core.prompts import detect_query_context
+from app.schema.Auth import AuthContext
+from app.schema.chat_schema import ToolCall
+
+settings = get_settings()
+logger = get_logger("answer_cache")
+
+_NORMALIZE_MAP = str.maketrans({
+    **{fa: str(i) for i, fa in enumerate("۰۱۲۳۴۵۶۷۸۹")},
+    **{ar: str(i) for i, ar in enumerate("٠١٢٣٤٥٦٧٨٩")},
+    "ي": "ی",
+    "ك": "ک",
+    "\u200c": " ",   # ZWNJ
+})
+
+_cache = get_cache("answer", max_entries=settings.answer_cache_max_entries)
+
+
+def normalize_message(message: str) -> str:
+    text = message.translate(_NORMALIZE_MAP).lower()
+    return " ".join(text.split()).rstrip("؟?!. ")
+
+
+def _history_fingerprint(history: Optional[List[Any]]) -> str:
+    if not history:
+        return "-"
+    turns = [
+        (m.role, m.content) if hasattr(m, "role") else (m.get("role"), m.get("content"))
+        for m in history
+    ]
+    return hashlib.sha256(json.dumps(turns, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def make_key(
+    user_message: str,
+    auth_context: AuthContext,
+    conversation_history: Optional[List[Any]] = None,
+    entities: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, str]:
+    """Return (cache_key, context)."""
+    normalized = normalize_message(user_message)
+    context = detect_query_context(normalized) or "general"
+    raw = "|".join([
+        user_scope(auth_context),
+        context,
+        str(iran_day_number()),
+        _history_fingerprint(conversation_history),
+        json.dumps(entities, ensure_ascii=False, sort_keys=True) if entities else "-",
+        normalized,
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest(), context
+
+
+def _is_closed_history(tool_calls: List[ToolCall]) -> bool:
+    """True when every history range in the answer ended in the past (data can no longer change)."""
+    now = datetime.now(timezone.utc)
+    ranges = [tc.result.get("to_date") for tc in tool_calls if isinstance(tc.result, dict)]
+    ranges = [r for r in ranges if r]
+    if not ranges:
+        return False
+    try:
+        return all(datetime.fromisoformat(r.replace("Z", "+00:00")) < now for r in ranges)
+    except ValueError:
+        return False
+
+
+def _ttl_for(context: str, tool_calls: List[ToolCall]) -> float:
+    if context == "history" and _is_closed_history(tool_calls):
+        return settings.answer_cache_closed_history_ttl
+    return settings.answer_cache_ttls.get(context, 0)
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def get(key: str) -> Optional[Tuple[str, List[ToolCall], Optional[Dict[str, Any]]]]:
+    """(message, tool_calls, entity-memory state after the turn or None), or None on a miss."""
+    if not settings.answer_cache_enabled:
+        return None
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    return entry["message"], [ToolCall(**tc) for tc in entry["tool_calls"]], entry.get("entities")
+
+
+def put(
+    key: str,
+    context: str,
+    message: str,
+    tool_calls: List[ToolCall],
+    cacheable: bool = True,
+    entities: Optional[Dict[str, Any]] = None,
+) -> None:
+    if not settings.answer_cache_enabled or not cacheable or not message:
+        return
+    if any(isinstance(tc.result, dict) and tc.result.get("success") is False for tc in tool_calls):
+        return
+    ttl = _ttl_for(context, tool_calls)
+    if ttl <= 0:
+        return
+    entry = {"message": message, "tool_calls": [tc.model_dump() for tc in tool_calls], "entities": entities}
+    _cache.set(key, entry, ttl=ttl)
+    logger.debug(f"ANSWER_CACHE store context={context} ttl={ttl}s")
+
+
+def stats() -> Dict[str, Any]:
+    return _cache.stats()
@@ -0,0 +1,202 @@
+"""
+answer_templates.py
+───────────────────
+Farsi answer templates that turn a successful ApiTool result into the final user
+message without an LLM call.
+
+The wording follows the prompt rules the LLM is given (prompts.py):
+  • UNIT_TYPE_RESPONSE_RULES — vehicle / person / asset language, no speed for persons
+  • HISTORY_RESPONSE_RULES   — use the summary, speed table, overspeed warning,
+                               temperature only when present, record_count, date range
+  • RESPONSE_STRUCTURE       — direct answer, supporting data, status
+
+render() returns None whenever a result is not something a template can answer
+safely (failed call, ambiguous match, unexpected shape) — the caller then falls back
+to the LLM.
+
+Used by:
+  • FastPath                — rule-matched lookups, no LLM call at all
+  • LLMClient.chat          — after the LLM picked a single tool, skip the synthesis call
+                              for actions configured as "template" in
+                              settings.answer_render_modes
+  • LLMClient._partial_answer — best answer when the request deadline runs out
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+from app.tools.API_tools import ApiTool
+
+OVERSPEED_KMH = 120
+
+# Which action fully answers a question of each detect_query_context() type.
+# A templated answer is only used when the tool the LLM chose matches the question.
+CONTEXT_ACTIONS: Dict[str, str] = {
+    "monitoring": "vehicle_tracking_current",
+    "fleet": "vehicle_tracking_current",
+    "history": "Unit_history",
+}
+
+
+# ── Formatting helpers ────────────────────────────────────────────────────────
+
+def _num(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _fmt_speed(value: Any) -> str:
+    n = _num(value)
+    return f"{n:,.0f} km/h" if n is not None else "نامشخص"
+
+
+def _fmt_temp(value: Any) -> str:
+    n = _num(value)
+    return f"{n:.1f} °C" if n is not None else "نامشخص"
+
+
+def _fmt_point(point: Optional[Dict[str, Any]]) -> str:
+    if not point or point.get("latitude") is None or point.get("longitude") is None:
+        return "نامشخص"
+    return f"{point['latitude']:.5f}, {point['longitude']:.5f}"
+
+
+def _unit_label(unit_info: Dict[str, Any], category: str) -> str:
+    """'ماشین volvo FH12 (پلاک 91-ع-587-15)' / 'سعید شاکری نسب' depending on unit type."""
+    name = unit_info.get("name") or unit_info.get("plate") or "نامشخص"
+    plate = unit_info.get("plate")
+    label = f"{name} (پلاک {plate})" if plate and plate != name else name
+    return f"ماشین {label}" if category == "vehicle" else label
+
+
+def _category(unit_info: Dict[str, Any]) -> str:
+    category = unit_info.get("unit_type_category")
+    if category:
+        return category
+    # Unit_history results carry only the raw unit_type — classify the same way ApiTool does
+    return ApiTool._classify_unit_type(unit_info.get("unit_type") or "")
+
+
+# ── vehicle_tracking_current ──────────────────────────────────────────────────
+
+def render_tracking_current(result: Dict[str, Any]) -> Optional[str]:
+    if not result.get("success") or "unit_info" not in result:
+        return None
+
+    unit_info = result["unit_info"]
+    category = _category(unit_info)
+    label = _unit_label(unit_info, category)
+    status = result.get("status") or {}
+    tracking = result.get("tracking") or {}
+    is_online = status.get("is_online")
+    last_seen = status.get("last_seen") or "نامشخص"
+
+    if not result.get("location_available"):
+        return "\n".join([
+            f"{label} در حال حاضر آفلاین است و موقعیت GPS در دسترس نیست.",
+            "Breakdown:",
+            "- وضعیت: آفلاین",
+            f"- آخرین ارتباط: {last_seen}",
+            "وضعیت: دستگاه سیگنال ارسال نمی‌کند.",
+            "پیشنهاد: با راننده تماس بگیرید یا تاریخچه مسیر را برای آخرین موقعیت ثبت‌شده بررسی کنید.",
+        ])
+
+    address = result.get("address") or "نامشخص"
+    if category == "vehicle":
+        headline = f"{label} در حال حاضر در {address} است با سرعت {_fmt_speed(tracking.get('speed'))}."
+    else:
+        headline = f"{label} در حال حاضر در {address} قرار دارد."
+
+    lines = [headline, "Breakdown:"]
+    if category != "person":
+        lines.append(f"- سرعت فعلی: {_fmt_speed(tracking.get('speed'))}")
+    lines.append(f"- وضعیت: {'آنلاین' if is_online else 'آفلاین'}")
+    lines.append(f"- آخرین به‌روزرسانی: {last_seen}")
+    lines.append(f"وضعیت: {result.get('location_status') or ('آنلاین' if is_online else 'آفلاین')}")
+
+    speed = _num(tracking.get("speed"))
+    if category == "vehicle" and speed is not None and speed > OVERSPEED_KMH:
+        lines.append(f"⚠️ هشدار: سرعت بالاتر از حد مجاز ({OVERSPEED_KMH} km/h) است.")
+    return "\n".join(lines)
+
+
+# ── Unit_history ──────────────────────────────────────────────────────────────
+
+def render_unit_history(result: Dict[str, Any]) -> Optional[str]:
+    if not result.get("success") or "unit_info" not in result:
+        return None
+
+    unit_info = result["unit_info"]
+    category = _category(unit_info)
+    label = _unit_label(unit_info, category)
+    summary = result.get("summary")
+
+    if not summary:
+        return (
+            f"برای {label} در بازه {result.get('from_date')} تا {result.get('to_date')} "
+            "هیچ رکورد مسیری یافت نشد."
+        )
+
+    period = f"{summary.get('first_seen')} تا {summary.get('last_seen')}"
+    if category == "vehicle":
+        headline = f"{label} در بازه زمانی {period} مسیر زیر را طی کرده است."
+    elif category == "person":
+        headline = f"{label} در بازه زمانی {period} در مکان‌های زیر بوده است."
+    else:
+        headline = f"{label} در بازه زمانی {period} مسیر زیر را داشته است."
+
+    rows: List[tuple] = [("تعداد رکورد", f"{result.get('record_count', 0):,} رکورد")]
+    speed = summary.get("speed_kmh") or {}
+    if category != "person":
+        rows += [
+            ("سرعت میانگین", _fmt_speed(speed.get("avg"))),
+            ("حداکثر سرعت", _fmt_speed(speed.get("max"))),
+            ("حداقل سرعت", _fmt_speed(speed.get("min"))),
+        ]
+    temperature = summary.get("temperature_c")
+    if temperature:
+        rows += [
+            ("دمای میانگین", _fmt_temp(temperature.get("avg"))),
+            ("بازه دما", f"{_fmt_temp(temperature.get('min'))} تا {_fmt_temp(temperature.get('max'))}"),
+        ]
+    rows += [
+        ("موقعیت اول", _fmt_point(summary.get("first_location"))),
+        ("موقعیت آخر", _fmt_point(summary.get("last_location"))),
+    ]
+
+    lines = [headline, "Breakdown:", "| معیار | مقدار |", "|---|---|"]
+    lines += [f"| {k} | {v} |" for k, v in rows]
+
+    overspeed = summary.get("overspeed_records") or []
+    if category != "person":
+        if overspeed:
+            lines.append(
+                f"⚠️ وضعیت: {len(overspeed):,} رکورد سرعت غیرمجاز (بالای {OVERSPEED_KMH} km/h) ثبت شده است."
+            )
+        else:
+            lines.append("وضعیت: سرعت در محدوده مجاز. هیچ رکورد سرعت غیرمجاز ثبت نشده.")
+    return "\n".join(lines)
+
+
+# ── Dispatcher ────────────────────────────────────────────────────────────────
+
+_RENDERERS: Dict[str, Callable[[Dict[str, Any]], Optional[str]]] = {
+    "vehicle_tracking_current": render_tracking_current,
+    "Unit_history": render_unit_history,
+}
+
+
+def has_template(action: str) -> bool:
+    return action in _RENDERERS
+
+
+def render(action: str, result: Dict[str, Any]) -> Optional[str]:
+    """Render the final Farsi answer for `action`, or None if a template can't answer safely."""
+    renderer = _RENDERERS.get(action)
+    if renderer is None or not isinstance(result, dict):
+        return None
+    try:
+        return renderer(result)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,464 @@
+"""
+cache.py
+────────
+Caches used by the app's caching layers, behind one interface.
+
+TTLCache — in-process TTL + LRU cache:
+  • every entry has its own TTL (seconds); expired entries are never returned
+  • size is bounded by max_entries; the least recently used entry is evicted first
+  • thread-safe — LLMClient.chat runs in the threadpool
+
+CacheBackend — what the caching layers (answer cache, unit resolution, geocoding)
+program against: get / set / get_many / set_many / delete / clear / stats on
+JSON-serializable values. get_cache(name) returns the backend selected by
+settings.cache_backend:
+
+  memory  a TTLCache per process (default). Each uvicorn worker warms its own copy.
+  sqlite  one SQLite file in WAL mode shared by every worker on the node
+          (settings.cache_sqlite_path, ideally on tmpfs such as /dev/shm). Readers
+          never block the writer; writes from several processes are serialized by
+          SQLite's lock (busy_timeout). Size is bounded per cache: every few hundred
+          writes a process drops expired entries and, past max_entries, those
+          closest to expiry. Any SQLite error is logged and treated as a miss, and a
+          row that no longer decodes is deleted — the cache never fails a request.
+  redis   shared by every worker on every pod (settings.redis_url, see
+          redis_client.py), so adding pods raises the hit rate instead of
+          splitting it. get_many is one MGET and set_many one pipelined round trip;
+          every key carries its TTL and the server's maxmemory policy bounds size.
+          An optional near cache (settings.redis_near_cache_ttl > 0) keeps recently
+          read entries in process for a couple of seconds — staleness is bounded by
+          that TTL, there is no invalidation message. Redis errors and undecodable
+          values are misses.
+
+Hits and misses of every named cache go to the cache_requests_total metric.
+
+Usage:
+  from app.core.cache import TTLCache, get_cache
+
+  cache = TTLCache(max_entries=1000, default_ttl=30)
+  cache.set("k", {"a": 1}, ttl=60)
+  cache.get("k")   → {"a": 1}  (or None once expired / evicted)
+
+  units = get_cache("units", max_entries=5000)
+  units.set(key, {"unit_id": "…"}, ttl=600)
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.config import get_settings
+from app.core import redis_client, serialization
+from app.core.logging_config import get_logger
+from app.core.metrics import CACHE_REQUESTS
+from app.core.redis_client import RedisError
+from app.schema.Auth import AuthContext
+
+settings = get_settings()
+logger = get_logger("cache")
+
+
+class TTLCache:
+    def __init__(self, max_entries: int = 1000, default_ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = len(self._data)
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# ── Backends ──────────────────────────────────────────────────────────────────
+
+class CacheBackend(ABC):
+    """Named cache of JSON-serializable values with per-entry TTL."""
+
+    def __init__(self, name: str, max_entries: int):
+        self.name = name
+        self.max_entries = max_entries
+
+    def _record(self, hit: bool) -> None:
+        CACHE_REQUESTS.labels(cache=self.name, result="hit" if hit else "miss").inc()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        ...
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Values of the keys that are present; absent keys are left out."""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_many(self, items: Dict[str, Any], ttl: float) -> None:
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process backend: a TTLCache."""
+
+    def __init__(self, name: str, max_entries: int):
+        super().__init__(name, max_entries)
+        self._cache = TTLCache(max_entries=max_entries, default_ttl=0)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._cache.get(key)
+        self._record(value is not None)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", **self._cache.stats()}
+
+
+class SQLiteBackend(CacheBackend):
+    """Node-local backend shared by all worker processes through one WAL-mode SQLite file."""
+
+    _TRIM_EVERY = 200   # size check once per this many writes per process
+
+    def __init__(self, name: str, max_entries: int, path: str):
+        super().__init__(name, max_entries)
+        self.path = path
+        self._table = f"cache_{hashlib.sha1(name.encode('utf-8')).hexdigest()[:12]}"
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=settings.cache_sqlite_busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self._table}_exp ON {self._table} (expires_at)")
+            self._local.conn = conn
+        return conn
+
+    def _failed(self, op: str, e: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"CACHE sqlite {op} failed cache={self.name}: {e}")
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            row = self._conn().execute(
+                f"SELECT value FROM {self._table} WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._failed("get", e)
+            row = None
+        value = None
+        if row is not None:
+            try:
+                value = serialization.loads(row[0])
+            except serialization.JSONDecodeError as e:
+                # corrupt or truncated row — drop it and treat it as a miss
+                self._failed("decode", e)
+                self.delete(key)
+        if value is None:
+            self.misses += 1
+            self._record(False)
+            return None
+        self.hits += 1
+        self._record(True)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        try:
+            conn = self._conn()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self._table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, serialization.dumps(value), time.time() + ttl),
+            )
+            self._writes += 1
+            if self._writes % self._TRIM_EVERY == 0:
+                self._trim(conn)
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self._failed("set", e)
+
+    def _trim(self, conn: sqlite3.Connection) -> None:
+        conn.execute(f"DELETE FROM {self._table} WHERE expires_at <= ?", (time.time(),))
+        excess = conn.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                f"DELETE FROM {self._table} WHERE key IN "
+                f"(SELECT key FROM {self._table} ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            )
+
+    def delete(self, key: str) -> None:
+        try:
+            self._conn().execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            self._failed("delete", e)
+
+    def clear(self) -> None:
+        try:
+            self._conn().execute(f"DELETE FROM {self._table}")
+        except sqlite3.Error as e:
+            self._failed("clear", e)
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            size = self._conn().execute(
+                f"SELECT COUNT(*) FROM {self._table} WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        total = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,            # this process only
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+class RedisBackend(CacheBackend):
+    """Backend shared across pods through Redis, with an optional short-lived near cache."""
+
+    def __init__(self, name: str, max_entries: int):
+        super().__init__(name, max_entries)
+        self._redis = redis_client.get_redis()
+        self._prefix = redis_client.key("cache", name, "")
+        self._near = (
+            TTLCache(max_entries=settings.redis_near_cache_max_entries, default_ttl=settings.redis_near_cache_ttl)
+            if settings.redis_near_cache_ttl > 0 else None
+        )
+        self.hits = 0
+        self.misses = 0
+        self.near_hits = 0
+        self.errors = 0
+
+    def _failed(self, op: str, e: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"CACHE redis {op} failed cache={self.name}: {e}")
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self._record(hit)
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        found: Dict[str, Any] = {}
+        remote = []
+        for key in keys:
+            value = self._near.get(key) if self._near is not None else None
+            if value is not None:
+                self.near_hits += 1
+                self._count(True)
+                found[key] = value
+            else:
+                remote.append(key)
+        if not remote:
+            return found
+
+        try:
+            raw = self._redis.mget([self._prefix + k for k in remote])
+        except RedisError as e:
+            self._failed("mget", e)
+            raw = [None] * len(remote)
+        for key, data in zip(remote, raw):
+            value = None
+            if data is not None:
+                try:
+                    value = serialization.loads(data)
+                except serialization.JSONDecodeError as e:
+                    self._failed("decode", e)
+                    self.delete(key)
+            self._count(value is not None)
+            if value is None:
+                continue
+            found[key] = value
+            if self._near is not None:
+                self._near.set(key, value)
+        return found
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items: Dict[str, Any], ttl: float) -> None:
+        if ttl <= 0 or not items:
+            return
+        px = max(1, int(ttl * 1000))
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key, value in items.items():
+                pipe.set(self._prefix + key, serialization.dumpb(value), px=px)
+            pipe.execute()
+        except RedisError as e:
+            self._failed("set", e)
+            return
+        if self._near is not None:
+            for key, value in items.items():
+                self._near.set(key, value, ttl=min(ttl, settings.redis_near_cache_ttl))
+
+    def delete(self, key: str) -> None:
+        if self._near is not None:
+            self._near.delete(key)
+        try:
+            self._redis.delete(self._prefix + key)
+        except RedisError as e:
+            self._failed("delete", e)
+
+    def clear(self) -> None:
+        if self._near is not None:
+            self._near.clear()
+        try:
+            batch = []
+            for k in self._redis.scan_iter(match=self._prefix + "*", count=500):
+                batch.append(k)
+                if len(batch) >= 500:
+                    self._redis.unlink(*batch)
+                    batch = []
+            if batch:
+                self._redis.unlink(*batch)
+        except RedisError as e:
+            self._failed("clear", e)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": "redis",
+            "hits": self.hits,            # this process only
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "near_cache_size": len(self._near) if self._near is not None else None,
+        }
+
+
+_caches: Dict[str, CacheBackend] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str, max_entries: int = 1000) -> CacheBackend:
+    """The process-wide cache called `name`, on the backend chosen by settings.cache_backend."""
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                if settings.cache_backend == "redis":
+                    cache = RedisBackend(name, max_entries)
+                elif settings.cache_backend == "sqlite":
+                    cache = SQLiteBackend(name, max_entries, settings.cache_sqlite_path)
+                else:
+                    cache = MemoryBackend(name, max_entries)
+                _caches[name] = cache
+    return cache
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in list(_caches.items())}
+
+
+def user_scope(auth_context: AuthContext) -> str:
+    """user_id + a hash of the access token: cached data never crosses users or tokens."""
+    token_hash = hashlib.sha256(auth_context.access_token.encode("utf-8")).hexdigest()[:16]
+    return f"{auth_context.user_id}:{token_hash}"
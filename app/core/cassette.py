@@ -0,0 +1,309 @@
+"""
+cassette.py
+───────────
+Record / replay of all upstream I/O — fleet backend and Nominatim (through
+upstream.py) and OpenAI (through an httpx transport on the OpenAI client) — so
+ApiTool / LLMClient changes can be profiled and A/B-compared offline against
+identical traffic.
+
+settings.cassette_mode:
+  off      normal operation (default)
+  record   calls go out as usual; every request/response pair is appended to
+           settings.cassette_path (gzip JSONL, one interaction per line)
+  replay   nothing goes out; responses come from the cassette. A request with no
+           recorded match raises CassetteMiss (a requests ConnectionError for
+           upstream calls, an httpx error for OpenAI) and is logged.
+
+settings.cassette_latency (replay only):
+  original  sleep for the recorded duration of each call
+  zero      answer immediately
+
+Matching:
+  exact key  method + URL path + query params + body (host-independent, so a
+             session recorded against one deployment replays against any base URL)
+  loose key  the same with ISO-8601 timestamps blanked and the system prompt dropped,
+             so a session recorded yesterday still replays today, when "دیروز" resolves
+             to different timestamps and the prompt carries a different date
+  Identical requests recorded several times are replayed in recorded order (the
+  last one repeats), so a polled tracking endpoint replays its changing positions.
+
+Credentials are never written: request headers are not recorded and keys do not
+depend on them. Record with a single worker — workers do not share the file.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+
+from app.config.config import get_settings
+from app.core.logging_config import get_logger
+
+settings = get_settings()
+logger = get_logger("cassette")
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+_ISO_TS_RE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?")
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """Replay mode found no recorded response for a request."""
+
+
+def mode() -> str:
+    return settings.cassette_mode
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _loosen(value: Any) -> Any:
+    if isinstance(value, str):
+        return _ISO_TS_RE.sub("<ts>", value)
+    if isinstance(value, list):
+        return [_loosen(v) for v in value]
+    if isinstance(value, dict):
+        if value.get("role") == "system":
+            return {"role": "system"}
+        return {k: _loosen(v) for k, v in value.items()}
+    return value
+
+
+def _keys(method: str, url: str, params: Any, body: Any) -> Tuple[str, str]:
+    path = urlsplit(url).path
+    exact = [method.upper(), path, sorted((str(k), str(v)) for k, v in (params or {}).items()), body]
+    return _digest(exact), _digest(_loosen(exact))
+
+
+class Cassette:
+    """Interactions of one cassette file, with per-key replay cursors."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._exact: Dict[str, List[Dict[str, Any]]] = {}
+        self._loose: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    def load(self) -> "Cassette":
+        if not os.path.exists(self.path):
+            logger.warning(f"CASSETTE not found path={self.path} — every call will miss")
+            return self
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    self._exact.setdefault(entry["key"], []).append(entry)
+                    self._loose.setdefault(entry["loose"], []).append(entry)
+            except (EOFError, ValueError):
+                # recorder was killed mid-write — keep every complete interaction before it
+                logger.warning(f"CASSETTE truncated path={self.path} — using the complete part")
+        logger.info(f"CASSETTE loaded path={self.path} interactions={sum(len(v) for v in self._exact.values())}")
+        return self
+
+    def _next(self, table: Dict[str, List[Dict[str, Any]]], key: str) -> Optional[Dict[str, Any]]:
+        entries = table.get(key)
+        if not entries:
+            return None
+        cursor_key = f"{id(table)}:{key}"
+        index = self._cursors.get(cursor_key, 0)
+        self._cursors[cursor_key] = index + 1
+        return entries[min(index, len(entries) - 1)]
+
+    def find(self, key: str, loose: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._next(self._exact, key) or self._next(self._loose, loose)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.replayed += 1
+            return entry
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        # one gzip member per interaction: concatenated members are a valid .gz, and a
+        # killed worker (uvicorn is stopped with SIGTERM) never leaves a half-written stream
+        member = gzip.compress(line.encode("utf-8"))
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(member)
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": settings.cassette_mode,
+            "path": self.path,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+        }
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def _get_cassette() -> Cassette:
+    global _cassette
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                cassette = Cassette(settings.cassette_path)
+                _cassette = cassette.load() if mode() == REPLAY else cassette
+    return _cassette
+
+
+def _replay_delay(entry: Dict[str, Any]) -> None:
+    if settings.cassette_latency == "original":
+        time.sleep(entry.get("elapsed_ms", 0) / 1000)
+
+
+# ── upstream.py (requests) ────────────────────────────────────────────────────
+
+def _to_requests_response(entry: Dict[str, Any]) -> requests.Response:
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response._content = entry["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.headers["Content-Type"] = entry.get("content_type") or "application/json"
+    response.url = entry["url"]
+    response.reason = "REPLAYED"
+    return response
+
+
+def http(
+    method: str,
+    url: str,
+    params: Optional[Dict[str, Any]],
+    body: Any,
+    send: Callable[[], requests.Response],
+) -> requests.Response:
+    """Wrap one upstream HTTP call; pass-through when cassettes are off."""
+    if mode() == OFF:
+        return send()
+
+    key, loose = _keys(method, url, params, body)
+    cassette = _get_cassette()
+
+    if mode() == REPLAY:
+        entry = cassette.find(key, loose)
+        if entry is None:
+            logger.warning(f"CASSETTE miss {method} {url} params={params}")
+            raise CassetteMiss(f"no recorded response for {method} {url}")
+        _replay_delay(entry)
+        return _to_requests_response(entry)
+
+    started = time.perf_counter()
+    response = send()
+    cassette.append({
+        "kind": "http",
+        "key": key,
+        "loose": loose,
+        "method": method.upper(),
+        "url": url,
+        "params": params,
+        "status": response.status_code,
+        "content_type": response.headers.get("Content-Type"),
+        "body": response.text,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+    return response
+
+
+# ── OpenAI (httpx transport) ──────────────────────────────────────────────────
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport that records or replays OpenAI API calls."""
+
+    def __init__(self, inner: Optional[httpx.BaseTransport] = None):
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url.copy_with(query=None))
+        params = dict(request.url.params)
+        raw = request.read()
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError:
+            body = raw.decode("utf-8", "replace")
+        key, loose = _keys(request.method, url, params, body)
+        cassette = _get_cassette()
+
+        if mode() == REPLAY:
+            entry = cassette.find(key, loose)
+            if entry is None:
+                logger.warning(f"CASSETTE miss {request.method} {url}")
+                raise httpx.ConnectError(f"no recorded response for {request.method} {url}", request=request)
+            _replay_delay(entry)
+            return httpx.Response(
+                entry["status"],
+                headers={"Content-Type": entry.get("content_type") or "application/json"},
+                content=entry["body"].encode("utf-8"),
+                request=request,
+            )
+
+        started = time.perf_counter()
+        response = self.inner.handle_request(request)
+        content = response.read()
+        cassette.append({
+            "kind": "llm",
+            "key": key,
+            "loose": loose,
+            "method": request.method,
+            "url": url,
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type"),
+            "body": content.decode("utf-8", "replace"),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+        return httpx.Response(
+            response.status_code,
+            headers={k: v for k, v in response.headers.items() if k.lower() not in ("content-encoding", "content-length")},
+            content=content,
+            request=request,
+        )
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+_http_client: Optional[httpx.Client] = None
+
+
+def openai_http_client() -> Optional[httpx.Client]:
+    """Shared httpx client for the OpenAI SDK, or None (SDK default) when cassettes are off."""
+    global _http_client
+    if mode() == OFF:
+        return None
+    if _http_client is None:
+        with _cassette_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(transport=CassetteTransport(), timeout=None)
+    return _http_client
+
+
+def stats() -> Dict[str, Any]:
+    if mode() == OFF:
+        return {"mode": OFF}
+    return _get_cassette().stats()
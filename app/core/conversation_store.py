@@ -0,0 +1,139 @@
+"""
+conversation_store.py
+─────────────────────
+Server-side conversation state, so any worker on any pod can continue any
+conversation (no sticky sessions).
+
+A conversation, keyed by (user_id, conversation_id), holds:
+  history  the last settings.conversation_max_messages {role, content} turns
+  state    a small JSON dict other layers attach to the conversation
+
+Both expire settings.conversation_ttl seconds after the last turn.
+
+settings.conversation_store:
+  memory  a TTLCache in this process (default; single worker, or clients that
+          always send conversation_history themselves)
+  redis   shared through Redis (redis_client.py): load is one pipelined round trip
+          (LRANGE + GET), save_turn another (RPUSH + LTRIM + PEXPIRE [+ SET]).
+          Redis errors degrade to an empty conversation — the turn still runs.
+
+/api/chat uses the stored history only when the client sends a conversation_id
+without conversation_history; a client-supplied history always wins.
+
+Usage:
+  from app.core import conversation_store
+
+  store = conversation_store.get_store()
+  conv = store.load(user_id, conversation_id)          → Conversation(history, state)
+  store.save_turn(user_id, conversation_id, [{"role": "user", ...}, {"role": "assistant", ...}])
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.config.config import get_settings
+from app.core import redis_client, serialization
+from app.core.cache import TTLCache
+from app.core.logging_config import get_logger
+from app.core.redis_client import RedisError
+
+settings = get_settings()
+logger = get_logger("conversation_store")
+
+
+@dataclass
+class Conversation:
+    history: List[Dict[str, str]] = field(default_factory=list)
+    state: Dict[str, Any] = field(default_factory=dict)
+
+
+class ConversationStore(ABC):
+    @abstractmethod
+    def load(self, user_id: str, conversation_id: str) -> Conversation:
+        ...
+
+    @abstractmethod
+    def save_turn(
+        self,
+        user_id: str,
+        conversation_id: str,
+        messages: List[Dict[str, str]],
+        state: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Append messages to the history and, when given, replace the state."""
+
+
+class MemoryConversationStore(ConversationStore):
+    def __init__(self):
+        self._cache = TTLCache(max_entries=settings.conversation_max_entries, default_ttl=settings.conversation_ttl)
+        self._lock = threading.Lock()
+
+    def load(self, user_id: str, conversation_id: str) -> Conversation:
+        entry = self._cache.get(f"{user_id}:{conversation_id}")
+        if entry is None:
+            return Conversation()
+        return Conversation(history=list(entry["history"]), state=dict(entry["state"]))
+
+    def save_turn(self, user_id, conversation_id, messages, state=None) -> None:
+        key = f"{user_id}:{conversation_id}"
+        with self._lock:
+            entry = self._cache.get(key) or {"history": [], "state": {}}
+            history = (entry["history"] + list(messages))[-settings.conversation_max_messages:]
+            self._cache.set(key, {"history": history, "state": state if state is not None else entry["state"]})
+
+
+class RedisConversationStore(ConversationStore):
+    def __init__(self):
+        self._redis = redis_client.get_redis()
+
+    @staticmethod
+    def _keys(user_id: str, conversation_id: str) -> tuple[str, str]:
+        base = redis_client.key("conv", user_id, conversation_id)
+        return f"{base}:history", f"{base}:state"
+
+    def load(self, user_id: str, conversation_id: str) -> Conversation:
+        history_key, state_key = self._keys(user_id, conversation_id)
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.lrange(history_key, 0, -1)
+            pipe.get(state_key)
+            raw_history, raw_state = pipe.execute()
+        except RedisError as e:
+            logger.warning(f"CONVERSATION load failed conv={conversation_id}: {e}")
+            return Conversation()
+        return Conversation(
+            history=[serialization.loads(m) for m in raw_history],
+            state=serialization.loads(raw_state) if raw_state else {},
+        )
+
+    def save_turn(self, user_id, conversation_id, messages, state=None) -> None:
+        history_key, state_key = self._keys(user_id, conversation_id)
+        ttl_ms = int(settings.conversation_ttl * 1000)
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            if messages:
+                pipe.rpush(history_key, *(serialization.dumpb(m) for m in messages))
+                pipe.ltrim(history_key, -settings.conversation_max_messages, -1)
+            pipe.pexpire(history_key, ttl_ms)
+            if state is not None:
+                pipe.set(state_key, serialization.dumpb(state), px=ttl_ms)
+            else:
+                pipe.pexpire(state_key, ttl_ms)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"CONVERSATION save failed conv={conversation_id}: {e}")
+
+
+_store: Optional[ConversationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ConversationStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RedisConversationStore() if settings.conversation_store == "redis" else MemoryConversationStore()
+    return _store
@@ -23,14 +23,26 @@ Usage:
   position="start"  → midnight (00:00:00) of the resolved date
   position="end"    → end of day (23:59:59) of the resolved date
   position="as_is"  → use time component if present, otherwise midnight
+
+Performance:
+  resolve_date is called several times per tool call (LLM pre-resolution, then again
+  in _Unit_history), so:
+    • already-resolved UTC ISO strings return immediately (no clock, no parsing)
+    • every regex is compiled once at import
+    • results are memoized per (normalized text, position) for the current Iran-local
+      day; the memo is dropped automatically when the Iran-local date rolls over
+  See scripts/bench_date_utils.py for per-call timings.
 """
 
 import re
+import threading
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Tuple
-import jdatetime
+from typing import Dict, Optional, Tuple
 from dateutil import parser as dateutil_parser
 
+from app.core.jalali import jalali_to_gregorian
+
 
 # ── Timezone ──────────────────────────────────────────────────────────────────
 UTC = timezone.utc
@@ -97,6 +109,24 @@ _FA_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹", "0123456789")
 
 # ── Pre-compiled patterns ──────────────────────────────
 _ISO_UTC_RE = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z$')
+_N_DAYS_ANCHOR_RE = re.compile(r"(\d+)_days_ago")
+_N_DAYS_AGO_RE = re.compile(r"(\d+)\s*(روز پیش|روز قبل|days? ago)")
+_DATE_SEP_RE = re.compile(r"[-/]")
+_JALALI_RE = re.compile(
+    r"(\d{4})/(\d{1,2})/(\d{1,2})"
+    r"(?:\s+(\d{1,2}):(\d{2})(?::(\d{2}))?)?$"
+)
+
+# ── Memo cache ────────────────────────────────────────────────────────────────
+# Keyed by (normalized text, position); valid for one Iran-local day only, because
+# relative expressions ("دیروز", "this week") depend on the current date.
+_IRAN_OFFSET_SECONDS = 3 * 3600 + 30 * 60
+_IRAN_EPOCH = datetime(1970, 1, 1, tzinfo=IRAN_TZ)
+_CACHE_MAX_ENTRIES = 2048
+
+_cache: Dict[Tuple[str, str], Optional[str]] = {}
+_cache_day = -1
+_cache_lock = threading.Lock()
 
 
 def _normalize(text: str) -> str:
@@ -114,7 +144,7 @@ def _resolve_anchor(anchor: str, today: datetime) -> datetime:
         return today + timedelta(days=1)
 
     # N days ago
-    m = re.match(r"(\d+)_days_ago", anchor)
+    m = _N_DAYS_ANCHOR_RE.match(anchor)
     if m:
         return today - timedelta(days=int(m.group(1)))
 
@@ -166,15 +196,11 @@ def _try_jalali(text: str) -> Optional[datetime]:
     Returns a UTC-aware datetime (converts from IRAN_TZ) or None.
     """
     # Normalise separators
-    t = re.sub(r"[-/]", "/", text.strip().translate(_FA_DIGITS))
+    t = _DATE_SEP_RE.sub("/", text.strip().translate(_FA_DIGITS))
     t = t.replace("T", " ").replace("t", " ")
 
     # Pattern: YYYY/MM/DD [HH:MM[:SS]]
-    m = re.match(
-        r"(\d{4})/(\d{1,2})/(\d{1,2})"
-        r"(?:\s+(\d{1,2}):(\d{2})(?::(\d{2}))?)?$",
-        t,
-    )
+    m = _JALALI_RE.match(t)
     if not m:
         return None
 
@@ -189,10 +215,10 @@ def _try_jalali(text: str) -> Optional[datetime]:
     second = int(m.group(6)) if m.group(6) else 0
 
     try:
-        jdt = jdatetime.datetime(year, month, day, hour, minute, second,
-                                 tzinfo=IRAN_TZ)
-        return jdt.togregorian().astimezone(UTC)
-    except Exception:
+        g = jalali_to_gregorian(year, month, day)
+        local = datetime(g.year, g.month, g.day, hour, minute, second, tzinfo=IRAN_TZ)
+        return local.astimezone(UTC)
+    except ValueError:
         return None
 
 
@@ -210,60 +236,109 @@ def _try_gregorian(text: str) -> Optional[datetime]:
         return None
 
 
-# ── Public API ────────────────────────────────────────────────────────────────
-
-def resolve_date(text: str, position: str = "start") -> Tuple[Optional[str], Optional[str]]:
-    """
-    Resolve any date expression to a UTC ISO 8601 string.
-
-    Args:
-        text:     The raw date string from user or LLM
-        position: "start" → 00:00:00, "end" → 23:59:59, "as_is" → keep parsed time
-
-    Returns:
-        (utc_iso_string, error_message)
-        On success: ("2026-04-18T00:00:00Z", None)
-        On failure: (None, "human-readable error in Farsi")
-    """
-    if not text or not text.strip():
-        return None, "تاریخ وارد نشده است."
-
-    if _ISO_UTC_RE.match(text.strip()):
-        return text.strip(), None
+def iran_day_number() -> int:
+    """Days since 1970-01-01 in Iran local time — cheap, no datetime construction."""
+    return int((time.time() + _IRAN_OFFSET_SECONDS) // 86400)
 
-    normalized = _normalize(text)
-    today = datetime.now(IRAN_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
 
+def _resolve_uncached(normalized: str, position: str, today: datetime) -> Optional[str]:
+    """Resolve a normalized expression against `today` (Iran-local midnight)."""
     # ── 1. Natural language ───────────────────────────────────────────────────
     if normalized in _ALL_RELATIVE:
         start_anchor, end_anchor = _ALL_RELATIVE[normalized]
         anchor = end_anchor if position == "end" else start_anchor
         dt = _resolve_anchor(anchor, today)
         dt = _apply_position(dt, position)
-        return _to_utc_iso(dt), None
+        return _to_utc_iso(dt)
 
     # ── 2. "N روز پیش / N days ago" with numeric prefix ─────────────────────
-    m = re.match(r"(\d+)\s*(روز پیش|روز قبل|days? ago)", normalized)
+    m = _N_DAYS_AGO_RE.match(normalized)
     if m:
         n = int(m.group(1))
         dt = _apply_position(today - timedelta(days=n), position)
-        return _to_utc_iso(dt), None
+        return _to_utc_iso(dt)
 
     # ── 3. Jalali date (1300–1500 range) ─────────────────────────────────────
-    jalali_result = _try_jalali(text)
+    jalali_result = _try_jalali(normalized)
     if jalali_result is not None:
         if position != "as_is":
             jalali_result = _apply_position(jalali_result, position)
-        return _to_utc_iso(jalali_result), None
+        return _to_utc_iso(jalali_result)
 
     # ── 4. Gregorian / ISO 8601 ───────────────────────────────────────────────
-    gregorian_result = _try_gregorian(text)
+    gregorian_result = _try_gregorian(normalized)
     if gregorian_result is not None:
         if position != "as_is":
             gregorian_result = _apply_position(gregorian_result, position)
-        return _to_utc_iso(gregorian_result), None
+        return _to_utc_iso(gregorian_result)
+
+    return None
+
+
+def _resolve_cached(normalized: str, position: str) -> Optional[str]:
+    global _cache_day
+
+    day = iran_day_number()
+    key = (normalized, position)
+
+    if day == _cache_day:
+        try:
+            return _cache[key]
+        except KeyError:
+            pass
+
+    today = _IRAN_EPOCH + timedelta(days=day)
+    result = _resolve_uncached(normalized, position, today)
+
+    with _cache_lock:
+        if day != _cache_day:
+            # Iran-local midnight passed — every relative entry is stale
+            _cache.clear()
+            _cache_day = day
+        elif len(_cache) >= _CACHE_MAX_ENTRIES:
+            _cache.clear()
+        _cache[key] = result
+    return result
+
+
+def clear_cache() -> None:
+    """Drop all memoized resolutions (used by benchmarks)."""
+    global _cache_day
+    with _cache_lock:
+        _cache.clear()
+        _cache_day = -1
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def resolve_date(text: str, position: str = "start") -> Tuple[Optional[str], Optional[str]]:
+    """
+    Resolve any date expression to a UTC ISO 8601 string.
+
+    Args:
+        text:     The raw date string from user or LLM
+        position: "start" → 00:00:00, "end" → 23:59:59, "as_is" → keep parsed time
+
+    Returns:
+        (utc_iso_string, error_message)
+        On success: ("2026-04-18T00:00:00Z", None)
+        On failure: (None, "human-readable error in Farsi")
+    """
+    if not text:
+        return None, "تاریخ وارد نشده است."
+
+    # Fast path: already resolved (e.g. by LLMClient._resolve_dates_in_args)
+    stripped = text.strip()
+    if _ISO_UTC_RE.match(stripped):
+        return stripped, None
+
+    if not stripped:
+        return None, "تاریخ وارد نشده است."
+
+    resolved = _resolve_cached(_normalize(stripped), position)
+    if resolved is not None:
+        return resolved, None
 
-    # ── 5. Nothing matched ────────────────────────────────────────────────────
     return None, (
         f"تاریخ '{text}' قابل تشخیص نیست. "
         "لطفاً از فرمت‌هایی مثل 'دیروز'، '1405/02/10'، یا '2026-04-18' استفاده کنید."
@@ -0,0 +1,74 @@
+"""
+deadline.py
+───────────
+End-to-end request deadline.
+
+/api/chat creates one Deadline per request (from Settings or the X-Request-Timeout
+header). LLMClient.chat activates it for the duration of the request, and every
+layer below — LLM completions, tool execution, upstream HTTP calls — reads it via
+current() and shrinks its own timeout to the remaining budget.
+
+The deadline travels in a ContextVar, so it follows the request into the threadpool
+without being threaded through every ApiTool helper signature.
+
+Usage:
+  from app.core.deadline import Deadline, activate, current
+
+  with activate(Deadline(30)):
+      ...
+      timeout = current().clamp(settings.api_timeout)
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class Deadline:
+    """A monotonic point in time after which the request should stop doing work."""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def clamp(self, timeout: Optional[float]) -> float:
+        """Shrink a per-call timeout so it never outlives the request."""
+        remaining = self.remaining()
+        if timeout is None:
+            return remaining
+        return min(float(timeout), remaining)
+
+    def __repr__(self) -> str:
+        return f"Deadline(budget={self.budget:.1f}s, remaining={self.remaining():.2f}s)"
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current() -> Optional[Deadline]:
+    return _current.get()
+
+
+@contextmanager
+def activate(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def clamp_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Clamp `timeout` to the active deadline, or return it unchanged if there is none."""
+    deadline = _current.get()
+    if deadline is None:
+        return timeout
+    return deadline.clamp(timeout)
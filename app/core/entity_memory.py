@@ -0,0 +1,156 @@
+"""
+entity_memory.py
+────────────────
+Conversation-scoped memory of the units and the date range a conversation is
+about, so follow-ups like "و دیروز؟" or "دمای همین ماشین" need no new Unit/All
+search and sensor_current can run without the LLM re-sending a unit_id.
+
+What is remembered (in the conversation store's state, see conversation_store.py):
+  units       the last settings.entity_memory_max_units units resolved by
+              ApiTool._find_unit_id — {id, title, plate, unit_type}, most recent first;
+              the first one is "the current unit"
+  date_range  the last range resolved for Unit_history — {from, to} in UTC ISO 8601
+
+How tool calls use it (API_tools.py):
+  query omitted, or a reference such as "همین ماشین" / "current"  → the current unit
+  query equal to a remembered unit's title, plate or id          → that unit, no search
+  sensor_current without unit_id                                  → the current unit
+  Unit_history without FromDate / ToDate                          → the last date range
+The LLM also sees the current unit and range in a short system note.
+
+The memory of the running turn travels in a ContextVar, like the deadline, so
+ApiTool reads and updates it without extra parameters.
+
+Usage:
+  from app.core import entity_memory
+
+  memory = entity_memory.EntityMemory.from_state(conversation.state)
+  with entity_memory.activate(memory):
+      llm.chat(...)
+  store.save_turn(..., state={**conversation.state, **memory.to_state()})
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config.config import get_settings
+from app.core.answer_cache import normalize_message
+from app.core.logging_config import get_logger
+
+settings = get_settings()
+logger = get_logger("entity_memory")
+
+CURRENT_UNIT_REFERENCES = {
+    "current", "همین", "همین ماشین", "همین خودرو", "همین واحد", "این ماشین", "این خودرو",
+    "همان", "همان ماشین", "همون", "همون ماشین", "آن ماشین", "اون ماشین",
+}
+
+
+class EntityMemory:
+    def __init__(self, units: Optional[List[Dict[str, Any]]] = None, date_range: Optional[Dict[str, str]] = None):
+        self.units: List[Dict[str, Any]] = list(units or [])
+        self.date_range: Optional[Dict[str, str]] = date_range
+        self.changed = False
+
+    @classmethod
+    def from_state(cls, state: Optional[Dict[str, Any]]) -> "EntityMemory":
+        entities = (state or {}).get("entities") or {}
+        return cls(units=entities.get("units"), date_range=entities.get("date_range"))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"entities": {"units": self.units, "date_range": self.date_range}}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        """Take over a to_state() snapshot, e.g. the memory stored with a cached answer."""
+        restored = EntityMemory.from_state(state)
+        if (restored.units, restored.date_range) != (self.units, self.date_range):
+            self.units, self.date_range = restored.units, restored.date_range
+            self.changed = True
+
+    # ── units ─────────────────────────────────────────────────────────────────
+
+    @property
+    def current_unit(self) -> Optional[Dict[str, Any]]:
+        return self.units[0] if self.units else None
+
+    def remember_unit(self, unit_id: str, unit: Optional[Dict[str, Any]] = None) -> None:
+        unit = unit or {}
+        entry = {
+            "id": str(unit_id),
+            "title": unit.get("title") or unit.get("firstTitle"),
+            "plate": unit.get("secondTitle"),
+            "unit_type": unit.get("unitTypeIconName") or unit.get("unitType"),
+        }
+        known = next((u for u in self.units if u["id"] == entry["id"]), None)
+        if known is not None:
+            entry = {k: entry[k] or known.get(k) for k in entry}
+        self.units = [entry] + [u for u in self.units if u["id"] != entry["id"]]
+        del self.units[settings.entity_memory_max_units:]
+        self.changed = True
+
+    def lookup(self, query: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The remembered unit a tool call refers to, or None when it needs a search."""
+        if not self.units:
+            return None
+        normalized = normalize_message(query or "")
+        if not normalized or normalized in CURRENT_UNIT_REFERENCES:
+            return self.current_unit
+        for unit in self.units:
+            names = (unit.get("id"), unit.get("title"), unit.get("plate"))
+            if any(name and normalize_message(str(name)) == normalized for name in names):
+                return unit
+        return None
+
+    @staticmethod
+    def as_unit(unit: Dict[str, Any]) -> Dict[str, Any]:
+        """A remembered unit in the shape of a Unit/All item."""
+        return {
+            "unitId": unit["id"],
+            "title": unit.get("title"),
+            "secondTitle": unit.get("plate"),
+            "unitTypeIconName": unit.get("unit_type") or "",
+        }
+
+    # ── dates ─────────────────────────────────────────────────────────────────
+
+    def remember_dates(self, from_date: str, to_date: str) -> None:
+        self.date_range = {"from": from_date, "to": to_date}
+        self.changed = True
+
+    # ── prompt ────────────────────────────────────────────────────────────────
+
+    def prompt_note(self) -> Optional[str]:
+        """Short system note so the LLM can refer to the current unit instead of searching again."""
+        lines = []
+        unit = self.current_unit
+        if unit is not None:
+            label = " / ".join(str(v) for v in (unit.get("title"), unit.get("plate")) if v)
+            lines.append(
+                f"- Current unit: {label or unit['id']} (unit_id={unit['id']}). For follow-up questions about it, "
+                "omit query (Unit_history, vehicle_tracking_current) and unit_id (sensor_current)."
+            )
+        if self.date_range:
+            lines.append(
+                f"- Last date range: {self.date_range['from']} → {self.date_range['to']}. "
+                "Omit FromDate/ToDate to reuse it."
+            )
+        if not lines:
+            return None
+        return "CONVERSATION MEMORY:\n" + "\n".join(lines)
+
+
+_current: ContextVar[Optional[EntityMemory]] = ContextVar("entity_memory", default=None)
+
+
+def current() -> Optional[EntityMemory]:
+    return _current.get() if settings.entity_memory_enabled else None
+
+
+@contextmanager
+def activate(memory: Optional[EntityMemory]) -> Iterator[Optional[EntityMemory]]:
+    token = _current.set(memory)
+    try:
+        yield memory
+    finally:
+        _current.reset(token)
@@ -0,0 +1,246 @@
+"""
+fast_path.py
+────────────
+Deterministic, rule-based answers for the simplest high-volume questions, so they
+skip both LLM round trips (plan the tool call, then phrase the answer).
+
+Recognized intents (everything else falls through to the LLM):
+  current location   "ماشین 211 کجاست؟", "91-ع-587-15 الان کجاست", "موقعیت خودرو سعید شاکری نسب"
+  location history   "ماشین 211 دیروز کجا بوده؟", "خودرو سعید شاکری نسب از دیروز کجا بوده؟",
+                     "211 از 1405/02/01 تا 1405/02/10 کجا بوده"
+
+A message is only taken when:
+  • detect_query_context() agrees on the intent (monitoring / history)
+  • the whole message matches one template — no extra clauses, no conjunctions
+  • the unit is named explicitly: a unit prefix and a name ("ماشین 211", "خودرو سعید"),
+    a plate or a numeric id — a bare word ("انبار کجاست", "ماشینم کجاست") is not a unit
+  • the unit text holds no follow-up reference ("همین ماشین", "اون"), pronoun ("ماشین من"),
+    greeting ("سلام ماشین 211") or date word ("موقعیت ماشین 211 دیروز", "ماشین 211 فردا")
+  • the whole message is about one unit's position — no quantifiers (همه / تمام / کل /
+    چند), no plurals (ماشین‌ها، خودروهای ...) and no sensor words (دما / سوخت / سرعت /
+    باتری), checked before the unit prefix is stripped
+  • every date expression resolves through date_utils
+Then ApiTool is called directly and the answer is rendered by answer_templates —
+only for actions configured as "template" in settings.answer_render_modes.
+When the tool fails or finds nothing (not found, multiple matches, backend error)
+or the result cannot be rendered, the turn goes to the LLM, which can ask back
+or reinterpret the message.
+
+Usage:
+  answer = FastPath.try_answer(user_message, auth_context)
+  if answer is not None:
+      message, tool_calls = answer
+"""
+
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.config import get_settings
+from app.core import answer_templates
+from app.core.date_utils import resolve_date
+from app.core.logging_config import get_logger
+from app.core.metrics import FAST_PATH
+from app.core.prompts import detect_query_context
+from app.schema.Auth import AuthContext
+from app.schema.chat_schema import ToolCall
+from app.tools.API_tools import ApiTool
+
+settings = get_settings()
+logger = get_logger("fast_path")
+
+_FA_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹", "0123456789")
+
+# Iranian plate, full ("91-ع-587-15") or partial ("ع-267-15"), with - or spaces
+_PLATE_RE = re.compile(r"(?:\d{2}\s*[-\s]\s*)?[آ-ی]\s*[-\s]\s*\d{3}\s*[-\s]\s*\d{2}")
+
+_UNIT_PREFIX_RE = re.compile(r"^(?:ماشین|خودرو|کامیون|وانت|پلاک|واحد)\s+")
+_UNIT_ID_RE = re.compile(r"^\d{1,10}$")
+_QUESTION_TAIL = r"\s*[؟?!.]*\s*$"
+
+_DATE_WORDS = (
+    "امروز|دیروز|پریروز|هفته گذشته|هفته پیش|این هفته|ماه گذشته|ماه پیش|این ماه"
+    r"|\d+\s*روز (?:پیش|قبل)|\d{4}/\d{1,2}/\d{1,2}"
+)
+
+_CURRENT_PATTERNS = [
+    re.compile(rf"^(?P<unit>.+?)\s+(?:الان\s+|در حال حاضر\s+)?کجا\s*(?:ست|است|هست){_QUESTION_TAIL}"),
+    re.compile(rf"^موقعیت\s+(?:فعلی\s+|لحظه‌ای\s+)?(?P<unit>.+?){_QUESTION_TAIL}"),
+]
+
+_HISTORY_PATTERNS = [
+    re.compile(
+        rf"^(?P<unit>.+?)\s+از\s+(?P<from>{_DATE_WORDS})\s+تا\s+(?P<to>{_DATE_WORDS})\s+کجا(?:ها)?\s*بوده(?:\s*است)?{_QUESTION_TAIL}"
+    ),
+    re.compile(
+        rf"^(?P<unit>.+?)\s+از\s+(?P<since>{_DATE_WORDS})\s+(?:تا الان\s+|تا حالا\s+)?کجا(?:ها)?\s*بوده(?:\s*است)?{_QUESTION_TAIL}"
+    ),
+    re.compile(
+        rf"^(?P<unit>.+?)\s+(?P<date>{_DATE_WORDS})\s+کجا(?:ها)?\s*بوده(?:\s*است)?{_QUESTION_TAIL}"
+    ),
+]
+
+# Anything here means the message is more than a plain lookup, or refers back to history
+_DISQUALIFIERS = re.compile(
+    r"(?:^|\s)(?:و|یا|از|تا|همین|همون|اون|آن|این|اونها|قبلی|چرا|چطور|چند|چی|چیه|چیست|کجا|کجاست|است|هست|بود|بوده"
+    r"|بگو|بده|نشان|لطفا|لطفاً|دما|رطوبت|سنسور|آلارم|هشدار|راننده|سرعت)(?:\s|$)"
+)
+
+# Words that are never part of a unit name: dates and times, pronouns, greetings / thanks
+_NOT_A_NAME = re.compile(
+    r"(?:^|\s)(?:امروز|دیروز|پریروز|فردا|پس‌فردا|پسفردا|دیشب|امشب|الان|حالا|صبح|ظهر|عصر|شب|ساعت|روز|هفته|ماه|سال"
+    r"|گذشته|پیش|قبل|بعد|فروردین|اردیبهشت|خرداد|تیر|مرداد|شهریور|مهر|آبان|آذر|دی|بهمن|اسفند"
+    r"|من|ما|تو|شما|او|ایشان|خودم|خودمون|خودمان|مون|مان"
+    r"|سلام|درود|ممنون|مرسی|متشکرم|ممنونم|ببخشید|خسته نباشید|خداحافظ)(?:\s|$)"
+    r"|\d{4}/\d{1,2}/\d{1,2}"
+)
+
+# Fleet-wide or sensor questions, checked on the whole message: "موقعیت همه ماشین ها",
+# "موقعیت ماشین‌های فعال", "دمای ماشین 211 کجاست" are not single-unit location lookups
+_NOT_SINGLE_UNIT = re.compile(
+    r"(?:^|\s)(?:همه|همهٔ|تمام|تمامی|کل|کلیه|چند|چندتا|دما|دمای|سوخت|سرعت|باتری)(?:\s|$)"
+    r"|(?:^|\s)های?(?:\s|$)"          # "ماشین ها"
+    r"|\S\u200c?های?(?=[\s؟?!.،,]|$)"   # "ماشین‌ها", "خودروهای"
+)
+
+# "هفته گذشته" as a single history date means "from last week until today"
+_OPEN_ENDED_RANGES = {"هفته گذشته", "هفته پیش", "ماه گذشته", "ماه پیش", "این هفته", "این ماه"}
+
+
+class FastPathStats:
+    """In-process hit/miss counters, reported next to the health output."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {}
+
+    def incr(self, outcome: str) -> None:
+        with self._lock:
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        FAST_PATH.labels(outcome=outcome).inc()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        hits = counts.get("hit", 0)
+        return {
+            "total": total,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            **counts,
+        }
+
+
+stats = FastPathStats()
+
+
+class FastPath:
+
+    @staticmethod
+    def _extract_unit(raw: str) -> Optional[str]:
+        """
+        Plate if present (the tool wants ONE identifier), else a numeric id, else the
+        name after a unit prefix. None when the text does not clearly name one unit.
+        """
+        raw = raw.strip()
+        unit = _UNIT_PREFIX_RE.sub("", raw).strip(" ،,:")
+        if not unit or len(unit) > 40:
+            return None
+        if _DISQUALIFIERS.search(f" {unit} ") or _NOT_A_NAME.search(f" {unit} "):
+            return None
+        plate = _PLATE_RE.search(unit)
+        if plate:
+            return plate.group(0).strip()
+        if _UNIT_ID_RE.match(unit) or _UNIT_PREFIX_RE.match(raw):
+            return unit
+        return None
+
+    @staticmethod
+    def match(user_message: str) -> Optional[Dict[str, Any]]:
+        """Return tool arguments for a high-confidence simple intent, or None."""
+        text = " ".join(user_message.translate(_FA_DIGITS).split())
+        if not text or "\n" in user_message.strip():
+            return None
+
+        if _NOT_SINGLE_UNIT.search(text.replace("کجاها", "کجا")):
+            return None
+
+        context = detect_query_context(text)
+
+        if context == "history":
+            for pattern in _HISTORY_PATTERNS:
+                m = pattern.match(text)
+                if not m:
+                    continue
+                unit = FastPath._extract_unit(m.group("unit"))
+                if unit is None:
+                    return None
+                groups = m.groupdict()
+                if groups.get("date"):
+                    date = groups["date"]
+                    from_raw, to_raw = date, ("امروز" if date in _OPEN_ENDED_RANGES else date)
+                elif groups.get("since"):
+                    from_raw, to_raw = groups["since"], "امروز"
+                else:
+                    from_raw, to_raw = groups["from"], groups["to"]
+                if resolve_date(from_raw, "start")[1] or resolve_date(to_raw, "end")[1]:
+                    return None
+                return {"action": "Unit_history", "query": unit, "FromDate": from_raw, "ToDate": to_raw}
+            return None
+
+        if context == "monitoring":
+            for pattern in _CURRENT_PATTERNS:
+                m = pattern.match(text)
+                if not m:
+                    continue
+                unit = FastPath._extract_unit(m.group("unit"))
+                if unit is None:
+                    return None
+                return {"action": "vehicle_tracking_current", "query": unit}
+            return None
+
+        return None
+
+    @staticmethod
+    def try_answer(
+        user_message: str,
+        auth_context: AuthContext,
+    ) -> Optional[Tuple[str, List[ToolCall]]]:
+        """Answer without the LLM if the message is a recognized simple lookup."""
+        if not settings.fast_path_enabled:
+            return None
+
+        args = FastPath.match(user_message)
+        if args is None:
+            stats.incr("no_match")
+            return None
+        if settings.answer_render_modes.get(args["action"], "llm") != "template":
+            stats.incr("llm_mode")
+            return None
+
+        args["explanation"] = "fast path: deterministic intent match"
+        result = ApiTool.call_backend_api(
+            action=args["action"],
+            query=args.get("query"),
+            FromDate=args.get("FromDate"),
+            ToDate=args.get("ToDate"),
+            auth_context=auth_context,
+            explanation=args["explanation"],
+        )
+        tool_calls = [ToolCall(tool_name="call_backend_api", arguments=args, result=result)]
+
+        if not result.get("success"):
+            # Not found / multiple matches / backend error — let the LLM ask back or reinterpret
+            stats.incr("tool_failed")
+            logger.info(f"FAST_PATH tool failed action={args['action']} — answering with LLM")
+            return None
+
+        message = answer_templates.render(args["action"], result)
+        if message is None:
+            stats.incr("render_failed")
+            logger.warning(f"FAST_PATH render failed action={args['action']} — answering with LLM")
+            return None
+
+        stats.incr("hit")
+        logger.info(f"FAST_PATH hit action={args['action']} query={args.get('query')!r}")
+        return message, tool_calls
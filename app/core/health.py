@@ -0,0 +1,214 @@
+"""
+health.py
+─────────
+Background dependency checker behind /health, /health/live and /health/ready.
+
+Probes never run on the request path. A daemon thread probes every dependency
+every `health_check_interval` seconds and stores the outcome; the endpoints only
+read that snapshot, so a Kubernetes probe costs microseconds and never spends
+OpenAI quota or blocks the event loop.
+
+Dependencies:
+  openai         GET {openai_api_base}/models (one cached client, no SDK retries)
+  backend        GET {backend_api_url}
+  geocoder       GET {geocoder_url}
+  elasticsearch  ping() on the log shipper's client (disabled when ELASTICSEARCH_URL is unset)
+
+  A dependency is "up" when it answers below 500 within `health_check_timeout` —
+  a 401/404 from an unauthenticated probe still proves the service is serving.
+  It turns "down" only after `health_failure_threshold` consecutive failed probes,
+  so one slow probe does not flip readiness. A snapshot older than
+  `health_stale_after` seconds is reported as "unknown" (the checker itself is stuck).
+  In cassette replay mode openai/backend/geocoder are "disabled": nothing goes out.
+
+Readiness = every dependency in `health_ready_dependencies` is up or disabled.
+The list is empty by default, so readiness only reflects this process: when
+OpenAI or the backend is down every pod would otherwise turn unready at once and
+the service would lose all endpoints, including the Farsi error responses the
+breakers produce. Opt a dependency in only when another replica set could serve
+without it, e.g. HEALTH_READY_DEPENDENCIES='["backend"]'. The other dependencies
+are still probed and reported by /health and /health/ready, and /health turns
+"degraded" when any of them is down, whatever this list says.
+
+Usage:
+  from app.core import health
+
+  health.checker.start()          # app startup (idempotent)
+  health.checker.ready()          # (bool, {name: {...status, latency_ms, age_s...}})
+  health.checker.healthy()        # same shape, every dependency counts
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+from openai import OpenAI
+
+from app.config.config import get_settings
+from app.core import cassette
+from app.core.logging_config import ES_HOST, es_client, get_logger
+from app.core.metrics import DEPENDENCY_UP
+
+settings = get_settings()
+logger = get_logger("health")
+
+UP = "up"
+DOWN = "down"
+UNKNOWN = "unknown"
+DISABLED = "disabled"
+
+
+class DependencyStatus:
+    """Latest probe outcome of one dependency."""
+
+    __slots__ = ("name", "status", "latency_ms", "checked_at", "error", "consecutive_failures")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.status = UNKNOWN
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.consecutive_failures = 0
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        age = None if self.checked_at is None else round(now - self.checked_at, 1)
+        status = self.status
+        if status != DISABLED and (age is None or age > settings.health_stale_after):
+            status = UNKNOWN
+        return {
+            "status": status,
+            "latency_ms": self.latency_ms,
+            "age_s": age,
+            "error": self.error,
+        }
+
+
+# ── Probes (raise on failure) ─────────────────────────────────────────────────
+
+_openai_client: Optional[OpenAI] = None
+
+
+def _probe_openai() -> None:
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = OpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_api_base,
+            timeout=settings.health_check_timeout,
+            max_retries=0,
+        )
+    _openai_client.models.list()
+
+
+def _probe_http(url: str) -> None:
+    response = requests.get(url, timeout=settings.health_check_timeout)
+    if response.status_code >= 500:
+        raise RuntimeError(f"HTTP {response.status_code}")
+
+
+def _probe_elasticsearch() -> None:
+    if not es_client.options(request_timeout=settings.health_check_timeout).ping():
+        raise RuntimeError("ping failed")
+
+
+class HealthChecker:
+    """Probes dependencies on a background thread; readers get the cached result."""
+
+    def __init__(self):
+        self._probes: Dict[str, Callable[[], None]] = {
+            "openai": _probe_openai,
+            "backend": lambda: _probe_http(settings.backend_api_url),
+            "geocoder": lambda: _probe_http(settings.geocoder_url),
+            "elasticsearch": _probe_elasticsearch,
+        }
+        self._statuses = {name: DependencyStatus(name) for name in self._probes}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = time.time()
+
+    def _disabled(self, name: str) -> bool:
+        if name == "elasticsearch":
+            return not ES_HOST
+        return cassette.mode() == cassette.REPLAY
+
+    def _check(self, name: str) -> None:
+        status = self._statuses[name]
+        if self._disabled(name):
+            status.status, status.latency_ms, status.error = DISABLED, None, None
+            status.checked_at = time.time()
+            DEPENDENCY_UP.labels(dependency=name).set(1)
+            return
+
+        started = time.perf_counter()
+        try:
+            self._probes[name]()
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:200]
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        with self._lock:
+            previous = status.status
+            status.latency_ms = latency_ms
+            status.checked_at = time.time()
+            status.error = error
+            if error is None:
+                status.consecutive_failures = 0
+                status.status = UP
+            else:
+                status.consecutive_failures += 1
+                if status.consecutive_failures >= settings.health_failure_threshold or previous == UNKNOWN:
+                    status.status = DOWN
+        DEPENDENCY_UP.labels(dependency=name).set(1 if status.status == UP else 0)
+        if status.status != previous:
+            log = logger.info if status.status == UP else logger.warning
+            log(f"HEALTH {name} {previous} → {status.status} latency={latency_ms}ms error={error}")
+
+    def check_all(self) -> None:
+        for name in self._probes:
+            self._check(name)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.check_all()
+            self._stop.wait(settings.health_check_interval)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="health-checker", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return {name: status.snapshot(now) for name, status in self._statuses.items()}
+
+    def ready(self) -> Tuple[bool, Dict[str, Dict[str, Any]]]:
+        """Readiness: only the dependencies in settings.health_ready_dependencies count."""
+        dependencies = self.snapshot()
+        ok = all(
+            dependencies[name]["status"] in (UP, DISABLED)
+            for name in settings.health_ready_dependencies
+            if name in dependencies
+        )
+        return ok, dependencies
+
+    def healthy(self) -> Tuple[bool, Dict[str, Dict[str, Any]]]:
+        """Overall health for /health: every probed dependency counts."""
+        dependencies = self.snapshot()
+        return all(d["status"] in (UP, DISABLED) for d in dependencies.values()), dependencies
+
+
+checker = HealthChecker()
@@ -0,0 +1,96 @@
+"""
+jalali.py
+─────────
+Table-driven Jalali ↔ Gregorian conversion for Jalali years 1300–1500.
+
+jdatetime builds a full object (and runs the FarsiWeb day-count loop) for every
+conversion. Here the first day of every Jalali year is precomputed once as a
+Gregorian proleptic ordinal, so a conversion is a table lookup plus a bisect —
+cheap enough for the per-request date parsing and prompt building.
+
+The table follows the same 33-year leap rule as jdatetime, so results are
+identical across the whole range (checked against jdatetime by tests/test_jalali.py).
+
+Usage:
+  jalali_to_gregorian(1405, 2, 10)        → date(2026, 4, 30)
+  gregorian_to_jalali(date(2026, 4, 30))  → (1405, 2, 10)
+  format_jalali(date(2026, 4, 30))        → "1405/02/10"
+
+Out-of-range or invalid dates raise ValueError.
+"""
+
+from bisect import bisect_right
+from datetime import date
+from typing import Tuple
+
+MIN_YEAR = 1300
+MAX_YEAR = 1500
+
+# 1 Farvardin 1300 == 21 March 1921
+_ANCHOR_ORDINAL = date(1921, 3, 21).toordinal()
+
+# Day-of-year offset at which each Jalali month starts (months 1–6: 31 days, 7–11: 30, 12: 29/30)
+_MONTH_START = (0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336)
+
+_LEAP_REMAINDERS = frozenset((1, 5, 9, 13, 17, 22, 26, 30))
+
+
+def is_leap(year: int) -> bool:
+    """33-year cycle rule, as used by jdatetime."""
+    return year % 33 in _LEAP_REMAINDERS
+
+
+def _build_year_table() -> Tuple[int, ...]:
+    """Ordinal of 1 Farvardin for MIN_YEAR … MAX_YEAR + 1 (the last entry closes the range)."""
+    starts = []
+    ordinal = _ANCHOR_ORDINAL
+    for year in range(MIN_YEAR, MAX_YEAR + 2):
+        starts.append(ordinal)
+        ordinal += 366 if is_leap(year) else 365
+    return tuple(starts)
+
+
+_YEAR_START = _build_year_table()
+MIN_ORDINAL = _YEAR_START[0]
+MAX_ORDINAL = _YEAR_START[-1] - 1
+
+
+def month_length(year: int, month: int) -> int:
+    if month <= 6:
+        return 31
+    if month <= 11:
+        return 30
+    return 30 if is_leap(year) else 29
+
+
+def jalali_to_ordinal(year: int, month: int, day: int) -> int:
+    if not (MIN_YEAR <= year <= MAX_YEAR):
+        raise ValueError(f"Jalali year {year} outside supported range {MIN_YEAR}-{MAX_YEAR}")
+    if not (1 <= month <= 12):
+        raise ValueError(f"Invalid Jalali month: {month}")
+    if not (1 <= day <= month_length(year, month)):
+        raise ValueError(f"Invalid Jalali day: {year}/{month}/{day}")
+    return _YEAR_START[year - MIN_YEAR] + _MONTH_START[month - 1] + day - 1
+
+
+def ordinal_to_jalali(ordinal: int) -> Tuple[int, int, int]:
+    if not (MIN_ORDINAL <= ordinal <= MAX_ORDINAL):
+        raise ValueError(f"Date outside supported Jalali range {MIN_YEAR}-{MAX_YEAR}")
+    index = bisect_right(_YEAR_START, ordinal) - 1
+    day_of_year = ordinal - _YEAR_START[index]
+    month = bisect_right(_MONTH_START, day_of_year)
+    return MIN_YEAR + index, month, day_of_year - _MONTH_START[month - 1] + 1
+
+
+def jalali_to_gregorian(year: int, month: int, day: int) -> date:
+    return date.fromordinal(jalali_to_ordinal(year, month, day))
+
+
+def gregorian_to_jalali(value: date) -> Tuple[int, int, int]:
+    return ordinal_to_jalali(value.toordinal())
+
+
+def format_jalali(value: date, sep: str = "/") -> str:
+    year, month, day = gregorian_to_jalali(value)
+    return f"{year:04d}{sep}{month:02d}{sep}{day:02d}"
+
@@ -0,0 +1,169 @@
+"""
+lanes.py
+────────
+Priority lanes for the shared upstream pools, so background work (report
+generation, cache warmers, pollers) can run next to interactive chats without
+slowing them down.
+
+Lanes, highest priority first:
+  interactive  /api/chat turns (the default for any work that sets no lane)
+  streaming    streamed answers
+  batch        report generation, bulk exports
+  background   cache warmers, pollers
+
+Pools (per worker process):
+  llm      settings.lane_llm_pool_size concurrent LLM completions
+  backend  settings.lane_backend_pool_size concurrent upstream HTTP attempts
+           (fleet backend / geocoder, see upstream.py)
+
+Each lane may hold at most settings.lane_shares[lane] of a pool (interactive 1.0,
+so the rest of the pool is always kept free for it), and a free slot always goes
+to the highest-priority lane that is waiting: a lower lane never takes a slot
+while a higher one waits. An in-flight completion or HTTP call is not aborted —
+work is preempted at the next call boundary, and every LLM iteration and upstream
+attempt acquires its own slot.
+
+Waiting for a slot is bounded by the request deadline (deadline.py) or, for work
+without one, settings.lane_max_wait; then PoolBusy is raised.
+
+The lane travels in a ContextVar, like the deadline, so it follows the work into
+the threadpool.
+
+Usage:
+  from app.core import lanes
+
+  with lanes.use("batch"):                 # everything below runs in the batch lane
+      llm.chat(...)
+
+  with lanes.pool("llm").slot():           # raises PoolBusy
+      client.chat.completions.create(...)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator
+
+from app.config.config import get_settings
+from app.core import deadline
+from app.core.logging_config import get_logger
+from app.core.metrics import LANE_IN_USE, LANE_REJECTED, LANE_WAIT
+
+settings = get_settings()
+logger = get_logger("lanes")
+
+INTERACTIVE = "interactive"
+STREAMING = "streaming"
+BATCH = "batch"
+BACKGROUND = "background"
+LANES = (INTERACTIVE, STREAMING, BATCH, BACKGROUND)   # priority order
+
+_current: ContextVar[str] = ContextVar("lane", default=INTERACTIVE)
+
+
+class PoolBusy(TimeoutError):
+    """No slot in the pool became free for this lane within the allowed wait."""
+
+
+def current() -> str:
+    return _current.get()
+
+
+@contextmanager
+def use(lane: str) -> Iterator[str]:
+    if lane not in LANES:
+        raise ValueError(f"unknown lane {lane!r}, expected one of {LANES}")
+    token = _current.set(lane)
+    try:
+        yield lane
+    finally:
+        _current.reset(token)
+
+
+class Pool:
+    """A fixed number of slots shared by the lanes, handed out by priority."""
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = max(1, size)
+        self._cond = threading.Condition()
+        self._in_use = {lane: 0 for lane in LANES}
+        self._waiting = {lane: 0 for lane in LANES}
+        self.rejected = {lane: 0 for lane in LANES}
+
+    def cap(self, lane: str) -> int:
+        return max(1, int(self.size * settings.lane_shares.get(lane, 1.0)))
+
+    def _can_take(self, lane: str) -> bool:
+        if sum(self._in_use.values()) >= self.size or self._in_use[lane] >= self.cap(lane):
+            return False
+        return not any(self._waiting[higher] for higher in LANES[:LANES.index(lane)])
+
+    def _take(self, lane: str) -> None:
+        deadline_at = None
+        request_deadline = deadline.current()
+        max_wait = request_deadline.remaining() if request_deadline is not None else settings.lane_max_wait
+        with self._cond:
+            if not self._can_take(lane):
+                deadline_at = time.monotonic() + max_wait
+                self._waiting[lane] += 1
+                try:
+                    while not self._can_take(lane):
+                        remaining = deadline_at - time.monotonic()
+                        if remaining <= 0:
+                            self.rejected[lane] += 1
+                            LANE_REJECTED.labels(pool=self.name, lane=lane).inc()
+                            logger.warning(
+                                f"LANE busy pool={self.name} lane={lane} waited={max_wait:.2f}s in_use={self._in_use}"
+                            )
+                            raise PoolBusy(f"no {self.name} slot for lane {lane} within {max_wait:.1f}s")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting[lane] -= 1
+                    self._cond.notify_all()     # lower lanes may proceed once nobody above waits
+            self._in_use[lane] += 1
+        LANE_IN_USE.labels(pool=self.name, lane=lane).inc()
+
+    def _give_back(self, lane: str) -> None:
+        with self._cond:
+            self._in_use[lane] -= 1
+            self._cond.notify_all()
+        LANE_IN_USE.labels(pool=self.name, lane=lane).dec()
+
+    @contextmanager
+    def slot(self) -> Iterator[str]:
+        lane = current()
+        if not settings.lanes_enabled:
+            yield lane
+            return
+        started = time.perf_counter()
+        self._take(lane)
+        LANE_WAIT.labels(pool=self.name, lane=lane).observe(time.perf_counter() - started)
+        try:
+            yield lane
+        finally:
+            self._give_back(lane)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "size": self.size,
+                "in_use": dict(self._in_use),
+                "waiting": dict(self._waiting),
+                "rejected": dict(self.rejected),
+            }
+
+
+_pools = {
+    "llm": Pool("llm", settings.lane_llm_pool_size),
+    "backend": Pool("backend", settings.lane_backend_pool_size),
+}
+
+
+def pool(name: str) -> Pool:
+    return _pools[name]
+
+
+def stats() -> Dict[str, Any]:
+    return {name: p.stats() for name, p in _pools.items()}
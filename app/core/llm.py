@@ -1,17 +1,43 @@
-from openai import OpenAI
+from openai import OpenAI, APITimeoutError
 from typing import List, Dict, Any, Optional
-import json
+import time
 from app.config.config import get_settings
 from app.tools.API_tools import ApiTool
-from app.core.prompts import get_contextual_prompt
+from app.core.prompts import get_contextual_prompt, detect_query_context
+from app.core import answer_templates
+from app.core import answer_cache
+from app.core import cassette
+from app.core import entity_memory
+from app.core import lanes
+from app.core import load_shed
+from app.core import model_router
+from app.core import serialization
+from app.core import tracing
 from app.core.date_utils import resolve_date
+from app.core.deadline import Deadline, activate, current as current_deadline
+from app.core.fast_path import FastPath
+from app.core.tool_memo import ToolMemo
 from app.schema.chat_schema import ToolCall
 from app.schema.Auth import AuthContext
 from app.core.logging_config import get_logger
+from app.core.metrics import (
+    CHAT_ITERATIONS,
+    LLM_COMPLETION_TOKENS,
+    LLM_LATENCY,
+    LLM_PROMPT_TOKENS,
+    TOOL_LOOP_STOPS,
+    TOOL_MEMO_HITS,
+)
 
 settings = get_settings()
 logger = get_logger("llm")
 
+DEADLINE_MESSAGE = (
+    "متأسفانه زمان پردازش درخواست به پایان رسید. "
+    "لطفاً دوباره تلاش کنید یا سؤال را ساده‌تر مطرح کنید."
+)
+MAX_ITERATIONS_MESSAGE = "متأسفانه تعداد مراحل از حد مجاز گذشت."
+
 
 class LLMClient:
     """OpenAI client with API tool integration"""
@@ -24,61 +50,125 @@ class LLMClient:
     def __init__(self):
         self.client = OpenAI(
             api_key=settings.openai_api_key,
-            base_url=settings.openai_api_base
+            base_url=settings.openai_api_base,
+            http_client=cassette.openai_http_client(),
         )
         self.model = settings.openai_model
         self.tools = [ApiTool.get_tool_definition()]
+        self.llm_calls = 0   # completions made for the current request (one client per request)
+        self.tokens_used = 0   # prompt + completion tokens of the current request (per-user quota)
 
     def chat(
         self,
         user_message: str,
         auth_context: AuthContext,
         conversation_history: Optional[List[Dict[str, str]]] = None,
+        deadline: Optional[Deadline] = None,
     ) -> tuple[str, List[ToolCall]]:
         """
         Process a chat message with API tool calling.
 
+        When `deadline` is given, every LLM completion and upstream call is bounded by
+        the remaining budget; once it runs out the loop stops and returns the best
+        partial answer instead of raising.
+
+        Repeated questions from the same user are served from answer_cache.
+
         Returns:
             tuple: (assistant_message, list_of_tool_calls)
         """
-        system_prompt = get_contextual_prompt(user_message)
+        with activate(deadline):
+            memory = entity_memory.current()
+            cache_key, context = answer_cache.make_key(
+                user_message, auth_context, conversation_history,
+                entities=memory.to_state() if memory is not None else None,
+            )
+            with tracing.span("answer_cache", context=context) as cache_span:
+                cached = answer_cache.get(cache_key)
+                cache_span.set("hit", cached is not None)
+            if cached is not None:
+                message, tool_calls, entities = cached
+                if memory is not None and entities is not None:
+                    memory.restore(entities)
+                logger.info(f"ANSWER_CACHE hit context={context}")
+                return message, tool_calls
 
-        messages: List[Dict] = [{"role": "system", "content": system_prompt}]
+            self.llm_calls = 0
+            message, tool_calls = self._chat(user_message, auth_context, conversation_history)
+            CHAT_ITERATIONS.observe(self.llm_calls)
 
-        # ── conversation history ──────────────────────────────────────────────
-        if conversation_history:
-            for msg in conversation_history:
-                if hasattr(msg, 'role'):
-                    messages.append({"role": msg.role, "content": msg.content})
-                else:
-                    messages.append(msg)
+            complete = message not in (DEADLINE_MESSAGE, MAX_ITERATIONS_MESSAGE) and (
+                deadline is None or deadline.remaining() >= settings.llm_min_call_budget
+            )
+            answer_cache.put(
+                cache_key, context, message, tool_calls, cacheable=complete,
+                entities=memory.to_state() if memory is not None and memory.changed else None,
+            )
+            return message, tool_calls
+
+    def _chat(
+        self,
+        user_message: str,
+        auth_context: AuthContext,
+        conversation_history: Optional[List[Dict[str, str]]],
+    ) -> tuple[str, List[ToolCall]]:
+        # ── fast path: simple lookups answered from templates, no LLM ─────────
+        with tracing.span("fast_path") as fast_span:
+            fast_answer = FastPath.try_answer(user_message, auth_context)
+            fast_span.set("hit", fast_answer is not None)
+        if fast_answer is not None:
+            return fast_answer
+
+        with tracing.span("prompt_build") as prompt_span:
+            system_prompt = get_contextual_prompt(user_message)
+            memory = entity_memory.current()
+            memory_note = memory.prompt_note() if memory is not None else None
+            if memory_note:
+                system_prompt = f"{system_prompt}\n\n{memory_note}"
+
+            messages: List[Dict] = [{"role": "system", "content": system_prompt}]
+
+            # ── conversation history ──────────────────────────────────────────
+            if conversation_history:
+                for msg in conversation_history:
+                    if hasattr(msg, 'role'):
+                        messages.append({"role": msg.role, "content": msg.content})
+                    else:
+                        messages.append(msg)
 
-        # ── always append current user message last ───────────────────────────
-        messages.append({"role": "user", "content": user_message})
+            # ── always append current user message last ───────────────────────
+            messages.append({"role": "user", "content": user_message})
+            prompt_span.set("messages", len(messages))
 
         tool_calls_made: List[ToolCall] = []
+        route = model_router.Route(user_message)
+        memo = ToolMemo()
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            tools=self.tools,
-            tool_choice="auto",
-            max_tokens=1024,
-        )
-        logger.debug(f"LLM call model={self.model} prompt_tokens={response.usage.prompt_tokens}")
+        response = self._complete(messages, route)
+        if response is None:
+            return self._partial_answer(messages, tool_calls_made), tool_calls_made
 
         max_iterations = 10
-        for _ in range(max_iterations):
+        for iteration in range(max_iterations):
             assistant_message = response.choices[0].message
 
             if not assistant_message.tool_calls:
                 return assistant_message.content, tool_calls_made
 
+            if route.tier == model_router.FAST and not self._valid_tool_calls(assistant_message):
+                route.escalate("bad_tool_call")
+                response = self._complete(messages, route)
+                if response is None:
+                    return self._partial_answer(messages, tool_calls_made), tool_calls_made
+                continue
+
             messages.append(assistant_message)
 
+            round_keys: List[str] = []
+            new_calls = 0
             for tool_call in assistant_message.tool_calls:
                 function_name = tool_call.function.name
-                function_args = json.loads(tool_call.function.arguments)
+                function_args = serialization.loads(tool_call.function.arguments)
 
                 logger.info(f"TOOL_CALL fn={function_name} args={function_args}")
 
@@ -87,31 +177,166 @@ class LLMClient:
                 # resolve them here before they reach the API layer.
                 function_args = self._resolve_dates_in_args(function_args)
 
-                result = self._execute_tool(function_name, function_args, auth_context)
-
-                tool_calls_made.append(ToolCall(
-                    tool_name=function_name,
-                    arguments=function_args,
-                    result=result,
-                ))
+                # ── per-turn memo: an identical call gets the earlier success ──
+                key = memo.key(function_name, function_args)
+                round_keys.append(key)
+                result = memo.get(key)
+                if result is not None:
+                    TOOL_MEMO_HITS.labels(action=function_args.get("action", function_name)).inc()
+                    logger.info(f"TOOL_MEMO hit fn={function_name} action={function_args.get('action')}")
+                else:
+                    result = self._execute_tool(function_name, function_args, auth_context)
+                    memo.put(key, result)
+                    new_calls += 1
+                    tool_calls_made.append(ToolCall(
+                        tool_name=function_name,
+                        arguments=function_args,
+                        result=result,
+                    ))
 
                 messages.append({
                     "role": "tool",
                     "tool_call_id": tool_call.id,
-                    "content": json.dumps(result, ensure_ascii=False),
+                    "content": serialization.dumps(result),
                 })
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=self.tools,
-                tool_choice="auto",
-                max_tokens=1024,
-            )
-            logger.debug(f"LLM call model={self.model} prompt_tokens={response.usage.prompt_tokens}")
+            # ── templated final answer: skip the synthesis LLM call ──────────
+            templated = self._templated_answer(user_message, tool_calls_made)
+            if templated is not None:
+                logger.info(f"TEMPLATE_ANSWER action={tool_calls_made[0].arguments.get('action')} — LLM synthesis skipped")
+                return templated, tool_calls_made
+
+            # ── loop detection: nothing new was asked → answer now ───────────
+            pattern = memo.end_round(round_keys, new_calls)
+            if pattern is not None:
+                TOOL_LOOP_STOPS.labels(pattern=pattern).inc()
+                logger.warning(
+                    f"TOOL_LOOP pattern={pattern} llm_calls={self.llm_calls} memo_hits={memo.hits} "
+                    f"iterations_saved={max_iterations - iteration - 1}"
+                )
+                return self._final_answer(messages, tool_calls_made, route), tool_calls_made
+
+            route.after_tools(tool_calls_made)
+            response = self._complete(messages, route)
+            if response is None:
+                return self._partial_answer(messages, tool_calls_made), tool_calls_made
 
         logger.warning(f"MAX_ITERATIONS reached after {max_iterations} loops")
-        return "متأسفانه تعداد مراحل از حد مجاز گذشت.", tool_calls_made
+        return MAX_ITERATIONS_MESSAGE, tool_calls_made
+
+    def _final_answer(self, messages: List[Any], tool_calls_made: List[ToolCall], route: model_router.Route) -> str:
+        """One last completion without tools once the loop stopped making progress."""
+        response = self._complete(messages, route, tool_choice="none")
+        if response is not None and response.choices[0].message.content:
+            return response.choices[0].message.content
+        return self._partial_answer(messages, tool_calls_made)
+
+    def _complete(self, messages: List[Dict], route: model_router.Route, tool_choice: str = "auto"):
+        """
+        One completion call on the route's model tier (model_router.py), bounded by
+        the request deadline, in a slot of the LLM pool for the current priority
+        lane (lanes.py).
+        Returns None when there is not enough budget left for a useful LLM call.
+        """
+        try:
+            with lanes.pool("llm").slot() as lane:
+                return self._create(messages, route.model(), route.tier, lane, tool_choice)
+        except lanes.PoolBusy as e:
+            logger.warning(f"DEADLINE no LLM slot: {e}")
+            return None
+
+    def _create(self, messages: List[Dict], model: str, tier: str, lane: str, tool_choice: str):
+        request_deadline = current_deadline()
+        client = self.client
+        if request_deadline is not None:
+            remaining = request_deadline.remaining()
+            if remaining < settings.llm_min_call_budget:
+                logger.warning(f"DEADLINE skip LLM call remaining={remaining:.2f}s")
+                return None
+            # No SDK-level retries under a deadline — each retry would get the full budget again
+            client = self.client.with_options(timeout=remaining, max_retries=0)
+
+        self.llm_calls += 1
+        with tracing.span("llm", model=model, tier=tier, iteration=self.llm_calls, lane=lane) as llm_span:
+            started = time.perf_counter()
+            try:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    tools=self.tools,
+                    tool_choice=tool_choice,
+                    max_tokens=1024,
+                )
+            except APITimeoutError as e:
+                LLM_LATENCY.labels(model=model, tier=tier).observe(time.perf_counter() - started)
+                load_shed.observe(f"llm:{tier}", time.perf_counter() - started)
+                if request_deadline is not None:
+                    llm_span.fail(e)
+                    logger.warning(f"DEADLINE LLM call timed out budget={request_deadline.budget:.1f}s")
+                    return None
+                raise
+            LLM_LATENCY.labels(model=model, tier=tier).observe(time.perf_counter() - started)
+            load_shed.observe(f"llm:{tier}", time.perf_counter() - started)
+
+            # OpenAI-compatible providers may omit usage or send null counts
+            prompt_tokens = getattr(response.usage, "prompt_tokens", None)
+            completion_tokens = getattr(response.usage, "completion_tokens", None)
+            self.tokens_used += (prompt_tokens or 0) + (completion_tokens or 0)
+            if prompt_tokens is not None:
+                LLM_PROMPT_TOKENS.labels(model=model).observe(prompt_tokens)
+                llm_span.set("prompt_tokens", prompt_tokens)
+            if completion_tokens is not None:
+                LLM_COMPLETION_TOKENS.labels(model=model).observe(completion_tokens)
+                llm_span.set("completion_tokens", completion_tokens)
+            logger.debug(f"LLM call model={model} tier={tier} prompt_tokens={prompt_tokens}")
+            llm_span.set("tool_calls", len(response.choices[0].message.tool_calls or []))
+        return response
+
+    @staticmethod
+    def _valid_tool_calls(assistant_message: Any) -> bool:
+        """True when every tool call's arguments parse as a JSON object."""
+        for tool_call in assistant_message.tool_calls:
+            try:
+                if not isinstance(serialization.loads(tool_call.function.arguments), dict):
+                    return False
+            except (TypeError, ValueError):
+                return False
+        return True
+
+    @staticmethod
+    def _templated_answer(user_message: str, tool_calls_made: List[ToolCall]) -> Optional[str]:
+        """
+        Render the final answer from the tool result when it is unambiguous:
+        exactly one tool call this turn, its action is configured as "template",
+        and it is the action that answers this type of question.
+        """
+        if len(tool_calls_made) != 1:
+            return None
+        call = tool_calls_made[0]
+        action = call.arguments.get("action", "")
+        if settings.answer_render_modes.get(action, "llm") != "template":
+            return None
+        if answer_templates.CONTEXT_ACTIONS.get(detect_query_context(user_message)) != action:
+            return None
+        return answer_templates.render(action, call.result)
+
+    @staticmethod
+    def _partial_answer(messages: List[Any], tool_calls_made: List[ToolCall]) -> str:
+        """Best answer available when the deadline cuts the loop short."""
+        for msg in reversed(messages):
+            if isinstance(msg, dict):
+                if msg.get("role") == "user":
+                    break
+                continue
+            if getattr(msg, "content", None):
+                return msg.content
+
+        # No LLM text yet — fall back to a template over the latest successful tool result
+        for call in reversed(tool_calls_made):
+            rendered = answer_templates.render(call.arguments.get("action", ""), call.result)
+            if rendered is not None:
+                return rendered
+        return DEADLINE_MESSAGE
 
     @staticmethod
     def _resolve_dates_in_args(args: Dict[str, Any]) -> Dict[str, Any]:
@@ -157,6 +382,11 @@ class LLMClient:
 
     def _execute_tool(self, function_name: str, arguments: Dict[str, Any],
                       auth_context: AuthContext) -> Dict[str, Any]:
+        request_deadline = current_deadline()
+        if request_deadline is not None and request_deadline.expired:
+            logger.warning(f"DEADLINE skip tool fn={function_name}")
+            return {"success": False, "error": "زمان پردازش درخواست به پایان رسید."}
+
         if function_name == "call_backend_api":
             return ApiTool.call_backend_api(
                 action=arguments.get("action", ""),
@@ -0,0 +1,224 @@
+"""
+load_shed.py
+────────────
+Adaptive concurrency limit in front of /api/chat (one limiter per worker process).
+
+When the LLM provider or the fleet backend slows down, every admitted request
+holds a worker slot longer; admitting more only makes all of them time out. The
+limiter keeps the number of chats in flight near what the upstreams currently
+sustain and rejects the rest early with 503, so the requests that are admitted
+still finish inside their deadline.
+
+Latency signals (observe(), called by LLMClient and upstream.py per call):
+  "llm:<tier>"  one completion call on a model tier (model_router.py: fast / strong)
+  "backend"     one upstream HTTP attempt (fleet backend / geocoder)
+  For each signal a short EWMA tracks current latency and a baseline tracks its
+  healthy value (it follows drops quickly and rises only slowly, so a sustained
+  slowdown keeps shrinking the limit for a while). As in a gradient limiter:
+  gradient = tolerance × baseline / current, clamped to [0.5, 1]. The worst
+  signal drives the limit.
+
+Limit update (after every finished request, gradient + AIMD):
+  new = limit × gradient + √limit          (the √limit headroom probes for capacity;
+                                            only added while the limit is actually used)
+  limit ← limit × (1 − smoothing) + new × smoothing, within [min_limit, max_limit]
+  A request that ran out of budget (its answer was cut short by the deadline)
+  backs off multiplicatively instead: new = limit × load_shed_backoff.
+
+Admission:
+  in flight < limit  → run now
+  otherwise          → wait in a FIFO queue of at most load_shed_max_queue requests,
+                       for at most load_shed_queue_timeout seconds (or the request
+                       deadline, whichever is shorter)
+  queue full / wait timed out → Overloaded (→ 503 with Retry-After)
+
+Usage:
+  from app.core import load_shed
+
+  async with load_shed.limiter.slot(max_wait=deadline.remaining()) as slot:   # raises Overloaded
+      ...
+      slot.timed_out = True     # when the request ran out of its deadline
+"""
+
+import asyncio
+import math
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from app.config.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import LOAD_SHED, LOAD_SHED_LIMIT, LOAD_SHED_QUEUE
+
+settings = get_settings()
+logger = get_logger("load_shed")
+
+_SHORT_ALPHA = 0.2         # current latency: last ~5 calls
+_BASELINE_DOWN = 0.1       # the baseline follows improvements quickly ...
+_BASELINE_UP = 0.002       # ... and degradations only over ~500 calls
+
+
+class Overloaded(Exception):
+    """The adaptive limit is reached and the wait queue is full or timed out."""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(f"overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class _Signal:
+    __slots__ = ("short", "long")
+
+    def __init__(self):
+        self.short: Optional[float] = None
+        self.long: Optional[float] = None
+
+    def add(self, seconds: float) -> None:
+        if self.short is None:
+            self.short = self.long = seconds
+            return
+        self.short += _SHORT_ALPHA * (seconds - self.short)
+        self.long += (_BASELINE_DOWN if self.short < self.long else _BASELINE_UP) * (self.short - self.long)
+
+    def gradient(self) -> float:
+        if not self.short or self.long is None:
+            return 1.0
+        return max(0.5, min(1.0, settings.load_shed_tolerance * self.long / self.short))
+
+
+class Slot:
+    __slots__ = ("timed_out",)
+
+    def __init__(self):
+        self.timed_out = False
+
+
+class AdaptiveLimiter:
+    def __init__(self):
+        self.limit = float(settings.load_shed_initial_limit)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._signals: Dict[str, _Signal] = {}
+        self._signals_lock = threading.Lock()   # observe() runs in threadpool workers
+        self.shed = 0
+        LOAD_SHED_LIMIT.set(self.limit)
+
+    # ── signals (thread-safe) ─────────────────────────────────────────────────
+
+    def observe(self, kind: str, seconds: float) -> None:
+        with self._signals_lock:
+            signal = self._signals.get(kind)
+            if signal is None:
+                signal = self._signals[kind] = _Signal()
+            signal.add(seconds)
+
+    def _gradient(self) -> float:
+        with self._signals_lock:
+            return min((s.gradient() for s in self._signals.values()), default=1.0)
+
+    # ── limit (event loop only) ───────────────────────────────────────────────
+
+    def _update_limit(self, timed_out: bool) -> None:
+        if timed_out:
+            new = self.limit * settings.load_shed_backoff
+        else:
+            new = self.limit * self._gradient()
+            if self.in_flight + 1 >= self.limit / 2:    # +1: the request being released
+                new += math.sqrt(self.limit)
+        smoothed = self.limit * (1 - settings.load_shed_smoothing) + new * settings.load_shed_smoothing
+        self.limit = max(float(settings.load_shed_min_limit), min(float(settings.load_shed_max_limit), smoothed))
+        LOAD_SHED_LIMIT.set(self.limit)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():               # timed out / cancelled meanwhile
+                continue
+            self.in_flight += 1             # the slot is handed over, not re-contended
+            waiter.set_result(None)
+        LOAD_SHED_QUEUE.set(len(self._waiters))
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.shed += 1
+        LOAD_SHED.labels(reason=reason).inc()
+        logger.warning(
+            f"LOAD_SHED reason={reason} limit={self.limit:.1f} in_flight={self.in_flight} queued={len(self._waiters)}"
+        )
+        return Overloaded(reason)
+
+    async def _acquire(self, max_wait: Optional[float]) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= settings.load_shed_max_queue:
+            raise self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        LOAD_SHED_QUEUE.set(len(self._waiters))
+        timeout = settings.load_shed_queue_timeout if max_wait is None else min(settings.load_shed_queue_timeout, max_wait)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return                      # slot arrived together with the timeout
+            raise self._reject("queue_timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():   # slot handed over, but the client left
+                self.in_flight -= 1
+                self._wake()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+            try:
+                self._waiters.remove(waiter)   # left the queue without being handed a slot
+            except ValueError:
+                pass
+            LOAD_SHED_QUEUE.set(len(self._waiters))
+
+    def _release(self, timed_out: bool) -> None:
+        self.in_flight -= 1
+        self._update_limit(timed_out)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, max_wait: Optional[float] = None) -> AsyncIterator[Slot]:
+        if not settings.load_shed_enabled:
+            yield Slot()
+            return
+        await self._acquire(max_wait)
+        slot = Slot()
+        try:
+            yield slot
+        finally:
+            self._release(slot.timed_out)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._signals_lock:
+            signals = {
+                kind: {"current_ms": round(s.short * 1000, 1), "baseline_ms": round(s.long * 1000, 1)}
+                for kind, s in self._signals.items() if s.short is not None
+            }
+        return {
+            "limit": round(self.limit, 1),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "shed": self.shed,
+            "latency": signals,
+        }
+
+
+limiter = AdaptiveLimiter()
+
+
+def observe(kind: str, seconds: float) -> None:
+    """Feed one upstream call latency to the limiter (any thread)."""
+    if settings.load_shed_enabled:
+        limiter.observe(kind, seconds)
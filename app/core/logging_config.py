@@ -5,6 +5,8 @@ from datetime import datetime
 from logging.handlers import RotatingFileHandler
 from elasticsearch import Elasticsearch
 
+from app.core.serialization import es_serializer
+
 # ── Directory for file logs ───────────────────────────────────────────────────
 LOG_DIR = "logs"
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -15,7 +17,9 @@ ES_INDEX = os.getenv("ELASTICSEARCH_INDEX")
 ES_API_KEY_ENCODE = os.getenv("ELASTICSEARCH_API_KEY_ENCODE")
 APP_ENV = os.getenv("ENVIRONMENT", "demo")
 
-es_client = Elasticsearch(ES_HOST, api_key=ES_API_KEY_ENCODE, verify_certs=False, request_timeout=10)
+es_client = Elasticsearch(
+    ES_HOST, api_key=ES_API_KEY_ENCODE, verify_certs=False, request_timeout=10, serializer=es_serializer,
+)
 
 
 class ElasticsearchHandler(logging.Handler):
@@ -0,0 +1,181 @@
+"""
+metrics.py
+──────────
+Prometheus metrics for the chat pipeline, served at GET /metrics.
+
+All metrics are module-level singletons from prometheus_client; observing them
+is a few atomic adds, so instrumentation stays on the hot path.
+
+Multi-worker deployments (several uvicorn workers per pod):
+  set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory shared by the
+  workers (wiped on pod start). prometheus_client then writes per-process files
+  and /metrics aggregates them across workers on scrape.
+
+Metric families:
+  chat_request_duration_seconds{status}          end-to-end /api/chat latency
+  chat_requests_in_flight                        concurrent /api/chat requests
+  chat_llm_iterations                            LLM completions per request
+  llm_call_duration_seconds{model,tier}          one completion call (tier: fast / strong)
+  llm_escalations_total{reason}                  fast-tier turns moved to the strong tier
+  llm_prompt_tokens{model} / llm_completion_tokens{model}   tokens per iteration
+  tool_call_duration_seconds{action,outcome}     one ApiTool action
+  tool_memo_hits_total{action}                   repeated tool calls answered from the per-turn memo
+  tool_loop_stops_total{pattern}                 tool loops ended early (repeat / cycle)
+  upstream_request_duration_seconds{endpoint,status}  one HTTP attempt
+  upstream_coalesced_total{endpoint}             GETs served by single-flight
+  upstream_retries_total{endpoint}               retry attempts
+  geocode_duration_seconds{outcome}              reverse geocoding
+  cache_requests_total{cache,result}             answer cache hit / miss
+  fast_path_total{outcome}                       fast path hit / no_match / ...
+  rate_limited_total{reason}                     /api/chat requests rejected with 429
+  load_shed_limit                                current adaptive concurrency limit (sum over workers)
+  load_shed_queue_depth                          requests waiting for a slot
+  load_shed_total{reason}                        requests rejected with 503 (queue_full / queue_timeout)
+  lane_slots_in_use{pool,lane}                   LLM / backend pool slots held per priority lane
+  lane_wait_seconds{pool,lane}                   time waited for a pool slot
+  lane_rejected_total{pool,lane}                 waits that ran out of time (PoolBusy)
+  dependency_up{dependency}                      last background health probe (1 up, 0 down)
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60)
+_TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+CHAT_LATENCY = Histogram(
+    "chat_request_duration_seconds", "End-to-end /api/chat latency",
+    ["status"], buckets=_LATENCY_BUCKETS,
+)
+CHAT_IN_FLIGHT = Gauge(
+    "chat_requests_in_flight", "Concurrent /api/chat requests",
+    multiprocess_mode="livesum",
+)
+CHAT_ITERATIONS = Histogram(
+    "chat_llm_iterations", "LLM completion calls per chat request",
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10),
+)
+
+LLM_LATENCY = Histogram(
+    "llm_call_duration_seconds", "Latency of one LLM completion call",
+    ["model", "tier"], buckets=_LATENCY_BUCKETS,
+)
+LLM_ESCALATIONS = Counter(
+    "llm_escalations_total", "Chat turns escalated from the fast to the strong model tier",
+    ["reason"],
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens", "Prompt tokens per LLM iteration",
+    ["model"], buckets=_TOKEN_BUCKETS,
+)
+LLM_COMPLETION_TOKENS = Histogram(
+    "llm_completion_tokens", "Completion tokens per LLM iteration",
+    ["model"], buckets=(10, 50, 100, 250, 500, 1000, 2000),
+)
+
+TOOL_LATENCY = Histogram(
+    "tool_call_duration_seconds", "Latency of one tool (ApiTool action) call",
+    ["action", "outcome"], buckets=_LATENCY_BUCKETS,
+)
+
+TOOL_MEMO_HITS = Counter(
+    "tool_memo_hits_total", "Repeated tool calls answered from the per-turn memo",
+    ["action"],
+)
+TOOL_LOOP_STOPS = Counter(
+    "tool_loop_stops_total", "LLM tool loops ended early because no new call was made",
+    ["pattern"],
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Latency of one upstream HTTP attempt",
+    ["endpoint", "status"], buckets=_LATENCY_BUCKETS,
+)
+UPSTREAM_COALESCED = Counter(
+    "upstream_coalesced_total", "Upstream GETs served by an identical in-flight call",
+    ["endpoint"],
+)
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries_total", "Upstream retry attempts",
+    ["endpoint"],
+)
+
+GEOCODE_LATENCY = Histogram(
+    "geocode_duration_seconds", "Reverse geocoding latency",
+    ["outcome"], buckets=_LATENCY_BUCKETS,
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups",
+    ["cache", "result"],
+)
+SQL_CACHE_INVALIDATIONS = Counter(
+    "sql_cache_invalidations_total", "SQL result cache invalidations",
+    ["table"],
+)
+SQL_CACHE_SKIPPED = Counter(
+    "sql_cache_skipped_total", "SQL results not stored in the result cache",
+    ["reason"],
+)
+FAST_PATH = Counter(
+    "fast_path_total", "Fast path outcomes",
+    ["outcome"],
+)
+
+RATE_LIMITED = Counter(
+    "rate_limited_total", "/api/chat requests rejected by per-user limits",
+    ["reason"],
+)
+
+LOAD_SHED_LIMIT = Gauge(
+    "load_shed_limit", "Adaptive /api/chat concurrency limit",
+    multiprocess_mode="livesum",
+)
+LOAD_SHED_QUEUE = Gauge(
+    "load_shed_queue_depth", "/api/chat requests waiting for a concurrency slot",
+    multiprocess_mode="livesum",
+)
+LOAD_SHED = Counter(
+    "load_shed_total", "/api/chat requests rejected by the adaptive limiter",
+    ["reason"],
+)
+
+LANE_IN_USE = Gauge(
+    "lane_slots_in_use", "LLM / backend pool slots held by a priority lane",
+    ["pool", "lane"], multiprocess_mode="livesum",
+)
+LANE_WAIT = Histogram(
+    "lane_wait_seconds", "Time waited for an LLM / backend pool slot",
+    ["pool", "lane"], buckets=_LATENCY_BUCKETS,
+)
+LANE_REJECTED = Counter(
+    "lane_rejected_total", "Pool slot waits that ran out of time",
+    ["pool", "lane"],
+)
+
+DEPENDENCY_UP = Gauge(
+    "dependency_up", "Last background health probe of a dependency (1 = up or disabled)",
+    ["dependency"], multiprocess_mode="livemin",
+)
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Exposition payload; aggregates all workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    from prometheus_client import REGISTRY
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,86 @@
+"""
+model_router.py
+───────────────
+Picks the LLM model per chat turn and per iteration.
+
+Tiers:
+  fast    settings.model_fast — cheap, low-latency model
+  strong  settings.openai_model — the default model for everything else
+
+A turn starts on the fast tier when it looks like a single-tool lookup:
+detect_query_context() finds one of settings.model_fast_contexts and the
+message is at most settings.model_fast_max_chars long. Such a turn stays on
+the fast tier for tool selection and the final phrasing. Every other turn
+(multi-step, ambiguous, no recognised context) uses the strong tier throughout.
+
+Escalation (fast → strong, for the rest of the turn):
+  tool_error      a tool call came back with success=False
+  bad_tool_call   the fast model produced tool arguments that are not valid JSON
+  too_many_steps  more than settings.model_fast_max_tool_calls tool calls
+Tool results already in the conversation are kept, so the strong model
+continues from where the fast one stopped.
+
+With settings.model_routing_enabled off, every call uses settings.openai_model.
+Routing is also skipped (with a warning at startup) when model_fast is the same
+model as openai_model — both default to gpt-4o-mini, so set MODEL_FAST or
+OPENAI_MODEL to get two tiers.
+
+Usage:
+  from app.core.model_router import Route
+
+  route = Route(user_message)
+  model, tier = route.model(), route.tier
+  route.after_tools(tool_calls_made)       # may escalate
+"""
+
+from typing import List, Optional
+
+from app.config.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import LLM_ESCALATIONS
+from app.core.prompts import detect_query_context
+from app.schema.chat_schema import ToolCall
+
+settings = get_settings()
+logger = get_logger("model_router")
+
+FAST = "fast"
+STRONG = "strong"
+
+_routing = settings.model_routing_enabled and settings.model_fast != settings.openai_model
+if settings.model_routing_enabled and not _routing:
+    logger.warning(f"MODEL_FAST == OPENAI_MODEL ({settings.openai_model}) — model routing disabled, one tier only")
+
+
+class Route:
+    """Model tier of one chat turn."""
+
+    def __init__(self, user_message: str):
+        self.context = detect_query_context(user_message)
+        simple = (
+            _routing
+            and self.context in settings.model_fast_contexts
+            and len(user_message) <= settings.model_fast_max_chars
+        )
+        self.tier = FAST if simple else STRONG
+        self.escalated: Optional[str] = None
+
+    def model(self) -> str:
+        return settings.model_fast if self.tier == FAST else settings.openai_model
+
+    def escalate(self, reason: str) -> None:
+        if self.tier == STRONG:
+            return
+        self.tier = STRONG
+        self.escalated = reason
+        LLM_ESCALATIONS.labels(reason=reason).inc()
+        logger.info(f"MODEL_ESCALATE context={self.context} reason={reason} → {settings.openai_model}")
+
+    def after_tools(self, tool_calls_made: List[ToolCall]) -> None:
+        """Escalate when the tools the fast model chose failed or the turn grew multi-step."""
+        if self.tier == STRONG:
+            return
+        if any(isinstance(c.result, dict) and c.result.get("success") is False for c in tool_calls_made):
+            self.escalate("tool_error")
+        elif len(tool_calls_made) > settings.model_fast_max_tool_calls:
+            self.escalate("too_many_steps")
@@ -1,6 +1,7 @@
-import jdatetime
 from datetime import datetime, timezone, timedelta
 
+from app.core.jalali import format_jalali
+
 IRAN_TZ = timezone(timedelta(hours=3, minutes=30))
 
 # ════════════════════════════════════════════════════════════
@@ -401,16 +402,17 @@ CONTEXT_PROMPTS = {
 
 def _build_date_context() -> str:
     now_iran = datetime.now(IRAN_TZ)
-    now_jalali = jdatetime.datetime.fromgregorian(datetime=now_iran)
+    today_jalali = format_jalali(now_iran.date())
+    yesterday_jalali = format_jalali(now_iran.date() - timedelta(days=1))
     return f"""
 CURRENT DATE/TIME (inject at every request):
   Gregorian : {now_iran.strftime('%Y-%m-%d %H:%M')} (Iran local, UTC+3:30)
-  Jalali    : {now_jalali.strftime('%Y/%m/%d %H:%M')}
+  Jalali    : {today_jalali} {now_iran.strftime('%H:%M')}
   UTC       : {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}
 
-When the user says "امروز" or "today", the Jalali date is {now_jalali.strftime('%Y/%m/%d')}.
-When the user says "دیروز" or "yesterday", the Jalali date is {(now_jalali - jdatetime.timedelta(days=1)).strftime('%Y/%m/%d')}.
-When the user specifies a time (e.g. "ساعت 10"), combine it with today's Jalali date: {now_jalali.strftime('%Y/%m/%d')} 10:00
+When the user says "امروز" or "today", the Jalali date is {today_jalali}.
+When the user says "دیروز" or "yesterday", the Jalali date is {yesterday_jalali}.
+When the user specifies a time (e.g. "ساعت 10"), combine it with today's Jalali date: {today_jalali} 10:00
 """
 
 
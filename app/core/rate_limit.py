@@ -0,0 +1,175 @@
+"""
+rate_limit.py
+─────────────
+Per-user admission control for /api/chat, keyed by X-User-Id.
+
+A request is admitted only when all three limits allow it:
+  requests    token bucket — settings.rate_limit_requests_per_minute sustained,
+              bursts of up to settings.rate_limit_burst
+  concurrency at most settings.rate_limit_max_concurrent chats in flight per user
+  LLM tokens  at most settings.rate_limit_llm_tokens_per_window prompt + completion
+              tokens per settings.rate_limit_token_window seconds (fixed window;
+              a request is admitted while the user is under quota, and its actual
+              usage is charged when it finishes)
+
+A rejected request raises RateLimited (→ 429 with Retry-After) before any LLM or
+backend work is done. The bucket token of a request rejected for concurrency or
+quota is not consumed, and a request that is admitted here but then shed by
+load_shed.py (503) gets its token back through ticket.refund().
+
+State is per worker process, like the other in-process counters: with N workers a
+user can get up to N × the configured limits, so size them per worker. Idle users
+are pruned periodically.
+
+Usage:
+  from app.core import rate_limit
+
+  with rate_limit.limiter.admit(user_id) as ticket:   # raises RateLimited
+      ...
+      ticket.charge_tokens(llm.tokens_used)
+      ticket.refund()                                  # only when shed before any work
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from app.config.config import get_settings
+from app.core.logging_config import get_logger
+from app.core.metrics import RATE_LIMITED
+
+settings = get_settings()
+logger = get_logger("rate_limit")
+
+
+class RateLimited(Exception):
+    """A per-user limit rejected the request."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason} limit exceeded, retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class _UserState:
+    __slots__ = ("tokens", "refilled_at", "in_flight", "window_start", "window_tokens", "last_seen")
+
+    def __init__(self, now: float):
+        self.tokens = float(settings.rate_limit_burst)
+        self.refilled_at = now
+        self.in_flight = 0
+        self.window_start = now
+        self.window_tokens = 0
+        self.last_seen = now
+
+
+class Ticket:
+    """An admitted request; charges its LLM token usage to the user's window."""
+
+    def __init__(self, limiter: "RateLimiter", user_id: str, consumed: bool = False):
+        self._limiter = limiter
+        self.user_id = user_id
+        self._consumed = consumed
+
+    def charge_tokens(self, tokens: int) -> None:
+        if tokens > 0:
+            self._limiter._charge(self.user_id, tokens)
+
+    def refund(self) -> None:
+        """Give the request's bucket token back — the request was shed before doing any work."""
+        if self._consumed:
+            self._consumed = False
+            self._limiter._refund(self.user_id)
+
+
+class RateLimiter:
+    _PRUNE_EVERY = 1000
+
+    def __init__(self):
+        self._users: Dict[str, _UserState] = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def _refill(self, state: _UserState, now: float) -> None:
+        rate = settings.rate_limit_requests_per_minute / 60.0
+        state.tokens = min(float(settings.rate_limit_burst), state.tokens + (now - state.refilled_at) * rate)
+        state.refilled_at = now
+        if now - state.window_start >= settings.rate_limit_token_window:
+            state.window_start = now
+            state.window_tokens = 0
+
+    def _check(self, state: _UserState, now: float) -> None:
+        if settings.rate_limit_max_concurrent > 0 and state.in_flight >= settings.rate_limit_max_concurrent:
+            raise RateLimited("concurrency", 1.0)
+        quota = settings.rate_limit_llm_tokens_per_window
+        if quota > 0 and state.window_tokens >= quota:
+            raise RateLimited("llm_tokens", state.window_start + settings.rate_limit_token_window - now)
+        if settings.rate_limit_requests_per_minute > 0 and state.tokens < 1.0:
+            raise RateLimited("requests", (1.0 - state.tokens) * 60.0 / settings.rate_limit_requests_per_minute)
+
+    def _prune(self, now: float) -> None:
+        idle_after = max(settings.rate_limit_token_window, 60.0 * settings.rate_limit_burst /
+                         max(settings.rate_limit_requests_per_minute, 1e-9))
+        for user_id in [u for u, s in self._users.items() if s.in_flight == 0 and now - s.last_seen > idle_after]:
+            del self._users[user_id]
+
+    @contextmanager
+    def admit(self, user_id: str) -> Iterator[Ticket]:
+        if not settings.rate_limit_enabled:
+            yield Ticket(self, user_id)
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            self._calls += 1
+            if self._calls % self._PRUNE_EVERY == 0:
+                self._prune(now)
+            state = self._users.get(user_id)
+            if state is None:
+                state = self._users[user_id] = _UserState(now)
+            self._refill(state, now)
+            state.last_seen = now
+            try:
+                self._check(state, now)
+            except RateLimited as e:
+                RATE_LIMITED.labels(reason=e.reason).inc()
+                logger.warning(f"RATE_LIMITED user={user_id} reason={e.reason} retry_after={e.retry_after:.1f}s")
+                raise
+            consumed = settings.rate_limit_requests_per_minute > 0
+            if consumed:
+                state.tokens -= 1.0
+            state.in_flight += 1
+        try:
+            yield Ticket(self, user_id, consumed)
+        finally:
+            with self._lock:
+                state.in_flight -= 1
+
+    def _charge(self, user_id: str, tokens: int) -> None:
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is not None:
+                self._refill(state, time.monotonic())
+                state.window_tokens += tokens
+
+    def _refund(self, user_id: str) -> None:
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is not None:
+                state.tokens = min(float(settings.rate_limit_burst), state.tokens + 1.0)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "in_flight": sum(s.in_flight for s in self._users.values()),
+            }
+
+
+limiter = RateLimiter()
@@ -0,0 +1,51 @@
+"""
+redis_client.py
+───────────────
+The process-wide Redis client used by the Redis cache backend and the Redis
+conversation store (settings.redis_url — Redis, Valkey, KeyDB or any RESP server;
+scripts/bench/fake_redis.py is a local stand-in).
+
+One connection pool per worker process, short socket timeouts: a slow or absent
+Redis turns into cache misses, never into slow chat requests. Every key the app
+writes starts with settings.redis_key_prefix.
+
+Usage:
+  from app.core.redis_client import get_redis, key
+
+  get_redis().get(key("answer", cache_key))
+"""
+
+import threading
+from typing import Optional
+
+import redis
+from redis import RedisError  # noqa: F401 — re-exported for the Redis-backed stores
+
+from app.config.config import get_settings
+from app.core.logging_config import get_logger
+
+settings = get_settings()
+logger = get_logger("redis")
+
+_client: Optional[redis.Redis] = None
+_lock = threading.Lock()
+
+
+def get_redis() -> redis.Redis:
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = redis.Redis.from_url(
+                    settings.redis_url,
+                    socket_timeout=settings.redis_socket_timeout,
+                    socket_connect_timeout=settings.redis_socket_timeout,
+                    max_connections=settings.redis_max_connections,
+                    health_check_interval=30,
+                )
+                logger.info(f"REDIS client url={settings.redis_url.split('@')[-1]} prefix={settings.redis_key_prefix!r}")
+    return _client
+
+
+def key(*parts: str) -> str:
+    return settings.redis_key_prefix + ":".join(parts)
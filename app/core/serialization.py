@@ -0,0 +1,63 @@
+"""
+serialization.py
+────────────────
+The one JSON layer for the request path, backed by orjson.
+
+orjson encodes and decodes several times faster than the stdlib json module and
+writes UTF-8 directly, so Farsi text is never \\u-escaped (the same output as
+json.dumps(..., ensure_ascii=False), just compact). datetime, date, UUID and
+dataclasses are encoded natively; any other unknown type falls back to str().
+
+Used by:
+  main.py           ORJSONResponse as FastAPI's default response class
+  llm.py            tool-result messages sent back to the LLM
+  API_tools.py      backend / geocoder response bodies (response_json)
+  cache.py, conversation_store.py   values stored in SQLite / Redis
+  logging_config.py the Elasticsearch log shipper (es_serializer)
+  tracing.py, traffic.py            exported traces and recorded traffic
+
+Cache keys and cassette keys keep the stdlib json format, so existing caches and
+recorded cassettes stay valid.
+
+Usage:
+  from app.core import serialization
+
+  text = serialization.dumps({"success": True, "data": payload})   → str
+  raw = serialization.dumpb(value)                                   → bytes
+  obj = serialization.loads(raw)                                     str / bytes
+  data = serialization.response_json(response)                       requests.Response
+"""
+
+from typing import Any
+
+import orjson
+from elasticsearch.serializer import OrjsonSerializer
+from fastapi.responses import ORJSONResponse  # noqa: F401 — re-exported for main.py / health.py
+
+JSONDecodeError = orjson.JSONDecodeError   # subclasses json.JSONDecodeError / ValueError
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    return str(value)
+
+
+def dumpb(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default, option=_OPTIONS)
+
+
+def dumps(value: Any) -> str:
+    return orjson.dumps(value, default=_default, option=_OPTIONS).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    return orjson.loads(data)
+
+
+def response_json(response: Any) -> Any:
+    """Decode a requests.Response body (raises JSONDecodeError like response.json())."""
+    return orjson.loads(response.content)
+
+
+es_serializer = OrjsonSerializer()
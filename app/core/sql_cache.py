@@ -0,0 +1,290 @@
+"""
+sql_cache.py
+────────────
+Result cache for SQLTool, keyed by a normalized query fingerprint.
+
+The LLM writes the same SELECT in many spellings. Before hashing, a query is
+normalized so these hit the same entry:
+  • whitespace and comments       — tokens are re-joined with single spaces
+  • case                          — unquoted keywords / identifiers are lowercased
+                                    (Postgres folds them anyway); '...', E'...' and
+                                    $$...$$ / $tag$...$tag$ literals and "..."
+                                    identifiers are kept as written, as one token
+  • order of literals in IN (...) — IN (3, 1, 2) ≡ IN (1, 2, 3)
+  • order of top-level AND terms  — WHERE b = 2 AND a = 1 ≡ WHERE a = 1 AND b = 2
+                                    (only when the WHERE has no top-level OR; an AND
+                                    inside (...) or CASE ... END is never split)
+Key = sha256(normalized query, bound parameters, row / byte caps) plus the
+current generation of every table the query reads (see invalidation).
+
+Freshness:
+  settings.sql_cache_ttl                 default TTL
+  settings.sql_cache_table_ttls          per-table overrides; the smallest one wins
+  settings.sql_cache_volatile_ttl        queries calling now(), random(), current_date, ...
+Failed queries and results over settings.sql_cache_max_entry_bytes are not
+stored; the entry count is bounded by settings.sql_cache_max_entries (LRU with
+the memory backend, see cache.py for sqlite / redis).
+
+Invalidation: invalidate("orders") gives the table a new generation, so every
+cached result that read it misses from then on (old entries just expire). The
+generations live in the "sql_tables" cache, shared like the results (a miss
+there only means the table was never invalidated). Writers
+outside the app can call it, or install_write_hook(engine) on their SQLAlchemy
+engine to invalidate the tables written by INSERT / UPDATE / DELETE / TRUNCATE /
+MERGE / COPY automatically.
+
+Hits and misses go to cache_requests_total{cache="sql"}.
+
+Usage:
+  from app.core import sql_cache
+
+  key, tables = sql_cache.make_key(query, params)
+  result = sql_cache.get(key)                    → None on a miss
+  sql_cache.put(key, query, tables, result)
+  sql_cache.invalidate("orders", "order_items")
+"""
+
+import hashlib
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config.config import get_settings
+from app.core import serialization
+from app.core.cache import get_cache
+from app.core.logging_config import get_logger
+from app.core.metrics import SQL_CACHE_INVALIDATIONS, SQL_CACHE_SKIPPED
+
+settings = get_settings()
+logger = get_logger("sql_cache")
+
+_cache = get_cache("sql", max_entries=settings.sql_cache_max_entries)
+_generations = get_cache("sql_tables", max_entries=10_000)
+
+_TOKEN = re.compile(
+    r"""
+      (?P<space>\s+|--[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^']|'')*'|e'(?:[^'\\]|\\.|'')*')
+    | (?P<dollar>\$(?P<tag>(?:[^\W\d]\w*)?)\$.*?\$(?P=tag)\$)
+    | (?P<quoted>"(?:[^"]|"")*")
+    | (?P<number>\d+(?:\.\d+)?(?:e[+-]?\d+)?)
+    | (?P<word>\w+)
+    | (?P<op><>|!=|<=|>=|::|\|\||\S)
+    """,
+    re.VERBOSE | re.DOTALL | re.IGNORECASE,
+)
+
+_CLAUSE_END = {
+    "group", "order", "limit", "offset", "having", "window", "fetch", "for",
+    "union", "intersect", "except", "returning",
+}
+_VOLATILE = {
+    "now", "random", "current_date", "current_time", "current_timestamp", "localtime",
+    "localtimestamp", "clock_timestamp", "statement_timestamp", "transaction_timestamp",
+    "timeofday", "gen_random_uuid", "nextval", "currval", "setval",
+}
+_WRITE = re.compile(
+    r"^\s*(?:insert\s+into|update|delete\s+from|truncate(?:\s+table)?|merge\s+into|copy)\s+(?:only\s+)?"
+    r"((?:\"[^\"]+\"|\w+)(?:\s*\.\s*(?:\"[^\"]+\"|\w+))?)",
+    re.IGNORECASE,
+)
+
+
+# ── Normalization ─────────────────────────────────────────────────────────────
+
+def _tokens(query: str) -> List[str]:
+    out = []
+    for m in _TOKEN.finditer(query.strip().rstrip(";")):
+        kind = m.lastgroup
+        if kind == "space":
+            continue
+        token = m.group()
+        if kind in ("word", "number"):
+            token = token.lower()
+        elif kind == "string" and token[0] in "eE":
+            token = "e" + token[1:]      # E'...' ≡ e'...'; the literal itself keeps its case
+        out.append(token)
+    return out
+
+
+def _is_literal(token: str) -> bool:
+    return token[0] in "'$" or token[0].isdigit() or token.startswith("e'")
+
+
+def _sort_in_lists(tokens: List[str]) -> List[str]:
+    out, i = [], 0
+    while i < len(tokens):
+        if tokens[i] == "in" and i + 1 < len(tokens) and tokens[i + 1] == "(":
+            end = tokens.index(")", i + 1) if ")" in tokens[i + 1:] else -1
+            items = tokens[i + 2:end:2] if end > 0 else []
+            separators = tokens[i + 3:end:2] if end > 0 else []
+            if items and all(_is_literal(t) for t in items) and all(s == "," for s in separators):
+                listed = []
+                for item in sorted(items):
+                    listed += [item, ","]
+                out += ["in", "("] + listed[:-1] + [")"]
+                i = end + 1
+                continue
+        out.append(tokens[i])
+        i += 1
+    return out
+
+
+def _sort_where_terms(tokens: List[str]) -> List[str]:
+    depth, start = 0, None
+    for i, token in enumerate(tokens):
+        if token in ("(", "case"):
+            depth += 1
+        elif token in (")", "end"):
+            depth -= 1
+        elif depth == 0 and token == "where":
+            start = i + 1
+            break
+    if start is None:
+        return tokens
+    end, depth = len(tokens), 0
+    terms, current, in_between = [], [], False
+    for i in range(start, len(tokens)):
+        token = tokens[i]
+        if token in ("(", "case"):
+            depth += 1
+        elif token in (")", "end"):
+            depth -= 1
+            if depth < 0:
+                if token == "end":
+                    return tokens
+                end = i
+                break
+        elif depth == 0:
+            if token in _CLAUSE_END:
+                end = i
+                break
+            if token == "or":
+                return tokens
+            if token == "between":
+                in_between = True
+            elif token == "and":
+                if in_between:
+                    in_between = False
+                else:
+                    terms.append(current)
+                    current = []
+                    continue
+        current.append(token)
+    terms.append(current)
+    if len(terms) < 2:
+        return tokens
+    joined = []
+    for term in sorted(terms, key=" ".join):
+        joined += term + ["and"]
+    return tokens[:start] + joined[:-1] + tokens[end:]
+
+
+def normalize(query: str) -> str:
+    """Canonical spelling of a SELECT (see module docstring)."""
+    return " ".join(_sort_where_terms(_sort_in_lists(_tokens(query))))
+
+
+def tables(query: str) -> List[str]:
+    """Tables a query reads (after FROM, JOIN and FROM-list commas), lowercased and without schema."""
+    tokens = _tokens(query)
+    found = set()
+    depth, from_depths = 0, set()
+    for i, token in enumerate(tokens):
+        if token == "(":
+            depth += 1
+            continue
+        if token == ")":
+            from_depths.discard(depth)
+            depth -= 1
+            continue
+        if token in _CLAUSE_END or token == "where":
+            from_depths.discard(depth)
+            continue
+        if token == "from":
+            from_depths.add(depth)
+        elif not (token == "join" or (token == "," and depth in from_depths)):
+            continue
+        j = i + 1
+        if j < len(tokens) and tokens[j] in ("lateral", "only"):
+            j += 1
+        if j >= len(tokens) or tokens[j] == "(" or _is_literal(tokens[j]):
+            continue
+        while j + 2 < len(tokens) and tokens[j + 1] == ".":
+            j += 2
+        found.add(tokens[j].strip('"').lower())
+    return sorted(found)
+
+
+# ── Keys ──────────────────────────────────────────────────────────────────────
+
+def _generation_keys(names: List[str]) -> Dict[str, str]:
+    found = _generations.get_many(names) if names else {}
+    return {name: str(found.get(name, 0)) for name in names}
+
+
+def make_key(query: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, List[str]]:
+    """Return (cache_key, tables read)."""
+    names = tables(query)
+    raw = "|".join([
+        normalize(query),
+        serialization.dumps(dict(sorted((params or {}).items()))),
+        f"{settings.max_query_rows}:{settings.sql_max_result_bytes}",
+        ",".join(f"{name}@{gen}" for name, gen in _generation_keys(names).items()),
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest(), names
+
+
+def _ttl_for(query: str, names: List[str]) -> float:
+    ttl = min([settings.sql_cache_ttl] + [settings.sql_cache_table_ttls[n] for n in names if n in settings.sql_cache_table_ttls])
+    if _VOLATILE & set(_tokens(query)):
+        ttl = min(ttl, settings.sql_cache_volatile_ttl)
+    return ttl
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    if not settings.sql_cache_enabled:
+        return None
+    return _cache.get(key)
+
+
+def put(key: str, query: str, names: List[str], result: Dict[str, Any]) -> None:
+    if not settings.sql_cache_enabled or not result.get("success"):
+        return
+    ttl = _ttl_for(query, names)
+    if ttl <= 0:
+        SQL_CACHE_SKIPPED.labels(reason="volatile").inc()
+        return
+    if len(serialization.dumpb(result)) > settings.sql_cache_max_entry_bytes:
+        SQL_CACHE_SKIPPED.labels(reason="too_large").inc()
+        return
+    _cache.set(key, result, ttl=ttl)
+    logger.debug(f"SQL_CACHE store tables={names} ttl={ttl}s rows={result.get('row_count')}")
+
+
+def invalidate(*names: str) -> None:
+    """Drop every cached result that read any of these tables."""
+    ttl = max([settings.sql_cache_ttl, settings.sql_cache_volatile_ttl, *settings.sql_cache_table_ttls.values()]) * 2
+    generation = time.time_ns()
+    for name in names:
+        name = name.split(".")[-1].strip('"').lower()
+        _generations.set(name, generation, ttl=ttl)
+        SQL_CACHE_INVALIDATIONS.labels(table=name).inc()
+        logger.info(f"SQL_CACHE invalidate table={name}")
+
+
+def install_write_hook(engine: Any) -> None:
+    """Invalidate tables written through `engine` (a SQLAlchemy Engine) after each write statement."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_write(conn, cursor, statement, parameters, context, executemany):
+        m = _WRITE.match(statement)
+        if m:
+            invalidate(m.group(1).replace(" ", ""))
+
+
+def stats() -> Dict[str, Any]:
+    return _cache.stats()
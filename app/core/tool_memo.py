@@ -0,0 +1,78 @@
+"""
+tool_memo.py
+────────────
+Per-turn memo of tool results and loop detection for the LLM tool loop.
+
+The LLM sometimes asks for the same call_backend_api call again on the next
+iteration, or oscillates between two queries. Within one chat turn:
+
+  memoization  a call whose (function, normalized arguments) already ran this
+               turn gets the earlier result again — no backend round trip.
+               Normalization drops "explanation" and empty values, sorts keys and
+               folds Persian/Arabic digits, case and whitespace in strings.
+               Only successful results are kept: a failed call (timeout, backend
+               down, not found) runs again when the LLM retries it.
+  loop stop    an iteration whose calls were ALL answered from the memo (i.e.
+               earlier successes) asked for nothing new:
+                 repeat  same calls as the previous iteration
+                 cycle   calls seen in earlier iterations (A, B, A ...)
+               The loop then ends early with a final answer instead of spinning
+               up to max_iterations.
+
+Usage:
+  memo = ToolMemo()
+  key = memo.key(function_name, args)
+  result = memo.get(key)                     → None when not seen this turn
+  memo.put(key, result)                      → ignored unless result["success"]
+  pattern = memo.end_round(keys, new_calls)  → None / "repeat" / "cycle"
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from app.core.answer_cache import normalize_message
+
+_IGNORED_ARGS = {"explanation"}
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return normalize_message(value)
+    if isinstance(value, dict):
+        return {
+            k: _normalize(v) for k, v in value.items()
+            if k not in _IGNORED_ARGS and v not in (None, "", [], {})
+        }
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    return value
+
+
+class ToolMemo:
+    def __init__(self):
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._rounds: List[frozenset] = []
+        self.hits = 0
+
+    @staticmethod
+    def key(function_name: str, arguments: Dict[str, Any]) -> str:
+        return f"{function_name} {json.dumps(_normalize(arguments), ensure_ascii=False, sort_keys=True, default=str)}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self._results.get(key)
+        if result is not None:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        if result.get("success"):
+            self._results[key] = result
+
+    def end_round(self, keys: List[str], new_calls: int) -> Optional[str]:
+        """Record one iteration's tool calls; return the loop pattern when nothing new was asked."""
+        signature = frozenset(keys)
+        previous = self._rounds[-1] if self._rounds else None
+        self._rounds.append(signature)
+        if new_calls > 0:
+            return None
+        return "repeat" if signature == previous else "cycle"
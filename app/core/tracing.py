@@ -0,0 +1,334 @@
+"""
+tracing.py
+──────────
+Per-request tracing with nested spans, exported in the OpenTelemetry OTLP/JSON
+shape (resourceSpans → scopeSpans → spans), so traces can be loaded into any
+OTLP-aware tool (otel-collector file receiver, Jaeger, Tempo) without pulling in
+the OpenTelemetry SDK.
+
+Span tree of one /api/chat request:
+  chat
+  ├── conversation_load   (history from the conversation store, when not sent by the client)
+  ├── answer_cache
+  ├── fast_path
+  ├── prompt_build
+  ├── llm                 (one per completion call: model, tokens, iteration)
+  └── tool                (one per ApiTool action)
+      ├── upstream        (one per HTTP attempt: endpoint, status)
+      └── geocode
+          └── upstream
+
+The current span lives in a ContextVar, so nesting follows the call stack and
+survives run_in_threadpool (anyio copies the context into the worker thread).
+Outside a trace — or with settings.tracing_enabled = False — span() is a no-op.
+
+Exporters (settings.tracing_exporter):
+  none     collect only (Server-Timing still works) — the default
+  file     one OTLP/JSON document per trace, appended to settings.tracing_file_path
+  console  same document, logged at INFO through the "tracing" logger
+
+Finished traces go through a queue to a single background thread (as in
+traffic.py), so the request path never serializes or writes a trace itself.
+The file exporter rotates at settings.tracing_file_max_bytes and keeps
+settings.tracing_file_backups old files (traces.jsonl.1, .2, ...).
+
+Spans carry no user identifiers or message text: the root span has no user id
+and tool spans record only the action.
+
+An incoming W3C `traceparent` header is honoured, so the chat trace joins the
+caller's trace.
+
+Usage:
+  with tracing.start_trace("chat", traceparent=header) as trace:
+      with tracing.span("llm", model="gpt-4o-mini") as s:
+          ...
+          s.set("prompt_tokens", 812)
+  response.headers["Server-Timing"] = trace.server_timing()
+"""
+
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config.config import get_settings
+from app.core import serialization
+from app.core.logging_config import get_logger
+
+settings = get_settings()
+logger = get_logger("tracing")
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+_STATUS_UNSET = 0
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.status = _STATUS_UNSET
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def fail(self, error: Any) -> None:
+        self.status = _STATUS_ERROR
+        self.error = str(error)[:300]
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,   # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        if self.error:
+            span["status"]["message"] = self.error
+        return span
+
+
+class _NoopSpan:
+    """Returned by span() when no trace is active — accepts and drops everything."""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def fail(self, error: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """All spans of one request. Spans from worker threads are appended under a lock."""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value: time per top-level phase (direct children of the
+        root span, summed by name) plus the total, e.g.
+          llm;dur=8123.4;desc="2 calls", tool;dur=2890.1, prompt_build;dur=1.2, total;dur=11032.0
+        """
+        if self.root is None:
+            return ""
+        phases: Dict[str, List[float]] = {}
+        with self._lock:
+            children = [s for s in self.spans if s.parent_id == self.root.span_id]
+        for s in children:
+            phases.setdefault(s.name, []).append(s.duration_ms)
+
+        entries = []
+        for name, durations in sorted(phases.items(), key=lambda kv: -sum(kv[1])):
+            entry = f"{name};dur={sum(durations):.1f}"
+            if len(durations) > 1:
+                entry += f';desc="{len(durations)} calls"'
+            entries.append(entry)
+        entries.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(entries)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [s.to_otlp() for s in self.spans]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _otlp_attribute("service.name", settings.tracing_service_name),
+                    _otlp_attribute("deployment.environment", settings.environment),
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.core.tracing"},
+                    "spans": spans,
+                }],
+            }]
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+_queue: "queue.SimpleQueue[Trace]" = queue.SimpleQueue()
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _parse_traceparent(traceparent: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+    """W3C trace context → (trace_id, parent_span_id), or (None, None) if absent/invalid."""
+    if not traceparent:
+        return None, None
+    m = _TRACEPARENT_RE.match(traceparent.strip().lower())
+    if not m or set(m.group(1)) == {"0"}:
+        return None, None
+    return m.group(1), m.group(2)
+
+
+def _rotate(path: str) -> None:
+    """traces.jsonl → traces.jsonl.1 → ... → .N, dropping the oldest."""
+    backups = settings.tracing_file_backups
+    if backups <= 0:
+        os.remove(path)
+        return
+    for n in range(backups - 1, 0, -1):
+        if os.path.exists(f"{path}.{n}"):
+            os.replace(f"{path}.{n}", f"{path}.{n + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def _write(path: str, documents: List[str]) -> None:
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        size = 0
+    f = open(path, "a", encoding="utf-8")
+    try:
+        for document in documents:
+            length = len(document.encode("utf-8"))
+            if size and size + length > settings.tracing_file_max_bytes:
+                f.close()
+                _rotate(path)
+                f = open(path, "a", encoding="utf-8")
+                size = 0
+            f.write(document)
+            size += length
+    finally:
+        f.close()
+
+
+def _export_loop() -> None:
+    path = settings.tracing_file_path
+    directory = os.path.dirname(path)
+    if directory and settings.tracing_exporter == "file":
+        os.makedirs(directory, exist_ok=True)
+    while True:
+        traces = [_queue.get()]
+        # batch whatever queued up meanwhile into the same write
+        while True:
+            try:
+                traces.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        documents = [serialization.dumps(t.to_otlp()) + "\n" for t in traces]
+        if settings.tracing_exporter == "console":
+            for document in documents:
+                logger.info(f"TRACE {document.rstrip()}")
+            continue
+        try:
+            _write(path, documents)
+        except OSError as e:
+            logger.warning(f"TRACE export failed path={path} error={e}")
+
+
+def _ensure_writer() -> None:
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_export_loop, name="trace-exporter", daemon=True)
+            _writer.start()
+
+
+def _export(trace: Trace) -> None:
+    if settings.tracing_exporter == "none":
+        return
+    _ensure_writer()
+    _queue.put(trace)
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Trace]]:
+    """Open the root span of a request; the trace is exported when the block exits."""
+    if not settings.tracing_enabled:
+        yield None
+        return
+
+    trace_id, parent_id = _parse_traceparent(traceparent)
+    trace = Trace(trace_id)
+    root = Span(trace, name, parent_id, dict(attributes))
+    trace.root = root
+    trace.add(root)
+    token = _current_span.set(root)
+    try:
+        yield trace
+    except BaseException as e:
+        root.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        root.end_ns = time.time_ns()
+        _export(trace)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Child of the current span; a no-op outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP_SPAN
+        return
+
+    child = Span(parent.trace, name, parent.span_id, dict(attributes))
+    parent.trace.add(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end_ns = time.time_ns()
+
+
+def current_trace_id() -> Optional[str]:
+    current = _current_span.get()
+    return current.trace.trace_id if current is not None else None
@@ -0,0 +1,139 @@
+"""
+traffic.py
+──────────
+Records sanitized /api/chat traffic to JSONL so production-shaped load can be
+replayed later (scripts/bench/replay.py).
+
+One line per request:
+  {"ts": 1760870000.123, "user": "u-3f9a1c0b2d4e", "conversation": "c-91be03…",
+   "message": "ماشین 211 کجاست؟", "history_len": 2, "history": [...],
+   "status": 200, "elapsed_ms": 812.4, "tool_calls": 1}
+
+Sanitization:
+  • no headers are stored — no Authorization token, no raw X-User-Id
+  • user and conversation ids are replaced by salted hashes, so per-user and
+    per-conversation patterns survive without identifying anyone. Without
+    settings.traffic_record_salt a random salt is generated per process, so ids
+    are never hashed unsalted (but pseudonyms then differ across restarts and
+    workers — set the salt to keep them stable)
+  • long digit runs (phone / national id numbers) in messages are masked
+  • conversation history is stored only with settings.traffic_record_history
+
+Writes go through a queue to a single background thread, so the request path
+never waits on disk. Disabled unless settings.traffic_record_enabled.
+
+Usage:
+  from app.core import traffic
+  traffic.record(request, user_id, status=200, elapsed_ms=812.4, tool_calls=1)
+"""
+
+import hashlib
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config.config import get_settings
+from app.core import serialization
+from app.core.logging_config import get_logger
+
+settings = get_settings()
+logger = get_logger("traffic")
+
+_LONG_DIGITS_RE = re.compile(r"[0-9۰-۹٠-٩]{8,}")
+
+_queue: "queue.SimpleQueue[Dict[str, Any]]" = queue.SimpleQueue()
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+_salt = settings.traffic_record_salt
+if settings.traffic_record_enabled and not _salt:
+    _salt = secrets.token_hex(16)
+    logger.warning("TRAFFIC_RECORD_SALT is empty — using a random salt for this recording session")
+
+
+def _pseudonym(prefix: str, value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    digest = hashlib.sha256(f"{_salt}|{value}".encode("utf-8")).hexdigest()
+    return f"{prefix}-{digest[:12]}"
+
+
+def _mask(text: str) -> str:
+    return _LONG_DIGITS_RE.sub(lambda m: "#" * len(m.group(0)), text or "")
+
+
+def _history(conversation_history: Optional[List[Any]]) -> List[Dict[str, str]]:
+    turns = []
+    for m in conversation_history or []:
+        role = m.role if hasattr(m, "role") else m.get("role")
+        content = m.content if hasattr(m, "content") else m.get("content")
+        turns.append({"role": role, "content": _mask(content or "")})
+    return turns
+
+
+def _write_loop() -> None:
+    path = settings.traffic_record_path
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    while True:
+        entry = _queue.get()
+        try:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(serialization.dumps(entry) + "\n")
+                # drain whatever queued up meanwhile in the same open()
+                while True:
+                    try:
+                        f.write(serialization.dumps(_queue.get_nowait()) + "\n")
+                    except queue.Empty:
+                        break
+        except OSError as e:
+            logger.warning(f"TRAFFIC record failed path={path} error={e}")
+
+
+def _ensure_writer() -> None:
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_loop, name="traffic-recorder", daemon=True)
+            _writer.start()
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def record(
+    request: Any,
+    user_id: Optional[str],
+    status: int,
+    elapsed_ms: float,
+    tool_calls: int = 0,
+) -> None:
+    """Queue one sanitized chat request (a ChatRequest) for the traffic log."""
+    if not settings.traffic_record_enabled:
+        return
+    if settings.traffic_record_sample_rate < 1.0 and random.random() >= settings.traffic_record_sample_rate:
+        return
+
+    history = request.conversation_history or []
+    entry: Dict[str, Any] = {
+        "ts": round(time.time(), 3),
+        "user": _pseudonym("u", user_id),
+        "conversation": _pseudonym("c", request.conversation_id),
+        "message": _mask(request.message),
+        "history_len": len(history),
+        "status": status,
+        "elapsed_ms": round(elapsed_ms, 1),
+        "tool_calls": tool_calls,
+    }
+    if settings.traffic_record_history:
+        entry["history"] = _history(history)
+
+    _ensure_writer()
+    _queue.put(entry)
@@ -0,0 +1,458 @@
+"""
+upstream.py
+───────────
+Single entry point for every outbound HTTP call to the fleet backend and the geocoder.
+
+ApiTool never talks to `requests` directly — it goes through get()/post() here, so
+cross-cutting behaviour for upstream I/O lives in one place.
+
+Single-flight coalescing:
+  Concurrent identical GETs (same URL, params and auth scope) share ONE in-flight
+  upstream call. The first caller (the "leader") performs the request; every caller
+  that arrives while it is still running waits for it and receives the same
+  Response (or the same exception). Nothing is cached — once the leader finishes,
+  the next call goes upstream again.
+
+  A leader's deadline is its own: when the leader fails with DeadlineExceeded
+  (its budget ran out, including a timeout shortened to that budget or no lane
+  slot in time), waiters with budget left do not inherit the error — they retry,
+  and the first of them becomes the new leader.
+
+  POSTs are never coalesced.
+
+Circuit breakers (one per endpoint = host + path):
+  closed    → requests flow; consecutive failures (timeouts, connection errors, 5xx)
+              are counted and `breaker_failure_threshold` of them open the breaker.
+  open      → requests fail fast with CircuitOpenError (no network, no api_timeout wait)
+              until `breaker_reset_timeout` seconds have passed.
+  half_open → a single probe request is let through; success closes the breaker,
+              failure re-opens it.
+  CircuitOpenError subclasses requests' ConnectionError, so existing handlers in
+  ApiTool report it like any other unreachable backend.
+
+Retries:
+  Only idempotent GETs are retried, on timeouts, connection errors and 502/503/504,
+  with exponential backoff and full jitter. A shared retry budget (token bucket fed
+  by `upstream_retry_budget_ratio` per request) caps retries to a fraction of
+  traffic, so a backend outage never multiplies load.
+
+Deadlines:
+  When a request deadline is active (see deadline.py), every attempt's timeout is
+  shrunk to the remaining budget, retries stop when the backoff would overrun it,
+  and coalesced waiters give up when their own budget runs out. An exhausted
+  budget raises DeadlineExceeded (a requests Timeout) without touching the network.
+  A timeout of an attempt shortened to the budget is raised as DeadlineExceeded
+  too, and does not count against the breaker.
+
+Priority lanes:
+  Every attempt holds a slot of the "backend" pool for the current lane (lanes.py),
+  so batch and background work never crowd out interactive chats. Running out of
+  time while waiting for a slot raises DeadlineExceeded.
+
+Every completed or timed-out attempt also feeds the adaptive concurrency limiter
+(load_shed.py) as its "backend" latency signal.
+
+Usage:
+  from app.core import upstream
+
+  response = upstream.get(url, params={"SearchWord": "211"}, headers=headers, timeout=10)
+"""
+
+import hashlib
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from app.config.config import get_settings
+from app.core import cassette, deadline, lanes, load_shed, tracing
+from app.core.logging_config import get_logger
+from app.core.metrics import UPSTREAM_COALESCED, UPSTREAM_LATENCY, UPSTREAM_RETRIES
+
+settings = get_settings()
+logger = get_logger("upstream")
+
+
+class _InFlightCall:
+    __slots__ = ("done", "response", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: Optional[requests.Response] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into a single execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _InFlightCall] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.retried = 0
+
+    def do(self, key: str, fn: Callable[[], requests.Response], endpoint: str = "") -> requests.Response:
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                is_leader = call is None
+                if is_leader:
+                    call = _InFlightCall()
+                    self._calls[key] = call
+                    self.leaders += 1
+                else:
+                    self.coalesced += 1
+            if is_leader:
+                break
+
+            UPSTREAM_COALESCED.labels(endpoint=endpoint).inc()
+            logger.debug(f"SINGLE_FLIGHT coalesced key={key.rsplit(' ', 1)[0]}")
+            request_deadline = deadline.current()
+            wait_for = request_deadline.remaining() if request_deadline else None
+            if not call.done.wait(wait_for):
+                raise DeadlineExceeded("request deadline exceeded while waiting for a coalesced call")
+            if isinstance(call.error, DeadlineExceeded) and not (request_deadline and request_deadline.expired):
+                # the leader ran out of *its* budget — this caller still has time, so go again
+                self.retried += 1
+                logger.debug(f"SINGLE_FLIGHT leader deadline, retrying key={key.rsplit(' ', 1)[0]}")
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.response
+
+        try:
+            call.response = fn()
+            return call.response
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "in_flight": in_flight,
+        }
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while an endpoint's breaker is open."""
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Raised without touching the network once the request deadline is spent."""
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker guarding one upstream endpoint."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # half-open: exactly one probe at a time
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info(f"BREAKER closed endpoint={self.name}")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_neutral(self) -> None:
+        """Attempt ended for a reason unrelated to upstream health — just free the probe slot."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"BREAKER open endpoint={self.name} failures={self._failures}")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snap = {"state": self._state, "consecutive_failures": self._failures}
+            if self._state == self.OPEN:
+                snap["retry_in_s"] = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+            return snap
+
+
+class RetryBudget:
+    """Token bucket: each request deposits `ratio` tokens, each retry withdraws one."""
+
+    def __init__(self, ratio: float, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.exhausted = 0
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self.retries += 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tokens = self._tokens
+        return {"tokens": round(tokens, 2), "retries": self.retries, "exhausted": self.exhausted}
+
+
+_single_flight = SingleFlight()
+_retry_budget = RetryBudget(ratio=settings.upstream_retry_budget_ratio)
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+_RETRYABLE_STATUS = {502, 503, 504}
+
+
+def _endpoint_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.netloc}{parts.path}"
+
+
+def _breaker_for(url: str) -> CircuitBreaker:
+    name = _endpoint_of(url)
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(
+                name,
+                failure_threshold=settings.breaker_failure_threshold,
+                reset_timeout=settings.breaker_reset_timeout,
+            ))
+    return breaker
+
+
+def _attempt_timeout(timeout: Optional[float]) -> Optional[float]:
+    """Per-attempt timeout, clamped to the active request deadline."""
+    request_deadline = deadline.current()
+    if request_deadline is None:
+        return timeout
+    if request_deadline.expired:
+        raise DeadlineExceeded(f"request deadline exceeded ({request_deadline.budget:.1f}s budget)")
+    return request_deadline.clamp(timeout)
+
+
+def _guarded(
+    breaker: CircuitBreaker,
+    send: Callable[[Optional[float]], requests.Response],
+    timeout: Optional[float],
+) -> requests.Response:
+    """One attempt through the breaker, in a backend pool slot of the current lane."""
+    try:
+        with lanes.pool("backend").slot() as lane:
+            return _attempt(breaker, send, timeout, lane)
+    except lanes.PoolBusy as e:
+        raise DeadlineExceeded(str(e)) from e
+
+
+def _attempt(
+    breaker: CircuitBreaker,
+    send: Callable[[Optional[float]], requests.Response],
+    timeout: Optional[float],
+    lane: str,
+) -> requests.Response:
+    """5xx counts as a failure, 4xx does not."""
+    attempt_timeout = _attempt_timeout(timeout)
+    if not breaker.allow():
+        raise CircuitOpenError(f"سرویس {breaker.name} موقتاً در دسترس نیست (circuit open).")
+    started = time.perf_counter()
+    latency = UPSTREAM_LATENCY.labels(endpoint=breaker.name, status="error")
+    try:
+        with tracing.span("upstream", endpoint=breaker.name, timeout_s=attempt_timeout, lane=lane) as http_span:
+            response = send(attempt_timeout)
+            http_span.set("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                http_span.fail(f"HTTP {response.status_code}")
+    except DeadlineExceeded:
+        breaker.record_neutral()
+        raise
+    except requests.exceptions.Timeout as e:
+        UPSTREAM_LATENCY.labels(endpoint=breaker.name, status="timeout").observe(time.perf_counter() - started)
+        load_shed.observe("backend", time.perf_counter() - started)
+        if timeout is not None and attempt_timeout is not None and attempt_timeout < timeout:
+            breaker.record_neutral()   # our budget ran out, not the endpoint's fault
+            raise DeadlineExceeded(
+                f"request deadline exceeded (attempt timeout cut to {attempt_timeout:.2f}s of {timeout:.2f}s)"
+            ) from e
+        breaker.record_failure()
+        raise
+    except cassette.CassetteMiss:
+        breaker.record_neutral()   # replay gap, not an upstream failure
+        raise
+    except requests.exceptions.ConnectionError:
+        latency.observe(time.perf_counter() - started)
+        breaker.record_failure()
+        raise
+    except Exception:
+        latency.observe(time.perf_counter() - started)
+        breaker.record_success()   # not an availability problem (e.g. bad URL)
+        raise
+    UPSTREAM_LATENCY.labels(
+        endpoint=breaker.name, status=f"{response.status_code // 100}xx",
+    ).observe(time.perf_counter() - started)
+    load_shed.observe("backend", time.perf_counter() - started)
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    cap = min(settings.upstream_retry_max_delay, settings.upstream_retry_base_delay * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def _send_with_retries(
+    url: str,
+    send: Callable[[Optional[float]], requests.Response],
+    timeout: Optional[float],
+) -> requests.Response:
+    breaker = _breaker_for(url)
+    _retry_budget.deposit()
+
+    attempt = 0
+    while True:
+        try:
+            response = _guarded(breaker, send, timeout)
+            if response.status_code not in _RETRYABLE_STATUS:
+                return response
+            failure: Any = response
+        except (CircuitOpenError, DeadlineExceeded):
+            raise
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            failure = e
+
+        delay = _backoff_delay(attempt)
+        request_deadline = deadline.current()
+        out_of_time = request_deadline is not None and request_deadline.remaining() <= delay
+
+        if attempt >= settings.upstream_max_retries or out_of_time or not _retry_budget.try_withdraw():
+            if isinstance(failure, BaseException):
+                raise failure
+            return failure
+
+        attempt += 1
+        UPSTREAM_RETRIES.labels(endpoint=breaker.name).inc()
+        logger.info(f"RETRY endpoint={breaker.name} attempt={attempt} delay={delay:.2f}s reason={failure!r}")
+        time.sleep(delay)
+
+
+def _auth_scope(headers: Optional[Dict[str, str]]) -> str:
+    """Hash the credentials so two users never share a response, without keeping tokens in keys."""
+    headers = headers or {}
+    raw = f"{headers.get('Authorization', '')}|{headers.get('X-User-Id', '')}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _request_key(method: str, url: str, params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]]) -> str:
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    return f"{method} {url} {items} {_auth_scope(headers)}"
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+) -> requests.Response:
+    """GET with single-flight coalescing, circuit breaking and jittered retries."""
+    def _call() -> requests.Response:
+        return _send_with_retries(
+            url,
+            lambda t: cassette.http(
+                "GET", url, params, None,
+                lambda: requests.get(url, params=params, headers=headers, timeout=t),
+            ),
+            timeout,
+        )
+
+    if not settings.single_flight_enabled:
+        return _call()
+
+    key = _request_key("GET", url, params, headers)
+    return _single_flight.do(key, _call, endpoint=_endpoint_of(url))
+
+
+def post(
+    url: str,
+    json: Optional[Any] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[float] = None,
+) -> requests.Response:
+    """POST is not idempotent — guarded by the breaker, but never coalesced or retried."""
+    return _guarded(
+        _breaker_for(url),
+        lambda t: cassette.http(
+            "POST", url, None, json,
+            lambda: requests.post(url, json=json, headers=headers, timeout=t),
+        ),
+        timeout,
+    )
+
+
+def any_breaker_open() -> bool:
+    return any(b.snapshot()["state"] != CircuitBreaker.CLOSED for b in list(_breakers.values()))
+
+
+def stats() -> Dict[str, Any]:
+    """Counters and breaker states for the health endpoint."""
+    return {
+        "single_flight": _single_flight.stats(),
+        "retry_budget": _retry_budget.stats(),
+        "breakers": {name: b.snapshot() for name, b in list(_breakers.items())},
+    }
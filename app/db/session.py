@@ -0,0 +1,164 @@
+"""
+session.py
+──────────
+Managed SQLAlchemy engines for the Postgres analytics path (SQLTool / SchemaTool).
+
+Engines (one of each per worker process, created on first use):
+  sync    settings.database_url         psycopg2   SQLTool.execute_query
+  async   settings.async_database_url   asyncpg    SQLTool.execute_query_async
+
+Pool: settings.db_pool_size connections plus settings.db_max_overflow under
+burst; a checkout waits at most settings.db_pool_timeout seconds, every
+checkout is pre-pinged, and connections are replaced after
+settings.db_pool_recycle seconds.
+
+connect() / connect_async() hand out a pooled connection inside a READ ONLY
+transaction that is always rolled back, with a transaction-local
+statement_timeout: settings.db_statement_timeout, shrunk to what is left of the
+request deadline (deadline.py). Postgres cancels a statement that runs over, so a
+slow historical query never holds its connection past the request.
+
+Usage:
+  from app.db import session
+
+  with session.connect() as conn:
+      conn.execute(text("SELECT 1"))
+
+  async with session.connect_async() as conn:
+      await conn.execute(text("SELECT 1"))
+
+  def endpoint(db: Session = Depends(session.get_db)):   # FastAPI dependency
+      ...
+"""
+
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, Optional
+
+from sqlalchemy import Connection, Engine, create_engine, text
+from sqlalchemy.orm import Session
+
+from app.config.config import get_settings
+from app.core.deadline import clamp_timeout
+from app.core.logging_config import get_logger
+
+if TYPE_CHECKING:   # sqlalchemy.ext.asyncio needs greenlet; only the async path imports it
+    from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+settings = get_settings()
+logger = get_logger("db")
+
+_SET_READ_ONLY = text("SET TRANSACTION READ ONLY")
+_SET_STATEMENT_TIMEOUT = text("SELECT set_config('statement_timeout', :ms, true)")
+
+_lock = threading.Lock()
+_engine: Optional[Engine] = None
+_async_engine: Optional["AsyncEngine"] = None
+
+
+def _pool_options() -> Dict[str, Any]:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": True,
+    }
+
+
+def engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                _engine = create_engine(settings.database_url, **_pool_options())
+                logger.info(f"DB engine created pool={settings.db_pool_size}+{settings.db_max_overflow}")
+    return _engine
+
+
+def async_engine() -> "AsyncEngine":
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    global _async_engine
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                _async_engine = create_async_engine(settings.async_database_url, **_pool_options())
+                logger.info(f"DB async engine created pool={settings.db_pool_size}+{settings.db_max_overflow}")
+    return _async_engine
+
+
+def statement_timeout_ms() -> int:
+    """settings.db_statement_timeout, clamped to the active request deadline."""
+    return max(1, int(clamp_timeout(settings.db_statement_timeout) * 1000))
+
+
+def set_statement_timeout(conn: Any) -> int:
+    """Set a transaction-local statement_timeout on a Connection or Session; returns it in ms."""
+    ms = statement_timeout_ms()
+    conn.execute(_SET_STATEMENT_TIMEOUT, {"ms": str(ms)})
+    return ms
+
+
+async def set_statement_timeout_async(conn: "AsyncConnection") -> int:
+    ms = statement_timeout_ms()
+    await conn.execute(_SET_STATEMENT_TIMEOUT, {"ms": str(ms)})
+    return ms
+
+
+@contextmanager
+def connect() -> Iterator[Connection]:
+    with engine().connect() as conn:
+        transaction = conn.begin()
+        try:
+            conn.execute(_SET_READ_ONLY)
+            set_statement_timeout(conn)
+            yield conn
+        finally:
+            transaction.rollback()
+
+
+@asynccontextmanager
+async def connect_async() -> AsyncIterator["AsyncConnection"]:
+    async with async_engine().connect() as conn:
+        transaction = await conn.begin()
+        try:
+            await conn.execute(_SET_READ_ONLY)
+            await set_statement_timeout_async(conn)
+            yield conn
+        finally:
+            await transaction.rollback()
+
+
+def get_db() -> Iterator[Session]:
+    """FastAPI dependency: a Session on the pooled engine, closed after the request."""
+    db = Session(bind=engine())
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def stats() -> Dict[str, Any]:
+    """Pool state of the engines created in this worker."""
+    out = {}
+    for name, pool in (("sync", _engine and _engine.pool), ("async", _async_engine and _async_engine.sync_engine.pool)):
+        if pool:
+            out[name] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "idle": pool.checkedin(),
+            }
+    return out
+
+
+async def dispose() -> None:
+    """Close pooled connections (app shutdown)."""
+    global _engine, _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
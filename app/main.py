@@ -1,20 +1,35 @@
 """Main FastAPI application"""
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.openapi.utils import get_openapi
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 load_dotenv()
-from app.api import chat, health
+from app.api import chat, health, metrics
 from app.config.config import get_settings
+from app.core import health as health_checks
+from app.core.serialization import ORJSONResponse
+from app.db import session as db_session
 
 
 settings = get_settings()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    health_checks.checker.start()   # background dependency probes for /health*
+    yield
+    health_checks.checker.stop()
+    await db_session.dispose()      # close pooled Postgres connections
+
+
 app = FastAPI(
     title="AI Data Chatbot",
     description="Chatbot that answers questions about your Transportation Fleet",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -36,6 +51,7 @@ app.add_middleware(
 # Routers
 app.include_router(health.router, tags=["health"])
 app.include_router(chat.router, prefix="/api", tags=["chat"])
+app.include_router(metrics.router, tags=["metrics"])
 
 
 def custom_openapi():
@@ -61,3 +61,16 @@ class ChatResponse(BaseModel):
 class HealthResponse(BaseModel):
     status: str
     openai: str
+    upstream: Optional[dict[str, Any]] = Field(None, description="Upstream HTTP layer counters and breaker states")
+    fast_path: Optional[dict[str, Any]] = Field(None, description="Rule-based fast path hit/miss counters")
+    answer_cache: Optional[dict[str, Any]] = Field(None, description="Final-answer cache counters")
+    caches: Optional[dict[str, Any]] = Field(None, description="Counters of every named cache (answer, units, geocode, ...)")
+    admission: Optional[dict[str, Any]] = Field(
+        None, description="Per-user rate limiter, adaptive concurrency limiter and priority lane state of this worker"
+    )
+    database: Optional[dict[str, Any]] = Field(
+        None, description="SQL connection pool state of this worker (engines created so far)"
+    )
+    dependencies: Optional[dict[str, Any]] = Field(
+        None, description="Cached background probe per dependency: status, latency_ms, age_s, error"
+    )
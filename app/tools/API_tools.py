@@ -1,13 +1,22 @@
+import time
+
 import requests
 from typing import Dict, Optional, Any, List
 from app.schema.Auth import ActionSpec, AuthContext
 from app.config.config import get_settings
 from app.core.logging_config import get_logger
+from app.core import entity_memory, serialization, tracing, upstream
+from app.core.cache import get_cache, user_scope
+from app.core.metrics import GEOCODE_LATENCY, TOOL_LATENCY
 from app.core.date_utils import resolve_date_range
 
 logger = get_logger("api_tools")
 settings = get_settings()
 
+# Unit resolutions are per user (visibility differs); addresses are global.
+_unit_cache = get_cache("units", max_entries=settings.unit_cache_max_entries)
+_geocode_cache = get_cache("geocode", max_entries=settings.geocode_cache_max_entries)
+
 
 class ApiTool:
 
@@ -75,7 +84,9 @@ class ApiTool:
                     "For vehicle/person current location use action=vehicle_tracking_current and set query to their name, plate, or ID. "
                     "For vehicle/person location history use action=Unit_history and set query to their name, plate, or ID, plus FromDate and ToDate. "
                     "For sensor data use action=sensor_current and set unit_id. "
-                    "For alarms use action=active_alarms."
+                    "For alarms use action=active_alarms. "
+                    "For follow-up questions about the conversation's current unit, omit query and unit_id; "
+                    "omit FromDate and ToDate to reuse the last date range."
                 ),
                 "parameters": {
                     "type": "object",
@@ -92,14 +103,15 @@ class ApiTool:
                                 "Pass ONLY ONE identifier — either the plate number OR the vehicle/driver name, not both. "
                                 "Use the plate number when given (e.g. '91-ع-587-15'). "
                                 "Use the name only when no plate is available (e.g. 'سعید شاکری نسب'). "
-                                "Never concatenate name and plate together."
+                                "Never concatenate name and plate together. "
+                                "Omit it for follow-ups about the conversation's current unit."
                             ),
                         },
                         "unit_id": {
                             "type": "string",
                             "description": (
-                                "REQUIRED for sensor_current. "
-                                "The unitId returned by a previous vehicle_tracking_current call."
+                                "For sensor_current: the unitId returned by a previous vehicle_tracking_current call. "
+                                "Omit it to use the conversation's current unit."
                             ),
                         },
                         "FromDate": {
@@ -156,8 +168,29 @@ class ApiTool:
 
     # ─── Step 1: Find unitId from vehicle name/plate/ID ───────────────────────
 
+    @staticmethod
+    def _has_current_unit() -> bool:
+        memory = entity_memory.current()
+        return memory is not None and memory.current_unit is not None
+
     @staticmethod
     def _find_unit_id(query: str, auth_context: AuthContext) -> tuple[Optional[str], Optional[Dict]]:
+        memory = entity_memory.current()
+        if memory is not None:
+            remembered = memory.lookup(query)
+            if remembered is not None:
+                logger.info(f"Unit → conversation memory id={remembered['id']} query={query!r}")
+                memory.remember_unit(remembered["id"], entity_memory.EntityMemory.as_unit(remembered))
+                return remembered["id"], entity_memory.EntityMemory.as_unit(remembered)
+
+        cache_key = f"{user_scope(auth_context)}|{' '.join(query.split())}"
+        cached = _unit_cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Unit/All → cache hit id={cached['unit_id']} query={query!r}")
+            if memory is not None:
+                memory.remember_unit(cached["unit_id"], cached["unit"])
+            return cached["unit_id"], cached["unit"]
+
         url = f"{settings.backend_api_url}/api/v2/Unit/All"
         headers = ApiTool._build_headers(auth_context)
 
@@ -165,7 +198,7 @@ class ApiTool:
             logger.debug(f"Unit/All → URL={url} SearchWord={query!r}")
             logger.debug(f"Unit/All → Token[:20]={auth_context.access_token[:20]!r} X-User-Id={auth_context.user_id!r}")
 
-            response = requests.get(
+            response = upstream.get(
                 url,
                 params={"SearchWord": query},
                 headers=headers,
@@ -179,7 +212,7 @@ class ApiTool:
                 return None, {"success": False, "error": "شما دسترسی به این داده را ندارید.", "status_code": response.status_code}
 
             response.raise_for_status()
-            data = response.json()
+            data = serialization.response_json(response)
 
             if isinstance(data, list):
                 unit_list = data
@@ -218,6 +251,9 @@ class ApiTool:
                 return None, {"success": False, "error": f"فیلد 'unitId' در پاسخ API یافت نشد. فیلدهای موجود: {list(unit.keys())}"}
 
             logger.debug(f"Unit/All → matched id={unit_id} title={unit.get('title')!r}")
+            _unit_cache.set(cache_key, {"unit_id": unit_id, "unit": unit}, ttl=settings.unit_cache_ttl)
+            if memory is not None:
+                memory.remember_unit(unit_id, unit)
             return unit_id, unit
 
         except requests.exceptions.Timeout:
@@ -240,7 +276,7 @@ class ApiTool:
         logger.debug(f"Tracking → GET {url} unitIds={unit_id!r}")
 
         try:
-            response = requests.get(
+            response = upstream.get(
                 url,
                 params={"unitIds": unit_id},
                 headers=headers,
@@ -256,7 +292,7 @@ class ApiTool:
             response.raise_for_status()
 
             try:
-                data = response.json()
+                data = serialization.response_json(response)
             except Exception as json_err:
                 logger.error(f"Tracking → JSON parse failed: {json_err} body={response.text[:300]!r}")
                 return None, {"success": False, "error": "پاسخ سرور قابل پردازش نیست."}
@@ -319,7 +355,7 @@ class ApiTool:
         logger.debug(f"History → URL={url} unit_id={unit_id!r} from={from_date!r} to={to_date!r}")
 
         try:
-            response = requests.get(
+            response = upstream.get(
                 url,
                 params={"unitIds": unit_id, "FromDate": from_date, "ToDate": to_date},
                 headers=headers,
@@ -333,7 +369,7 @@ class ApiTool:
                 return None, {"success": False, "error": "شما دسترسی به این داده را ندارید.", "status_code": response.status_code}
 
             response.raise_for_status()
-            data = response.json()
+            data = serialization.response_json(response)
 
             # Response is a list of unit objects, each containing trackCoordinates
             raw_list = data if isinstance(data, list) else data.get("data", data.get("items", data.get("result", [])))
@@ -346,6 +382,8 @@ class ApiTool:
 
         except requests.exceptions.Timeout:
             return None, {"success": False, "error": "درخواست تاریخچه با timeout مواجه شد."}
+        except requests.exceptions.ConnectionError:
+            return None, {"success": False, "error": "اتصال به سرور ممکن نیست."}
         except Exception as e:
             return None, {"success": False, "error": f"خطا در دریافت تاریخچه: {str(e)}"}
 
@@ -353,17 +391,31 @@ class ApiTool:
 
     @staticmethod
     def _reverse_geocode(lat: float, lon: float) -> Optional[str]:
+        precision = settings.geocode_cache_precision
+        cache_key = f"{round(float(lat), precision)},{round(float(lon), precision)}"
+        cached = _geocode_cache.get(cache_key)
+        if cached is not None:
+            GEOCODE_LATENCY.labels(outcome="cached").observe(0)
+            return cached
+
+        started = time.perf_counter()
         try:
-            response = requests.get(
-                "https://nominatim.shonizcloud.ir/reverse",
-                params={"lat": lat, "lon": lon, "format": "json"},
-                timeout=5,
-                headers={"Accept-Language": "fa"},
-            )
+            with tracing.span("geocode"):
+                response = upstream.get(
+                    settings.geocoder_url,
+                    params={"lat": lat, "lon": lon, "format": "json"},
+                    timeout=settings.geocoder_timeout,
+                    headers={"Accept-Language": "fa"},
+                )
             response.raise_for_status()
-            data = response.json()
-            return data.get("display_name")
+            data = serialization.response_json(response)
+            address = data.get("display_name")
+            GEOCODE_LATENCY.labels(outcome="ok" if address else "empty").observe(time.perf_counter() - started)
+            if address:
+                _geocode_cache.set(cache_key, address, ttl=settings.geocode_cache_ttl)
+            return address
         except Exception:
+            GEOCODE_LATENCY.labels(outcome="error").observe(time.perf_counter() - started)
             return None
 
     # ─── Helper: extract a named parameter from the parameters[] array ─────────
@@ -381,7 +433,7 @@ class ApiTool:
     @staticmethod
     def _vehicle_tracking_current(params: Dict[str, Any], auth_context: AuthContext) -> Dict[str, Any]:
         query = params.get("query", "").strip()
-        if not query:
+        if not query and not ApiTool._has_current_unit():
             return {"success": False, "error": "query is required. Example: query='سعید شاکری نسب'"}
 
         unit_id, unit_data = ApiTool._find_unit_id(query, auth_context)
@@ -466,8 +518,14 @@ class ApiTool:
         from_raw  = params.get("FromDate", "").strip()
         to_raw    = params.get("ToDate", "").strip()
 
+        # Follow-ups: the conversation's current unit and last date range fill the gaps
+        memory = entity_memory.current()
+        if memory is not None and memory.date_range and not (from_raw or to_raw):
+            from_raw, to_raw = memory.date_range["from"], memory.date_range["to"]
+        has_unit = bool(query) or ApiTool._has_current_unit()
+
         # Validate required fields before any API call
-        missing = [f for f, v in [("query", query), ("FromDate", from_raw), ("ToDate", to_raw)] if not v]
+        missing = [f for f, v in [("query", has_unit), ("FromDate", from_raw), ("ToDate", to_raw)] if not v]
         if missing:
             return {
                 "success": False,
@@ -488,6 +546,8 @@ class ApiTool:
         unit_id, unit_data = ApiTool._find_unit_id(query, auth_context)
         if unit_id is None:
             return unit_data
+        if memory is not None:
+            memory.remember_dates(from_date, to_date)
 
         logger.info(f"History → unit_id={unit_id} query={query!r} from={from_date!r} to={to_date!r}")
 
@@ -619,6 +679,29 @@ class ApiTool:
         FromDate: Optional[str] = None,
         ToDate: Optional[str] = None,
     ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with tracing.span("tool", action=action) as tool_span:
+            result = ApiTool._dispatch(
+                action, params, auth_context, query, unit_id, filters, FromDate, ToDate,
+            )
+            if not result.get("success"):
+                tool_span.fail(result.get("error", "tool call failed"))
+        outcome = "ok" if result.get("success") else "error"
+        label = action if action in ApiTool.ACTIONS else "unsupported"
+        TOOL_LATENCY.labels(action=label, outcome=outcome).observe(time.perf_counter() - started)
+        return result
+
+    @staticmethod
+    def _dispatch(
+        action: str,
+        params: Optional[Dict[str, Any]],
+        auth_context: Optional[AuthContext],
+        query: Optional[str],
+        unit_id: Optional[str],
+        filters: Optional[Dict[str, Any]],
+        FromDate: Optional[str],
+        ToDate: Optional[str],
+    ) -> Dict[str, Any]:
 
         if action not in ApiTool.ACTIONS:
             return {"success": False, "error": f"Unsupported action: {action}"}
@@ -628,7 +711,7 @@ class ApiTool:
         # ── vehicle_tracking_current ──────────────────────────────────────────
         if action == "vehicle_tracking_current":
             resolved_query = query or (params or {}).get("query") or (params or {}).get("unitId")
-            if not resolved_query:
+            if not resolved_query and not ApiTool._has_current_unit():
                 return {"success": False, "error": "query is required for vehicle_tracking_current."}
             return ApiTool._vehicle_tracking_current({"query": resolved_query}, auth_context)
 
@@ -645,6 +728,11 @@ class ApiTool:
         # ── sensor_current ────────────────────────────────────────────────────
         if action == "sensor_current":
             resolved_unit_id = unit_id or (params or {}).get("UnitId") or (params or {}).get("unitId")
+            if not resolved_unit_id and (query or ApiTool._has_current_unit()):
+                # a name / plate, or the conversation's current unit
+                resolved_unit_id, unit_data = ApiTool._find_unit_id(query or "", auth_context)
+                if resolved_unit_id is None:
+                    return unit_data
             if not resolved_unit_id:
                 return {"success": False, "error": "unit_id is required for sensor_current."}
             params = {"UnitId": resolved_unit_id}
@@ -666,9 +754,9 @@ class ApiTool:
         try:
             method = spec.method.upper()
             if method == "GET":
-                response = requests.get(url, params=clean_params, headers=headers, timeout=settings.api_timeout)
+                response = upstream.get(url, params=clean_params, headers=headers, timeout=settings.api_timeout)
             elif method == "POST":
-                response = requests.post(url, json=clean_params, headers=headers, timeout=settings.api_timeout)
+                response = upstream.post(url, json=clean_params, headers=headers, timeout=settings.api_timeout)
             else:
                 return {"success": False, "error": f"Unsupported HTTP method: {spec.method}"}
 
@@ -679,7 +767,7 @@ class ApiTool:
             response.raise_for_status()
 
             try:
-                payload = response.json()
+                payload = serialization.response_json(response)
             except Exception:
                 payload = {"raw_text": response.text}
 
@@ -2,12 +2,61 @@ from __future__ import annotations
 
 import re
 
-from sqlalchemy import text
+from sqlalchemy import Connection, Row, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
-from typing import Any
-from app.config import get_settings
+from typing import TYPE_CHECKING, Any, Optional, Union
+from app.config.config import get_settings
+from app.core import serialization, sql_cache
+from app.core.logging_config import get_logger
+from app.db import session
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncConnection
 
 settings = get_settings()
+logger = get_logger("sql_tool")
+
+QUERY_CANCELED = "57014"   # Postgres SQLSTATE raised when statement_timeout fires
+
+
+class _ResultRows:
+    """Rows read from a streamed result, capped at max_query_rows rows and sql_max_result_bytes JSON bytes."""
+
+    def __init__(self):
+        self.rows: list[dict[str, Any]] = []
+        self.bytes = 0
+        self.truncated: Optional[str] = None
+
+    def add(self, row: Row) -> bool:
+        """Keep the row; False once a cap is reached and reading should stop."""
+        if len(self.rows) >= settings.max_query_rows:
+            self.truncated = "rows"
+            return False
+        item = dict(row._mapping)
+        size = len(serialization.dumpb(item))
+        if self.bytes + size > settings.sql_max_result_bytes:
+            self.truncated = "bytes"
+            return False
+        self.rows.append(item)
+        self.bytes += size
+        return True
+
+    def response(self, query: str) -> dict[str, Any]:
+        result = {
+            "success": True,
+            "rows": self.rows,
+            "row_count": len(self.rows),
+            "query_executed": query,
+        }
+        if self.truncated:
+            logger.warning(f"SQL result truncated by {self.truncated} rows={len(self.rows)} bytes={self.bytes}")
+            result["truncated"] = self.truncated
+            result["note"] = (
+                f"Result cut at {len(self.rows)} rows ({self.truncated} limit). "
+                "Aggregate in SQL (COUNT/AVG/GROUP BY) or narrow the filters instead of reading raw rows."
+            )
+        return result
 
 
 class SQLTool:
@@ -64,38 +113,135 @@ class SQLTool:
         return True, "Query validated"
 
     @staticmethod
-    def execute_query(db: Session, query: str) -> dict[str, Any]:
-        """Execute SQL query and return results"""
-
-        # Validate query first
+    def _prepare(query: str) -> tuple[str, Optional[dict[str, Any]]]:
+        """Validated query with the row limit applied, or the error response."""
         is_valid, message = SQLTool.validate_query(query)
         if not is_valid:
-            return {
+            return query, {
                 "success": False,
                 "error": message,
                 "rows": [],
                 "query": query
             }
+        # Add row limit
+        if "LIMIT" not in query.upper():
+            query = f"{query.rstrip(';')} LIMIT {settings.max_query_rows}"
+        return query, None
+
+    @staticmethod
+    def _statement(query: str):
+        # yield_per → server-side cursor, rows arrive sql_stream_batch_size at a time
+        return text(query).execution_options(yield_per=settings.sql_stream_batch_size)
+
+    @staticmethod
+    def _error(query: str, e: Exception) -> dict[str, Any]:
+        orig = getattr(e, "orig", None)
+        if isinstance(e, DBAPIError) and QUERY_CANCELED in (getattr(orig, "pgcode", None), getattr(orig, "sqlstate", None)):
+            logger.warning(f"SQL statement_timeout query={query[:200]!r}")
+            error = (
+                f"Query cancelled after the {settings.db_statement_timeout:g}s statement timeout. "
+                "Narrow the date range or filter on indexed columns."
+            )
+        else:
+            error = str(e)
+        return {
+            "success": False,
+            "error": error,
+            "rows": [],
+            "query": query
+        }
+
+    @staticmethod
+    def execute_query(
+        db: Optional[Union[Session, Connection]],
+        query: str,
+        params: Optional[dict[str, Any]] = None,
+        use_cache: bool = True,
+    ) -> dict[str, Any]:
+        """Execute SQL query and return results
+
+        Runs on `db` when given, otherwise on a pooled read-only connection
+        (app.db.session). Rows are streamed and reading stops at the row / byte cap.
+        Results are served from / stored in the SQL result cache (sql_cache.py).
+        """
+        query, error = SQLTool._prepare(query)
+        if error:
+            return error
+
+        key, tables = sql_cache.make_key(query, params) if use_cache else (None, [])
+        cached = sql_cache.get(key) if key else None
+        if cached is not None:
+            logger.debug(f"SQL_CACHE hit tables={tables}")
+            return cached
 
         try:
-            # Add row limit
-            if "LIMIT" not in query.upper():
-                query = f"{query.rstrip(';')} LIMIT {settings.max_query_rows}"
-
-            result = db.execute(text(query))
-            rows = [dict(row._mapping) for row in result]
-
-            return {
-                "success": True,
-                "rows": rows,
-                "row_count": len(rows),
-                "query_executed": query
-            }
+            if db is None:
+                with session.connect() as conn:
+                    result = SQLTool._read(conn, query, params)
+            else:
+                session.set_statement_timeout(db)
+                result = SQLTool._read(db, query, params)
 
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "rows": [],
-                "query": query
-            }
+            return SQLTool._error(query, e)
+
+        if key:
+            sql_cache.put(key, query, tables, result)
+        return result
+
+    @staticmethod
+    def _read(db: Union[Session, Connection], query: str, params: Optional[dict[str, Any]]) -> dict[str, Any]:
+        rows = _ResultRows()
+        result = db.execute(SQLTool._statement(query), params or {})
+        try:
+            for partition in result.partitions():
+                if not all(rows.add(row) for row in partition):
+                    break
+        finally:
+            result.close()   # releases the server-side cursor early when a cap was hit
+        return rows.response(query)
+
+    @staticmethod
+    async def execute_query_async(
+        query: str,
+        params: Optional[dict[str, Any]] = None,
+        conn: Optional[AsyncConnection] = None,
+        use_cache: bool = True,
+    ) -> dict[str, Any]:
+        """Async (asyncpg) variant of execute_query."""
+        query, error = SQLTool._prepare(query)
+        if error:
+            return error
+
+        key, tables = sql_cache.make_key(query, params) if use_cache else (None, [])
+        cached = sql_cache.get(key) if key else None
+        if cached is not None:
+            logger.debug(f"SQL_CACHE hit tables={tables}")
+            return cached
+
+        try:
+            if conn is None:
+                async with session.connect_async() as conn:
+                    result = await SQLTool._read_async(conn, query, params)
+            else:
+                await session.set_statement_timeout_async(conn)
+                result = await SQLTool._read_async(conn, query, params)
+
+        except Exception as e:
+            return SQLTool._error(query, e)
+
+        if key:
+            sql_cache.put(key, query, tables, result)
+        return result
+
+    @staticmethod
+    async def _read_async(conn: AsyncConnection, query: str, params: Optional[dict[str, Any]]) -> dict[str, Any]:
+        rows = _ResultRows()
+        result = await conn.stream(SQLTool._statement(query), params or {})
+        try:
+            async for partition in result.partitions():
+                if not all(rows.add(row) for row in partition):
+                    break
+        finally:
+            await result.close()
+        return rows.response(query)
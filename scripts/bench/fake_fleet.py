@@ -0,0 +1,256 @@
+"""Fake fleet backend + Nominatim geocoder for the benchmark.
+
+Implements the endpoints ApiTool calls, with the response shapes documented in
+app/tools/API_tools.py:
+  GET /api/v2/Unit/All                              units matching SearchWord
+  GET /api/v2/Unit/TrackingUnitsByUnitIds           latest position of unitIds
+  GET /api/v2/Unit/UnitCoordinatesForTrackingPage   trackCoordinates between FromDate and ToDate
+  GET /api/v2/SystemParameter                       sensor values of UnitId
+  GET /api/v2/Alarm/AlarmsList                      active alarms (paged)
+  GET /api/v2/AlaramLog                             alarm log (paged)
+  GET /api/v2/AlaramLog/GetContinuingAlarmLogs      ongoing alarm log (paged)
+  GET /reverse                                      Nominatim reverse geocoding
+  GET /healthz                                      readiness (never delayed)
+
+The fleet is generated deterministically: units "ماشین 100" … "ماشین 299" plus a
+few named people (two of them share the surname "رضایی" to exercise the
+multiple-match path). Every response is a pure function of the request, so two
+runs of the benchmark see identical data.
+
+Latency per request = BENCH_BACKEND_LATENCY_MS ± BENCH_BACKEND_JITTER_MS
+(geocoder: BENCH_GEOCODER_LATENCY_MS). History is sampled every
+BENCH_HISTORY_INTERVAL_MIN minutes, capped at BENCH_HISTORY_MAX_POINTS records.
+
+Run standalone:
+  python scripts/bench/fake_fleet.py --port 18002
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Query
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.core.jalali import format_jalali  # noqa: E402
+
+BACKEND_LATENCY_MS = float(os.getenv("BENCH_BACKEND_LATENCY_MS", "60"))
+BACKEND_JITTER_MS = float(os.getenv("BENCH_BACKEND_JITTER_MS", "20"))
+GEOCODER_LATENCY_MS = float(os.getenv("BENCH_GEOCODER_LATENCY_MS", "80"))
+HISTORY_INTERVAL_MIN = int(os.getenv("BENCH_HISTORY_INTERVAL_MIN", "10"))
+HISTORY_MAX_POINTS = int(os.getenv("BENCH_HISTORY_MAX_POINTS", "500"))
+
+IRAN_TZ = timezone(timedelta(hours=3, minutes=30))
+_PLATE_LETTERS = "بجدسصطعقلمنوهی"
+
+app = FastAPI(title="fake-fleet")
+_rng = random.Random(int(os.getenv("BENCH_SEED", "7")))
+
+
+def _build_fleet() -> List[Dict[str, Any]]:
+    units = []
+    for n in range(100, 300):
+        letter = _PLATE_LETTERS[n % len(_PLATE_LETTERS)]
+        units.append({
+            "unitId": f"unit-{n:04d}",
+            "title": f"ماشین {n}",
+            "secondTitle": f"{10 + n % 89}-{letter}-{100 + (n * 7) % 900}-{10 + n % 90}",
+            "unitTypeIconName": ("کامیون", "وانت", "سدان")[n % 3],
+        })
+    for i, name in enumerate(["سعید شاکری نسب", "علی رضایی", "حسن رضایی", "مریم احمدی"]):
+        units.append({
+            "unitId": f"person-{i:04d}",
+            "title": name,
+            "secondTitle": None,
+            "unitTypeIconName": "شخص",
+        })
+    return units
+
+
+FLEET = _build_fleet()
+FLEET_BY_ID = {u["unitId"]: u for u in FLEET}
+
+
+def _seed(*parts: Any) -> int:
+    return int(hashlib.md5("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _position(unit_id: str, minute: int) -> Dict[str, float]:
+    """Deterministic slow drift around Tabriz."""
+    r = random.Random(_seed(unit_id, minute // 10))
+    return {"latitude": round(38.05 + r.uniform(-0.15, 0.15), 6), "longitude": round(46.30 + r.uniform(-0.2, 0.2), 6)}
+
+
+def _parameters(unit_id: str, minute: int) -> List[Dict[str, Any]]:
+    r = random.Random(_seed(unit_id, minute, "p"))
+    return [
+        {"systemParameterTitle": "سرعت", "value": str(r.randint(0, 125))},
+        {"systemParameterTitle": "دما", "value": str(round(r.uniform(2, 8), 1))},
+        {"systemParameterTitle": "رطوبت", "value": str(r.randint(30, 70))},
+        {"systemParameterTitle": "سیگنال دریافتی", "value": r.choice(["عالی", "خوب", "ضعیف"])},
+    ]
+
+
+def _persian_timestamp(ts: datetime) -> str:
+    local = ts.astimezone(IRAN_TZ)
+    return f"{format_jalali(local.date())} - {local:%H:%M}"
+
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+async def _delay(base_ms: float, jitter_ms: float = 0.0) -> None:
+    await asyncio.sleep(max(0.0, base_ms + _rng.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+
+def _matches(unit: Dict[str, Any], word: str) -> bool:
+    word = " ".join(word.split())
+    if not word:
+        return False
+    title = unit["title"]
+    if word == title or word in title.split() or (len(word) >= 4 and word in title):
+        return True
+    plate = unit.get("secondTitle") or ""
+    return word.replace(" ", "-") == plate
+
+
+def _paged(items: List[Dict[str, Any]], page: int, size: int) -> Dict[str, Any]:
+    start = max(0, (page - 1) * size)
+    return {"data": items[start:start + size], "totalCount": len(items), "pageNumber": page, "pageSize": size}
+
+
+def _alarms(seed_word: str, count: int) -> List[Dict[str, Any]]:
+    r = random.Random(_seed("alarms", seed_word))
+    now = datetime.now(timezone.utc)
+    alarms = []
+    for i in range(count):
+        unit = FLEET[r.randrange(len(FLEET))]
+        ts = now - timedelta(minutes=r.randint(1, 7 * 24 * 60))
+        alarms.append({
+            "id": f"alarm-{seed_word}-{i}",
+            "unitId": unit["unitId"],
+            "unitTitle": unit["title"],
+            "alarmTitle": r.choice(["سرعت غیرمجاز", "خروج از محدوده", "دمای بالا", "قطع سیگنال"]),
+            "timestamp": ts.isoformat().replace("+00:00", "Z"),
+            "persianTimestamp": _persian_timestamp(ts),
+        })
+    return alarms
+
+
+# ── Fleet endpoints ───────────────────────────────────────────────────────────
+
+@app.get("/api/v2/Unit/All")
+async def unit_all(SearchWord: str = ""):
+    await _delay(BACKEND_LATENCY_MS, BACKEND_JITTER_MS)
+    return [u for u in FLEET if _matches(u, SearchWord)]
+
+
+@app.get("/api/v2/Unit/TrackingUnitsByUnitIds")
+async def tracking(unitIds: str = ""):
+    await _delay(BACKEND_LATENCY_MS, BACKEND_JITTER_MS)
+    now = datetime.now(timezone.utc)
+    minute = int(now.timestamp() // 60)
+    result = []
+    for unit_id in unitIds.split(","):
+        if unit_id not in FLEET_BY_ID:
+            continue
+        online = _seed(unit_id) % 4 != 0
+        result.append({
+            "unitId": unit_id,
+            "isOnline": online,
+            "timestampStatus": "لحظاتی پیش" if online else "۳ ساعت پیش",
+            "latestTrackRecordCoordinates": _position(unit_id, minute),
+            "direction": _seed(unit_id, minute) % 360,
+            "timestamp": now.isoformat().replace("+00:00", "Z"),
+            "markerParameters": _parameters(unit_id, minute),
+        })
+    return result
+
+
+@app.get("/api/v2/Unit/UnitCoordinatesForTrackingPage")
+async def coordinates(unitIds: str = "", FromDate: Optional[str] = None, ToDate: Optional[str] = None):
+    await _delay(BACKEND_LATENCY_MS, BACKEND_JITTER_MS)
+    start, end = _parse_iso(FromDate), _parse_iso(ToDate)
+    if unitIds not in FLEET_BY_ID or start is None or end is None or end < start:
+        return []
+
+    step = timedelta(minutes=HISTORY_INTERVAL_MIN)
+    total = int((end - start) / step) + 1
+    stride = max(1, -(-total // HISTORY_MAX_POINTS))
+    records = []
+    for i in range(0, total, stride):
+        ts = start + i * step
+        minute = int(ts.timestamp() // 60)
+        records.append({
+            "recordId": f"{unitIds}-{minute}",
+            **_position(unitIds, minute),
+            "direction": _seed(unitIds, minute) % 360,
+            "timestamp": ts.isoformat().replace("+00:00", "Z"),
+            "persianTimestamp": _persian_timestamp(ts),
+            "parameters": _parameters(unitIds, minute),
+        })
+    return [{
+        "unitId": unitIds,
+        "markerTitle": FLEET_BY_ID[unitIds]["title"],
+        "trackCoordinates": records,
+        "logCoordinates": [],
+    }]
+
+
+@app.get("/api/v2/SystemParameter")
+async def system_parameter(UnitId: str = ""):
+    await _delay(BACKEND_LATENCY_MS, BACKEND_JITTER_MS)
+    minute = int(datetime.now(timezone.utc).timestamp() // 60)
+    return {"unitId": UnitId, "parameters": _parameters(UnitId, minute)}
+
+
+@app.get("/api/v2/Alarm/AlarmsList")
+async def alarms_list(PageNumber: int = 1, PageSize: int = 20, SearchString: str = ""):
+    await _delay(BACKEND_LATENCY_MS, BACKEND_JITTER_MS)
+    return _paged(_alarms(f"active{SearchString}", 12), PageNumber, PageSize)
+
+
+@app.get("/api/v2/AlaramLog")
+async def alarm_log(PageNumber: int = 1, PageSize: int = 20, SearchWord: str = ""):
+    await _delay(BACKEND_LATENCY_MS, BACKEND_JITTER_MS)
+    return _paged(_alarms(f"log{SearchWord}", 40), PageNumber, PageSize)
+
+
+@app.get("/api/v2/AlaramLog/GetContinuingAlarmLogs")
+async def continuing_alarm_log(PageNumber: int = 1, PageSize: int = 20, SearchWord: str = ""):
+    await _delay(BACKEND_LATENCY_MS, BACKEND_JITTER_MS)
+    return _paged(_alarms(f"continuing{SearchWord}", 8), PageNumber, PageSize)
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+# ── Geocoder ──────────────────────────────────────────────────────────────────
+
+@app.get("/reverse")
+async def reverse(lat: float = Query(...), lon: float = Query(...), format: str = "json"):
+    await _delay(GEOCODER_LATENCY_MS)
+    district = _seed(round(lat, 3), round(lon, 3)) % 12 + 1
+    return {"display_name": f"منطقه {district}، تبریز، استان آذربایجان شرقی، ایران", "lat": lat, "lon": lon}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=18002)
+    args = ap.parse_args()
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
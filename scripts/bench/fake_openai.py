@@ -0,0 +1,136 @@
+"""Fake OpenAI-compatible chat completions server for the benchmark.
+
+Replays the scripted conversations from scenarios.py:
+  last message from the user  → the query's tool calls (or its answer if it has none)
+  last message from a tool    → the query's final answer (a "loops" query repeats its
+                                tool calls instead, until the request sets tool_choice="none")
+  unknown user message        → a short generic answer
+
+Latency per completion = BENCH_LLM_LATENCY_MS ± BENCH_LLM_JITTER_MS
+                         + BENCH_LLM_MS_PER_TOKEN × completion tokens
+BENCH_LLM_MODEL_LATENCY_MS ("gpt-4o=1200,gpt-4o-mini=400") overrides the base
+latency per requested model, to compare model tiers.
+Token usage is estimated from message length (~4 chars per token); GET /bench/usage
+returns calls and tokens per model.
+With BENCH_LLM_CAPACITY > 0 at most that many completions are served at once and
+the rest queue, like a provider under load: latency then grows with concurrency.
+
+Run standalone:
+  python scripts/bench/fake_openai.py --port 18001
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scenarios import scripted_reply  # noqa: E402
+
+LATENCY_MS = float(os.getenv("BENCH_LLM_LATENCY_MS", "400"))
+JITTER_MS = float(os.getenv("BENCH_LLM_JITTER_MS", "100"))
+MS_PER_TOKEN = float(os.getenv("BENCH_LLM_MS_PER_TOKEN", "0"))
+CAPACITY = int(os.getenv("BENCH_LLM_CAPACITY", "0"))
+MODEL_LATENCY_MS = {
+    model.strip(): float(ms)
+    for model, ms in (kv.split("=", 1) for kv in os.getenv("BENCH_LLM_MODEL_LATENCY_MS", "").split(",") if "=" in kv)
+}
+
+app = FastAPI(title="fake-openai")
+_rng = random.Random(int(os.getenv("BENCH_SEED", "7")))
+_capacity = asyncio.Semaphore(CAPACITY) if CAPACITY > 0 else None
+_usage: dict = {}
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _last_user_message(messages: list) -> str:
+    for m in reversed(messages):
+        if m.get("role") == "user":
+            return m.get("content") or ""
+    return ""
+
+
+def _completion(model: str, message: dict, finish_reason: str, prompt_tokens: int, completion_tokens: int) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages", [])
+    model = body.get("model", "fake-model")
+    prompt_tokens = sum(_tokens(json.dumps(m, ensure_ascii=False)) for m in messages)
+
+    query = scripted_reply(_last_user_message(messages))
+    last_role = messages[-1].get("role") if messages else "user"
+
+    repeat = query is not None and query.loops and body.get("tool_choice") != "none"
+    if query is not None and query.tool_calls and (last_role != "tool" or repeat):
+        tool_calls = [
+            {
+                "id": f"call_{uuid.uuid4().hex[:16]}",
+                "type": "function",
+                "function": {"name": "call_backend_api", "arguments": json.dumps(args, ensure_ascii=False)},
+            }
+            for args in query.tool_calls
+        ]
+        message = {"role": "assistant", "content": None, "tool_calls": tool_calls}
+        completion_tokens = sum(_tokens(tc["function"]["arguments"]) for tc in tool_calls)
+        finish_reason = "tool_calls"
+    else:
+        content = query.answer if query is not None else "متوجه سؤال شدم، اما اطلاعات بیشتری لازم است."
+        message = {"role": "assistant", "content": content}
+        completion_tokens = _tokens(content)
+        finish_reason = "stop"
+
+    usage = _usage.setdefault(model, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+    usage["calls"] += 1
+    usage["prompt_tokens"] += prompt_tokens
+    usage["completion_tokens"] += completion_tokens
+
+    delay_ms = max(0.0, MODEL_LATENCY_MS.get(model, LATENCY_MS) + _rng.uniform(-JITTER_MS, JITTER_MS)) + MS_PER_TOKEN * completion_tokens
+    if _capacity is not None:
+        async with _capacity:
+            await asyncio.sleep(delay_ms / 1000)
+    else:
+        await asyncio.sleep(delay_ms / 1000)
+    return _completion(model, message, finish_reason, prompt_tokens, completion_tokens)
+
+
+@app.get("/bench/usage")
+async def usage():
+    return _usage
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "fake-model", "object": "model", "owned_by": "bench"}]}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=18001)
+    args = ap.parse_args()
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
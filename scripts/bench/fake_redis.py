@@ -0,0 +1,312 @@
+"""Redis-protocol stand-in for the cache / conversation-store backends.
+
+Speaks RESP2 over TCP, so the real redis-py client (connection pool, pipelines)
+is exercised exactly as against Redis. Implements the commands the app uses:
+
+  PING ECHO CLIENT SELECT INFO QUIT
+  GET SET(EX/PX/NX/XX) MGET MSET DEL UNLINK EXISTS
+  EXPIRE PEXPIRE TTL PTTL SCAN(MATCH/COUNT) KEYS DBSIZE FLUSHDB FLUSHALL
+  RPUSH LRANGE LTRIM LLEN
+
+One asyncio loop serves every connection, so each command is atomic. Expired keys
+are dropped lazily on access. Data lives in memory only.
+
+In-process (a background thread):
+  with FakeRedis() as url:          # "redis://127.0.0.1:<port>/0"
+      client = redis.Redis.from_url(url)
+
+Standalone (shared by several uvicorn workers, e.g. from LocalStack):
+  python scripts/bench/fake_redis.py --port 16379
+"""
+import argparse
+import asyncio
+import fnmatch
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_Value = Tuple[Any, Optional[float]]   # (bytes | list[bytes], expires_at monotonic seconds)
+
+
+class _Error(Exception):
+    pass
+
+
+class Store:
+    def __init__(self):
+        self.data: Dict[bytes, _Value] = {}
+
+    def _live(self, key: bytes) -> Optional[Any]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _expiry(self, key: bytes) -> Optional[float]:
+        return self.data[key][1] if self._live(key) is not None else None
+
+    def _list(self, key: bytes) -> List[bytes]:
+        value = self._live(key)
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    # ── commands ──────────────────────────────────────────────────────────────
+
+    def execute(self, args: List[bytes]) -> Any:
+        name = args[0].decode().upper()
+        handler = getattr(self, f"cmd_{name}", None)
+        if handler is None:
+            raise _Error(f"ERR unknown command '{name}'")
+        return handler(*args[1:])
+
+    def cmd_PING(self, *args):
+        return args[0] if args else "+PONG"
+
+    def cmd_ECHO(self, message):
+        return message
+
+    def cmd_CLIENT(self, *args):
+        return "+OK"
+
+    def cmd_SELECT(self, db):
+        return "+OK"
+
+    def cmd_INFO(self, *args):
+        return b"# Server\r\nredis_version:7.0.0-standin\r\n"
+
+    def cmd_GET(self, key):
+        value = self._live(key)
+        if isinstance(value, list):
+            raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def cmd_SET(self, key, value, *options):
+        expires_at, nx, xx = None, False, False
+        opts = [o.decode().upper() for o in options]
+        i = 0
+        while i < len(opts):
+            if opts[i] in ("EX", "PX"):
+                amount = float(options[i + 1])
+                expires_at = time.monotonic() + (amount if opts[i] == "EX" else amount / 1000)
+                i += 2
+                continue
+            nx, xx = nx or opts[i] == "NX", xx or opts[i] == "XX"
+            i += 1
+        exists = self._live(key) is not None
+        if (nx and exists) or (xx and not exists):
+            return None
+        self.data[key] = (value, expires_at)
+        return "+OK"
+
+    def cmd_MGET(self, *keys):
+        return [v if not isinstance(v := self._live(k), list) else None for k in keys]
+
+    def cmd_MSET(self, *pairs):
+        for key, value in zip(pairs[::2], pairs[1::2]):
+            self.data[key] = (value, None)
+        return "+OK"
+
+    def cmd_DEL(self, *keys):
+        return sum(1 for k in keys if self._live(k) is not None and self.data.pop(k, None) is not None)
+
+    cmd_UNLINK = cmd_DEL
+
+    def cmd_EXISTS(self, *keys):
+        return sum(1 for k in keys if self._live(k) is not None)
+
+    def cmd_PEXPIRE(self, key, ms):
+        if self._live(key) is None:
+            return 0
+        self.data[key] = (self.data[key][0], time.monotonic() + int(ms) / 1000)
+        return 1
+
+    def cmd_EXPIRE(self, key, seconds):
+        return self.cmd_PEXPIRE(key, int(seconds) * 1000)
+
+    def cmd_PTTL(self, key):
+        if self._live(key) is None:
+            return -2
+        expires_at = self._expiry(key)
+        return -1 if expires_at is None else int((expires_at - time.monotonic()) * 1000)
+
+    def cmd_TTL(self, key):
+        ttl = self.cmd_PTTL(key)
+        return ttl if ttl < 0 else (ttl + 999) // 1000
+
+    def _matching(self, pattern: bytes) -> List[bytes]:
+        pat = pattern.decode("utf-8", "replace")
+        return [k for k in list(self.data) if self._live(k) is not None and fnmatch.fnmatchcase(k.decode("utf-8", "replace"), pat)]
+
+    def cmd_KEYS(self, pattern):
+        return self._matching(pattern)
+
+    def cmd_SCAN(self, cursor, *options):
+        opts = {options[i].decode().upper(): options[i + 1] for i in range(0, len(options) - 1, 2)}
+        keys = self._matching(opts.get("MATCH", b"*"))
+        start, count = int(cursor), int(opts.get("COUNT", b"10"))
+        batch = keys[start:start + count]
+        next_cursor = start + count if start + count < len(keys) else 0
+        return [str(next_cursor).encode(), batch]
+
+    def cmd_DBSIZE(self):
+        return sum(1 for k in list(self.data) if self._live(k) is not None)
+
+    def cmd_FLUSHDB(self, *args):
+        self.data.clear()
+        return "+OK"
+
+    cmd_FLUSHALL = cmd_FLUSHDB
+
+    def cmd_RPUSH(self, key, *values):
+        items = self._list(key)
+        items.extend(values)
+        self.data[key] = (items, self._expiry(key))
+        return len(items)
+
+    def cmd_LRANGE(self, key, start, stop):
+        items = self._list(key)
+        start, stop = int(start), int(stop)
+        n = len(items)
+        start = max(0, n + start if start < 0 else start)
+        stop = n + stop if stop < 0 else min(stop, n - 1)
+        return items[start:stop + 1]
+
+    def cmd_LTRIM(self, key, start, stop):
+        if self._live(key) is not None:
+            kept = self.cmd_LRANGE(key, start, stop)
+            if kept:
+                self.data[key] = (kept, self._expiry(key))
+            else:
+                del self.data[key]
+        return "+OK"
+
+    def cmd_LLEN(self, key):
+        return len(self._list(key))
+
+
+# ── RESP2 ─────────────────────────────────────────────────────────────────────
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):          # status reply, e.g. "+OK"
+        return value.encode() + b"\r\n"
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(v) for v in value)
+    raise TypeError(type(value))
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):                       # inline command (redis-cli / telnet)
+        return line.strip().split()
+    args = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()                 # $<len>
+        data = await reader.readexactly(int(header[1:]) + 2)
+        args.append(data[:-2])
+    return args
+
+
+class FakeRedis:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.store = Store()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await _read_command(reader)
+                if not args:
+                    break
+                if args[0].upper() == b"QUIT":
+                    writer.write(b"+OK\r\n")
+                    break
+                try:
+                    reply = _encode(self.store.execute(args))
+                except _Error as e:
+                    reply = f"-{e}\r\n".encode()
+                except (ValueError, IndexError, TypeError) as e:
+                    reply = f"-ERR {e}\r\n".encode()
+                writer.write(reply)
+                await writer.drain()     # only waits when the client stops reading
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def start(self) -> "FakeRedis":
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="fake-redis", daemon=True)
+        self._thread.start()
+        ready.wait(5)
+        return self
+
+    async def _shutdown(self) -> None:
+        self._server.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        asyncio.get_running_loop().stop()
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            self._thread.join(5)
+            self._loop.close()
+            self._loop = None
+
+    def __enter__(self) -> str:
+        return self.start().url
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=16379)
+    args = ap.parse_args()
+
+    async def main():
+        server = FakeRedis(port=args.port)
+        await server.serve()
+        print(f"fake redis on {server.url}", flush=True)
+        await server._server.serve_forever()
+
+    asyncio.run(main())
@@ -0,0 +1,314 @@
+"""Replay recorded /api/chat traffic as concurrent load.
+
+Traffic comes from the app's traffic recorder (settings.traffic_record_enabled →
+logs/traffic.jsonl, see app/core/traffic.py) or, without --traffic, from a
+scenario mix in scenarios.py. Recorded users keep their pseudonymous ids, so
+per-user effects (answer cache, rate limits) replay faithfully. When only the
+history length was recorded, neutral filler turns of that length are sent.
+
+Load shapes:
+  --concurrency N             closed loop: N operators, each sends its next request
+                              as soon as the previous answer arrives (+ --think-ms)
+  --rate R                    open loop: Poisson arrivals at R req/s, independent of
+                              response times (no coordinated omission)
+  --speed S                   open loop: recorded inter-arrival times divided by S
+  --ramp 1,2,4,8,16           closed-loop stages of increasing concurrency
+  --ramp-rate 1,2,4,8         open-loop stages of increasing arrival rate
+Stages last --stage-seconds; single runs last --duration.
+
+Per stage it reports offered load, achieved throughput, latency p50/p95/p99,
+error rate, status counts and peak in-flight requests (+ CPU / RSS with --local,
+and LLM calls and tokens per model for the whole run).
+For ramps it also reports the saturation point: the last stage that met the SLO
+(--slo-p95-ms, --max-error-rate) and the stage where throughput stopped growing —
+i.e. how many concurrent operators one worker handles.
+
+Target:
+  --url http://host:8000      an already running app
+  --local                     start app + fakes locally (see stack.py; --workers, latency flags)
+
+Run:
+  python scripts/bench/replay.py --local --ramp 1,2,4,8,16,32 --stage-seconds 20 --out ramp.json
+  python scripts/bench/replay.py --url http://localhost:8000 --traffic logs/traffic.jsonl --rate 3 --duration 120
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scenarios import QUERIES, SCENARIOS  # noqa: E402
+from stack import LocalStack, ResourceSampler, add_stack_arguments, git_commit, percentile  # noqa: E402
+
+_FILLER_TURNS = [
+    {"role": "user", "content": "سلام"},
+    {"role": "assistant", "content": "سلام! چطور می‌توانم کمک کنم؟"},
+]
+
+
+# ── Traffic ───────────────────────────────────────────────────────────────────
+
+def load_traffic(path: str) -> List[Dict[str, Any]]:
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            history = entry.get("history")
+            if history is None:
+                history = [_FILLER_TURNS[i % 2] for i in range(entry.get("history_len", 0))]
+            items.append({
+                "ts": entry.get("ts", 0.0),
+                "user": entry.get("user") or "anonymous",
+                "message": entry["message"],
+                "history": history,
+            })
+    items.sort(key=lambda e: e["ts"])
+    return items
+
+
+def scenario_traffic(name: str, n: int, seed: int) -> List[Dict[str, Any]]:
+    scenario = SCENARIOS[name]
+    rng = random.Random(f"{seed}:{name}")
+    weights = [w for w, _ in scenario.mix]
+    keys = [k for _, k in scenario.mix]
+    pool = n if scenario.users == "unique" else scenario.users
+    return [
+        {
+            "ts": float(i),
+            "user": f"u-{rng.randrange(pool)}",
+            "message": QUERIES[rng.choices(keys, weights)[0]].message,
+            "history": [],
+        }
+        for i in range(n)
+    ]
+
+
+# ── Load ──────────────────────────────────────────────────────────────────────
+
+class StageResult:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.status_counts: Dict[str, int] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def add(self, status: str, ms: float) -> None:
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        self.latencies.append(ms)
+
+
+async def _send(client: httpx.AsyncClient, item: Dict[str, Any], token: str, result: StageResult) -> None:
+    result.in_flight += 1
+    result.peak_in_flight = max(result.peak_in_flight, result.in_flight)
+    started = time.perf_counter()
+    try:
+        r = await client.post(
+            "/api/chat",
+            json={"message": item["message"], "conversation_history": item["history"]},
+            headers={"Authorization": f"Bearer {token}", "X-User-Id": f"replay-{item['user']}"},
+        )
+        status = str(r.status_code)
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    finally:
+        result.in_flight -= 1
+    result.add(status, (time.perf_counter() - started) * 1000)
+
+
+async def closed_loop(client, items: Iterator, token: str, concurrency: int, seconds: float, think_ms: float) -> StageResult:
+    result = StageResult()
+    stop_at = time.perf_counter() + seconds
+
+    async def _operator():
+        while time.perf_counter() < stop_at:
+            await _send(client, next(items), token, result)
+            if think_ms:
+                await asyncio.sleep(think_ms / 1000)
+
+    await asyncio.gather(*(_operator() for _ in range(concurrency)))
+    return result
+
+
+async def open_loop(client, items: Iterator, token: str, seconds: float,
+                    rate: Optional[float] = None, gaps: Optional[Iterator[float]] = None, seed: int = 7) -> StageResult:
+    """Fire requests on an arrival schedule without waiting for responses."""
+    result = StageResult()
+    rng = random.Random(seed)
+    tasks = []
+    start = time.perf_counter()
+    next_at = 0.0
+    while next_at < seconds:
+        delay = start + next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(_send(client, next(items), token, result)))
+        next_at += rng.expovariate(rate) if rate else next(gaps)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return result
+
+
+def _summarize(label: str, offered: Any, result: StageResult, seconds: float, res: Optional[ResourceSampler]) -> Dict[str, Any]:
+    lat = sorted(result.latencies)
+    total = len(lat)
+    ok = result.status_counts.get("200", 0)
+    summary = {
+        "stage": label,
+        "offered": offered,
+        "requests": total,
+        "duration_s": round(seconds, 2),
+        "throughput_rps": round(ok / seconds, 2) if seconds else 0.0,
+        "error_rate": round((total - ok) / total, 4) if total else 0.0,
+        "status_counts": result.status_counts,
+        "peak_in_flight": result.peak_in_flight,
+        "latency_ms": {
+            "p50": round(percentile(lat, 50), 1),
+            "p95": round(percentile(lat, 95), 1),
+            "p99": round(percentile(lat, 99), 1),
+            "mean": round(statistics.fmean(lat), 1) if lat else 0.0,
+            "max": round(lat[-1], 1) if lat else 0.0,
+        },
+    }
+    if res is not None:
+        summary["cpu_percent"] = round(100 * res.cpu_seconds / res.wall_seconds, 1) if res.wall_seconds else 0.0
+        summary["rss_mb_peak"] = round(res.peak_rss_mb, 1)
+    return summary
+
+
+def saturation(stages: List[Dict[str, Any]], slo_p95_ms: float, max_error_rate: float) -> Dict[str, Any]:
+    """Last stage within SLO, and the first stage whose throughput gain fell below 10%."""
+    within_slo = None
+    plateau = None
+    for prev, stage in zip([None] + stages[:-1], stages):
+        if stage["latency_ms"]["p95"] <= slo_p95_ms and stage["error_rate"] <= max_error_rate:
+            within_slo = stage["offered"]
+        if plateau is None and prev is not None and prev["throughput_rps"] > 0:
+            if stage["throughput_rps"] < prev["throughput_rps"] * 1.10:
+                plateau = prev["offered"]
+    return {
+        "slo": {"p95_ms": slo_p95_ms, "max_error_rate": max_error_rate},
+        "max_load_within_slo": within_slo,
+        "throughput_plateau_at": plateau,
+        "peak_throughput_rps": max((s["throughput_rps"] for s in stages), default=0.0),
+    }
+
+
+async def run(args, base_url: str, app_pid: Optional[int], items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    cycle = itertools.cycle(items)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=256)
+    stages = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        if args.ramp or args.ramp_rate:
+            plan = [("concurrency", int(c)) for c in args.ramp.split(",")] if args.ramp else \
+                   [("rate", float(r)) for r in args.ramp_rate.split(",")]
+            seconds = args.stage_seconds
+        elif args.rate:
+            plan, seconds = [("rate", args.rate)], args.duration
+        elif args.speed:
+            plan, seconds = [("speed", args.speed)], args.duration
+        else:
+            plan, seconds = [("concurrency", args.concurrency)], args.duration
+
+        for kind, value in plan:
+            print(f"stage {kind}={value} for {seconds}s ...", file=sys.stderr)
+            sampler = ResourceSampler(app_pid) if app_pid else nullcontext()
+            started = time.perf_counter()
+            with sampler as res:
+                if kind == "concurrency":
+                    result = await closed_loop(client, cycle, args.token, value, seconds, args.think_ms)
+                elif kind == "rate":
+                    result = await open_loop(client, cycle, args.token, seconds, rate=value, seed=args.seed)
+                else:
+                    recorded = [b["ts"] - a["ts"] for a, b in zip(items, items[1:])] or [1.0]
+                    gaps = (max(0.0, g) / value for g in itertools.cycle(recorded))
+                    result = await open_loop(client, cycle, args.token, seconds, gaps=gaps)
+            elapsed = time.perf_counter() - started
+            stages.append(_summarize(f"{kind}={value}", value, result, elapsed, res))
+    return stages
+
+
+def _print_stages(stages: List[Dict[str, Any]], sat: Optional[Dict[str, Any]]) -> None:
+    print(f"\n{'stage':<18}{'rps':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>7}{'inflight':>9}")
+    for s in stages:
+        lat = s["latency_ms"]
+        print(f"{s['stage']:<18}{s['throughput_rps']:>8}{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}"
+              f"{s['error_rate'] * 100:>7.1f}{s['peak_in_flight']:>9}")
+    if sat:
+        print(f"\nmax load within SLO (p95 ≤ {sat['slo']['p95_ms']} ms, errors ≤ {sat['slo']['max_error_rate']:.1%}): "
+              f"{sat['max_load_within_slo']}")
+        print(f"throughput plateau at: {sat['throughput_plateau_at']}  (peak {sat['peak_throughput_rps']} req/s)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    target = ap.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running app")
+    target.add_argument("--local", action="store_true", help="start the app and fakes locally")
+    ap.add_argument("--traffic", help="recorded traffic JSONL (default: scenario mix)")
+    ap.add_argument("--scenario", default="mixed", choices=list(SCENARIOS), help="mix used without --traffic")
+    shape = ap.add_mutually_exclusive_group()
+    shape.add_argument("--concurrency", type=int, default=8)
+    shape.add_argument("--rate", type=float, help="open-loop arrivals per second")
+    shape.add_argument("--speed", type=float, help="open loop at recorded timing / speed")
+    shape.add_argument("--ramp", help="closed-loop concurrency stages, e.g. 1,2,4,8,16")
+    shape.add_argument("--ramp-rate", help="open-loop rate stages, e.g. 0.5,1,2,4")
+    ap.add_argument("--duration", type=float, default=60, help="seconds for a single-stage run")
+    ap.add_argument("--stage-seconds", type=float, default=30, help="seconds per ramp stage")
+    ap.add_argument("--think-ms", type=float, default=0, help="closed loop: pause between an operator's requests")
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--token", default="replay-token", help="Bearer token sent with every request")
+    ap.add_argument("--slo-p95-ms", type=float, default=5000)
+    ap.add_argument("--max-error-rate", type=float, default=0.01)
+    ap.add_argument("--out", help="write the JSON report here")
+    add_stack_arguments(ap)
+    args = ap.parse_args()
+
+    items = load_traffic(args.traffic) if args.traffic else scenario_traffic(args.scenario, 1000, args.seed)
+    if not items:
+        ap.error("no traffic to replay")
+
+    stack = LocalStack.from_args(args) if args.local else None
+    with (stack or nullcontext()):
+        base_url = stack.app_url if stack else args.url.rstrip("/")
+        stages = asyncio.run(run(args, base_url, stack.app_pid if stack else None, items))
+        llm_usage = stack.llm_usage() if stack else None
+
+    sat = saturation(stages, args.slo_p95_ms, args.max_error_rate) if len(stages) > 1 else None
+    _print_stages(stages, sat)
+    answers = sum(s["status_counts"].get("200", 0) for s in stages)
+    for model, usage in (llm_usage or {}).items():
+        print(f"llm {model}: {usage['calls']} calls, {usage['prompt_tokens']} prompt + "
+              f"{usage['completion_tokens']} completion tokens ({usage['calls'] / max(answers, 1):.2f} calls/answer)")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "target": base_url,
+        "traffic": args.traffic or f"scenario:{args.scenario}",
+        "config": {**(stack.config() if stack else {}), "timeout": args.timeout, "think_ms": args.think_ms},
+        "stages": stages,
+        "saturation": sat,
+        "llm_usage": llm_usage,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nreport written to {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""End-to-end benchmark: app.main:app against a fake LLM and a fake fleet backend.
+
+Starts three local processes:
+  fake_openai.py   scripted OpenAI-compatible completions (scenarios.py)
+  fake_fleet.py    fleet backend + Nominatim geocoder
+  uvicorn app.main:app   pointed at both via OPENAI_API_BASE / BASE_URL / GEOCODER_URL
+
+then drives each scenario's Farsi query mix with a closed-loop load (N concurrent
+clients, fixed request count, fixed seed) and reports per scenario:
+  throughput (req/s), latency p50/p95/p99/mean/max (ms), status counts,
+  CPU seconds and CPU% of the app process tree, peak and final RSS (MB).
+
+Results are written as JSON (git commit included) so runs can be compared:
+  python scripts/bench/run_bench.py --out bench_results/$(git rev-parse --short HEAD).json
+  python scripts/bench/run_bench.py --baseline bench_results/abc1234.json
+
+CPU / RSS are read from /proc, so resource numbers are Linux-only (zeros elsewhere).
+
+Run:
+  python scripts/bench/run_bench.py [--scenarios fast_path,llm_tools,history,mixed]
+                                    [--requests 200] [--concurrency 16] [--workers 1]
+                                    [--llm-latency-ms 400] [--backend-latency-ms 60]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scenarios import QUERIES, SCENARIOS  # noqa: E402
+from stack import LocalStack, ResourceSampler, add_stack_arguments, git_commit, percentile  # noqa: E402
+
+
+# ── Load ──────────────────────────────────────────────────────────────────────
+
+def _plan(name: str, n: int, seed: int) -> List[Dict[str, str]]:
+    """Deterministic request list for a scenario: [(message, user_id), ...]."""
+    scenario = SCENARIOS[name]
+    rng = random.Random(f"{seed}:{name}")
+    weights = [w for w, _ in scenario.mix]
+    keys = [k for _, k in scenario.mix]
+    plan = []
+    for i in range(n):
+        key = rng.choices(keys, weights)[0]
+        if scenario.users == "unique":
+            user = f"bench-{name}-{seed}-{i}"
+        else:
+            user = f"bench-{name}-{seed}-u{rng.randrange(scenario.users)}"
+        plan.append({"message": QUERIES[key].message, "user": user})
+    return plan
+
+
+def _run_scenario(app_url: str, app_pid: int, name: str, n: int, concurrency: int, seed: int) -> Dict[str, Any]:
+    plan = _plan(name, n, seed)
+    local = threading.local()
+
+    def _one(item: Dict[str, str]) -> tuple:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            r = session.post(
+                f"{app_url}/api/chat",
+                json={"message": item["message"], "conversation_id": str(uuid.uuid4())},
+                headers={"Authorization": "Bearer bench-token", "X-User-Id": item["user"]},
+                timeout=120,
+            )
+            status = str(r.status_code)
+        except requests.exceptions.RequestException as e:
+            status = type(e).__name__
+        return status, (time.perf_counter() - started) * 1000
+
+    with ResourceSampler(app_pid) as res, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(_one, plan))
+
+    latencies = sorted(ms for _, ms in results)
+    status_counts: Dict[str, int] = {}
+    for status, _ in results:
+        status_counts[status] = status_counts.get(status, 0) + 1
+
+    return {
+        "description": SCENARIOS[name].description,
+        "requests": n,
+        "concurrency": concurrency,
+        "errors": n - status_counts.get("200", 0),
+        "status_counts": status_counts,
+        "duration_s": round(res.wall_seconds, 3),
+        "throughput_rps": round(n / res.wall_seconds, 2) if res.wall_seconds else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 1),
+            "p95": round(percentile(latencies, 95), 1),
+            "p99": round(percentile(latencies, 99), 1),
+            "mean": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+            "max": round(latencies[-1], 1) if latencies else 0.0,
+        },
+        "cpu_seconds": round(res.cpu_seconds, 3),
+        "cpu_percent": round(100 * res.cpu_seconds / res.wall_seconds, 1) if res.wall_seconds else 0.0,
+        "rss_mb_peak": round(res.peak_rss_mb, 1),
+        "rss_mb_end": round(res.final_rss_mb, 1),
+    }
+
+
+# ── Reporting ─────────────────────────────────────────────────────────────────
+
+def _print_table(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    print(f"\n{'scenario':<12}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>6}{'cpu%':>8}{'rssMB':>8}")
+    for name, r in report["scenarios"].items():
+        lat = r["latency_ms"]
+        print(f"{name:<12}{r['throughput_rps']:>9}{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}"
+              f"{r['errors']:>6}{r['cpu_percent']:>8}{r['rss_mb_peak']:>8}")
+        base = (baseline or {}).get("scenarios", {}).get(name)
+        if base:
+            def _delta(new: float, old: float) -> str:
+                return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{'  vs base':<12}{_delta(r['throughput_rps'], base['throughput_rps']):>9}"
+                  f"{_delta(lat['p50'], base['latency_ms']['p50']):>9}"
+                  f"{_delta(lat['p95'], base['latency_ms']['p95']):>9}"
+                  f"{_delta(lat['p99'], base['latency_ms']['p99']):>9}"
+                  f"{'':>6}{_delta(r['cpu_percent'], base['cpu_percent']):>8}"
+                  f"{_delta(r['rss_mb_peak'], base['rss_mb_peak']):>8}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenario names")
+    ap.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--warmup", type=int, default=10, help="untimed requests before the first scenario")
+    add_stack_arguments(ap)
+    ap.add_argument("--out", help="write the JSON report here")
+    ap.add_argument("--baseline", help="earlier JSON report to compare against")
+    args = ap.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        ap.error(f"unknown scenarios: {unknown} (available: {list(SCENARIOS)})")
+
+    with LocalStack.from_args(args) as stack:
+        if args.warmup:
+            _run_scenario(stack.app_url, stack.app_pid, names[0], args.warmup, min(args.concurrency, args.warmup), seed=-1)
+
+        report: Dict[str, Any] = {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "config": {"requests": args.requests, "concurrency": args.concurrency, **stack.config()},
+            "scenarios": {},
+        }
+        for name in names:
+            print(f"running {name} ...", file=sys.stderr)
+            report["scenarios"][name] = _run_scenario(
+                stack.app_url, stack.app_pid, name, args.requests, args.concurrency, args.seed,
+            )
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_table(report, baseline)
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nreport written to {args.out}", file=sys.stderr)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
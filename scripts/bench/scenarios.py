@@ -0,0 +1,138 @@
+"""Query mixes for the end-to-end benchmark (scripts/bench/run_bench.py).
+
+Every query carries the tool calls the fake LLM should "decide" on and the final
+answer it should phrase, so fake_openai.py can replay a realistic conversation
+without any model. Messages name units that exist in fake_fleet.py.
+
+Scenario fields:
+  mix    → [(weight, query key), ...]  sampled with a fixed seed
+  users  → "unique" (new X-User-Id per request, no answer-cache hits) or the size
+           of a user pool (repeats from the same user can hit the answer cache)
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+
+
+class Query(NamedTuple):
+    message: str
+    tool_calls: List[Dict[str, Any]]     # arguments of each call_backend_api call, in order
+    answer: str
+    loops: bool = False                  # the fake LLM repeats its tool calls until tool_choice="none"
+
+
+def _args(action: str, **kwargs: Any) -> Dict[str, Any]:
+    return {"action": action, "explanation": "benchmark scripted call", **kwargs}
+
+
+QUERIES: Dict[str, Query] = {
+    # ── simple lookups (answered by the fast path unless it is disabled) ─────
+    "current_unit": Query(
+        "ماشین 211 کجاست؟",
+        [_args("vehicle_tracking_current", query="211")],
+        "ماشین 211 هم‌اکنون آنلاین است و در تبریز قرار دارد.",
+    ),
+    "current_person": Query(
+        "سعید شاکری نسب الان کجاست",
+        [_args("vehicle_tracking_current", query="سعید شاکری نسب")],
+        "سعید شاکری نسب هم‌اکنون در تبریز است.",
+    ),
+    "current_position": Query(
+        "موقعیت ماشین 187",
+        [_args("vehicle_tracking_current", query="187")],
+        "ماشین 187 آفلاین است؛ آخرین موقعیت ثبت‌شده در تبریز است.",
+    ),
+    "current_ambiguous": Query(
+        "رضایی کجاست؟",
+        [_args("vehicle_tracking_current", query="رضایی")],
+        "چند مورد با نام رضایی یافت شد، لطفاً دقیق‌تر مشخص کنید.",
+    ),
+    "history_yesterday": Query(
+        "ماشین 150 دیروز کجا بوده؟",
+        [_args("Unit_history", query="150", FromDate="دیروز", ToDate="دیروز")],
+        "ماشین 150 دیروز در محدوده تبریز تردد داشته است.",
+    ),
+
+    # ── questions that need the LLM ──────────────────────────────────────────
+    "active_alarms": Query(
+        "آلارم‌های فعال ناوگان رو نشون بده",
+        [_args("active_alarms", params={"PageNumber": 1, "PageSize": 20})],
+        "در حال حاضر ۱۲ آلارم فعال در ناوگان وجود دارد؛ بیشتر آن‌ها مربوط به سرعت غیرمجاز است.",
+    ),
+    "alarm_history": Query(
+        "تاریخچه هشدارهای ماشین 230 در هفته گذشته",
+        [_args("alarm_history", filters={"SearchWord": "230", "FromDate": "هفته گذشته", "ToDate": "امروز"})],
+        "ماشین 230 در هفته گذشته ۵ هشدار داشته که ۳ مورد آن سرعت غیرمجاز بوده است.",
+    ),
+    "sensor": Query(
+        "دمای ماشین 211 چنده؟",
+        [_args("sensor_current", unit_id="unit-0211")],
+        "دمای فعلی ماشین 211 برابر ۴ درجه سانتی‌گراد است.",
+    ),
+    "compare_two": Query(
+        "وضعیت ماشین 211 و ماشین 150 رو مقایسه کن",
+        [
+            _args("vehicle_tracking_current", query="211"),
+            _args("vehicle_tracking_current", query="150"),
+        ],
+        "ماشین 211 آنلاین و در حال حرکت است، اما ماشین 150 آفلاین است.",
+    ),
+    "history_range": Query(
+        "مسیر ماشین 211 از 1405/02/01 تا 1405/02/10 رو خلاصه کن",
+        [_args("Unit_history", query="211", FromDate="1405/02/01", ToDate="1405/02/10")],
+        "ماشین 211 در این بازه بیشتر بین تبریز و مرند تردد داشته و میانگین سرعت آن ۶۲ کیلومتر بر ساعت بوده است.",
+    ),
+    "history_max_speed": Query(
+        "بیشترین سرعت ماشین 199 در هفته گذشته چقدر بوده؟",
+        [_args("Unit_history", query="199", FromDate="هفته گذشته", ToDate="امروز")],
+        "بیشترین سرعت ماشین 199 در هفته گذشته ۱۱۸ کیلومتر بر ساعت بوده است.",
+    ),
+    "runaway": Query(
+        "آلارم‌های ماشین 187 رو بررسی کن",
+        [_args("alarm_history", filters={"SearchWord": "187", "FromDate": "هفته گذشته", "ToDate": "امروز"})],
+        "ماشین 187 در هفته گذشته هشداری نداشته است.",
+        loops=True,
+    ),
+    "smalltalk": Query(
+        "سلام، چه کمکی از دستت برمیاد؟",
+        [],
+        "سلام! می‌توانم موقعیت، تاریخچه مسیر، سنسورها و آلارم‌های ناوگان شما را بررسی کنم.",
+    ),
+}
+
+BY_MESSAGE: Dict[str, Query] = {q.message: q for q in QUERIES.values()}
+
+
+class Scenario(NamedTuple):
+    mix: List[tuple]
+    users: Any = "unique"
+    description: str = ""
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "fast_path": Scenario(
+        mix=[(4, "current_unit"), (2, "current_person"), (2, "current_position"),
+             (1, "current_ambiguous"), (3, "history_yesterday")],
+        description="simple location lookups — no LLM calls when the fast path is on",
+    ),
+    "llm_tools": Scenario(
+        mix=[(3, "active_alarms"), (2, "alarm_history"), (2, "sensor"), (1, "compare_two"), (1, "smalltalk")],
+        description="LLM plans tool calls and phrases the answer (2 completions per request)",
+    ),
+    "history": Scenario(
+        mix=[(1, "history_range"), (1, "history_max_speed")],
+        description="date resolution + coordinate history + summary",
+    ),
+    "runaway": Scenario(
+        mix=[(1, "runaway")],
+        description="the LLM keeps repeating the same tool call (loop detection)",
+    ),
+    "mixed": Scenario(
+        mix=[(5, "current_unit"), (2, "current_person"), (3, "history_yesterday"), (3, "active_alarms"),
+             (2, "alarm_history"), (2, "sensor"), (1, "compare_two"), (2, "history_range"), (1, "smalltalk")],
+        users=40,
+        description="production-like mix from a pool of 40 users (repeats can hit the answer cache)",
+    ),
+}
+
+
+def scripted_reply(message: Optional[str]) -> Optional[Query]:
+    return BY_MESSAGE.get((message or "").strip())
@@ -0,0 +1,179 @@
+"""Serialization micro-benchmark: stdlib json vs app.core.serialization (orjson).
+
+Payloads are real: fake_fleet.py is started without latency, and the app's own
+ApiTool runs Unit_history against it, so the bodies and tool results have the
+exact shape and size the request path sees. For each history window it times:
+
+  decode_history   backend body → dict     requests.Response.json()  vs serialization.response_json()
+  tool_message     tool result  → LLM msg   json.dumps(ensure_ascii=False) vs serialization.dumps()
+  chat_response    ChatResponse → HTTP body JSONResponse.render()     vs ORJSONResponse.render()
+  store_history    conversation messages ↔ Redis values (dumps + loads)
+  log_document     ES log document          elasticsearch JsonSerializer vs es_serializer
+
+and checks that both sides produce the same JSON value.
+
+Run:
+  python scripts/bench/serialization_bench.py [--windows 1,3,7] [--seconds 0.5] [--out results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stack import BENCH_DIR, ROOT, _start, _wait_ready, free_port, git_commit  # noqa: E402
+
+
+def _time(fn: Callable[[], Any], seconds: float) -> float:
+    """Mean microseconds per call, running fn for about `seconds`."""
+    fn()
+    calls, started = 0, time.perf_counter()
+    batch = 1
+    while True:
+        for _ in range(batch):
+            fn()
+        calls += batch
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return elapsed / calls * 1e6
+        batch = min(batch * 2, 1000)
+
+
+def _compare(name: str, size: int, stdlib: Callable[[], Any], fast: Callable[[], Any],
+             seconds: float, same: Callable[[Any, Any], bool]) -> Dict[str, Any]:
+    if not same(stdlib(), fast()):
+        raise AssertionError(f"{name}: stdlib and orjson results differ")
+    stdlib_us, fast_us = _time(stdlib, seconds), _time(fast, seconds)
+    return {
+        "case": name,
+        "bytes": size,
+        "stdlib_us": round(stdlib_us, 1),
+        "orjson_us": round(fast_us, 1),
+        "speedup": round(stdlib_us / fast_us, 1),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--windows", default="1,3,7", help="history windows in days")
+    ap.add_argument("--unit", default="ماشین 211")
+    ap.add_argument("--seconds", type=float, default=0.5, help="time spent per measurement")
+    ap.add_argument("--out", help="write results as JSON")
+    args = ap.parse_args()
+
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    env = {**os.environ, "PYTHONPATH": ROOT, "BENCH_BACKEND_LATENCY_MS": "0", "BENCH_BACKEND_JITTER_MS": "0",
+           "BENCH_GEOCODER_LATENCY_MS": "0"}
+    fleet = _start([sys.executable, os.path.join(BENCH_DIR, "fake_fleet.py"), "--port", str(port)],
+                   env, os.path.join(workdir, "serialization_bench_fleet.log"))
+    try:
+        _wait_ready(f"http://127.0.0.1:{port}/healthz", fleet)
+        os.environ.update({
+            "BASE_URL": f"http://127.0.0.1:{port}",
+            "GEOCODER_URL": f"http://127.0.0.1:{port}/reverse",
+            "ELASTICSEARCH_URL": f"http://127.0.0.1:{free_port()}",
+            "LOG_LEVEL": "WARNING",
+            "TRACING_EXPORTER": "none",
+            "CACHE_ENABLED": "false",
+        })
+        sys.path.insert(0, ROOT)
+        results = run(args, port)
+    finally:
+        fleet.terminate()
+        fleet.wait(timeout=10)
+        print(f"fake_fleet log: {os.path.join(workdir, 'serialization_bench_fleet.log')}")
+
+    print(f"\n{'case':<28}{'bytes':>10}{'json µs':>12}{'orjson µs':>12}{'speedup':>10}")
+    for r in results:
+        print(f"{r['case']:<28}{r['bytes']:>10}{r['stdlib_us']:>12}{r['orjson_us']:>12}{r['speedup']:>9}x")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"commit": git_commit(), "results": results}, f, ensure_ascii=False, indent=2)
+
+
+def run(args, port: int) -> List[Dict[str, Any]]:
+    from elasticsearch.serializer import JsonSerializer
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from app.core import serialization
+    from app.schema.Auth import AuthContext
+    from app.schema.chat_schema import ChatResponse, ToolCall
+    from app.tools.API_tools import ApiTool
+
+    auth = AuthContext(access_token="bench", user_id="bench")
+    unit_id, _ = ApiTool._find_unit_id(args.unit, auth)
+    if unit_id is None:
+        raise SystemExit(f"unit {args.unit!r} not found in fake_fleet")
+
+    same = lambda a, b: a == b                                         # noqa: E731
+    same_json = lambda a, b: json.loads(a) == json.loads(b)            # noqa: E731
+    es_json = JsonSerializer()
+    results = []
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    for days in (int(d) for d in args.windows.split(",")):
+        start = now - timedelta(days=days)
+        from_date, to_date = start.isoformat().replace("+00:00", "Z"), now.isoformat().replace("+00:00", "Z")
+        response = requests.get(
+            f"http://127.0.0.1:{port}/api/v2/Unit/UnitCoordinatesForTrackingPage",
+            params={"unitIds": unit_id, "FromDate": from_date, "ToDate": to_date}, timeout=30,
+        )
+        response.raise_for_status()
+        result = ApiTool.call_backend_api(
+            action="Unit_history", auth_context=auth, query=args.unit, FromDate=from_date, ToDate=to_date,
+        )
+        records = len(response.json()[0]["trackCoordinates"])
+        label = f"{days}d/{records}rec"
+
+        results.append(_compare(f"decode_history {label}", len(response.content), response.json,
+                                lambda r=response: serialization.response_json(r), args.seconds, same))
+
+        message = json.dumps(result, ensure_ascii=False)
+        results.append(_compare(f"tool_message {label}", len(message.encode("utf-8")),
+                                lambda: json.dumps(result, ensure_ascii=False),
+                                lambda: serialization.dumps(result), args.seconds, same_json))
+
+        content = jsonable_encoder(ChatResponse(
+            message="ماشین ۲۱۱ در این بازه " + str(records) + " رکورد مسیر دارد.",
+            conversation_id="conv_bench",
+            tool_calls=[ToolCall(tool_name="call_backend_api",
+                                 arguments={"action": "Unit_history", "query": args.unit}, result=result)],
+        ))
+        body = JSONResponse(content).body
+        results.append(_compare(f"chat_response {label}", len(body),
+                                lambda: JSONResponse(content).body,
+                                lambda: serialization.ORJSONResponse(content).body, args.seconds, same_json))
+
+        history = [
+            {"role": "user", "content": f"مسیر {args.unit} در {days} روز گذشته"},
+            {"role": "assistant", "content": None, "tool_calls": [{"id": "call_1", "type": "function"}]},
+            {"role": "tool", "tool_call_id": "call_1", "content": message},
+            {"role": "assistant", "content": content["message"]},
+        ]
+        stored = [json.dumps(m, ensure_ascii=False) for m in history]
+        results.append(_compare(f"store_history {label}", sum(len(s.encode("utf-8")) for s in stored),
+                                lambda: [json.loads(json.dumps(m, ensure_ascii=False)) for m in history],
+                                lambda: [serialization.loads(serialization.dumpb(m)) for m in history],
+                                args.seconds, same))
+
+    log_doc = {
+        "@timestamp": now.isoformat(), "level": "INFO", "logger": "llm", "env": "bench",
+        "message": f"TOOL_CALL fn=call_backend_api args={{'action': 'Unit_history', 'query': '{args.unit}'}}",
+        "conv_id": "conv_bench", "user_id": "bench", "action": "Unit_history", "status_code": 200, "elapsed": 0.42,
+    }
+    results.append(_compare("log_document", len(es_json.dumps(log_doc)),
+                            lambda: es_json.dumps(log_doc), lambda: serialization.es_serializer.dumps(log_doc),
+                            args.seconds, same_json))
+    return results
+
+
+if __name__ == "__main__":
+    main()
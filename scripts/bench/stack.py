@@ -0,0 +1,312 @@
+"""Local app + fakes for the benchmark and replay tools.
+
+LocalStack starts fake_openai.py, fake_fleet.py (and fake_redis.py with
+redis=True) and `uvicorn app.main:app` on free ports, with the app pointed at the
+fakes, and tears everything down on exit:
+
+  with LocalStack(workers=1) as stack:
+      requests.post(f"{stack.app_url}/api/chat", ...)
+
+ResourceSampler reads CPU time and RSS of the app's process tree from /proc
+(Linux only — numbers are zero elsewhere).
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(BENCH_DIR))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def git_commit() -> Dict[str, Any]:
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+        dirty = bool(subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, text=True).strip())
+        return {"sha": sha, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"sha": None, "dirty": None}
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"process for {url} exited with code {proc.returncode}")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def _wait_port(port: int, proc: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"process for port {port} exited with code {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"port {port} not open after {timeout}s")
+
+
+def _start(cmd: List[str], env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def add_stack_arguments(ap) -> None:
+    """CLI flags shared by run_bench.py and replay.py."""
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn workers for the app")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--llm-latency-ms", type=float, default=400)
+    ap.add_argument("--llm-jitter-ms", type=float, default=100)
+    ap.add_argument("--llm-capacity", type=int, default=0,
+                    help="completions the fake LLM serves at once, the rest queue (0 = unlimited)")
+    ap.add_argument("--llm-model-latency", default="", metavar="MODEL=MS,...",
+                    help="per-model fake LLM latency, e.g. gpt-4o=1200,gpt-4o-mini=400")
+    ap.add_argument("--backend-latency-ms", type=float, default=60)
+    ap.add_argument("--backend-jitter-ms", type=float, default=20)
+    ap.add_argument("--geocoder-latency-ms", type=float, default=80)
+    ap.add_argument("--redis", action="store_true",
+                    help="start fake_redis.py and point REDIS_URL at it (use with --env CACHE_BACKEND=redis)")
+    ap.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                    help="extra app setting, e.g. --env FAST_PATH_ENABLED=false (repeatable)")
+
+
+class LocalStack:
+    def __init__(
+        self,
+        workers: int = 1,
+        seed: int = 7,
+        llm_latency_ms: float = 400,
+        llm_jitter_ms: float = 100,
+        llm_capacity: int = 0,
+        llm_model_latency: str = "",
+        backend_latency_ms: float = 60,
+        backend_jitter_ms: float = 20,
+        geocoder_latency_ms: float = 80,
+        redis: bool = False,
+        extra_env: Optional[Dict[str, str]] = None,
+    ):
+        self.workers = workers
+        self.redis = redis
+        self.seed = seed
+        self.latencies = {
+            "llm_latency_ms": llm_latency_ms, "llm_jitter_ms": llm_jitter_ms, "llm_capacity": llm_capacity,
+            "llm_model_latency": llm_model_latency,
+            "backend_latency_ms": backend_latency_ms, "backend_jitter_ms": backend_jitter_ms,
+            "geocoder_latency_ms": geocoder_latency_ms,
+        }
+        self.extra_env = extra_env or {}
+        self.workdir = tempfile.mkdtemp(prefix="bench-")
+        self.app_url = ""
+        self.llm_url = ""
+        self.app_pid = 0
+        self._procs: List[subprocess.Popen] = []
+
+    @classmethod
+    def from_args(cls, args) -> "LocalStack":
+        return cls(
+            workers=args.workers,
+            seed=args.seed,
+            llm_latency_ms=args.llm_latency_ms,
+            llm_jitter_ms=args.llm_jitter_ms,
+            llm_capacity=args.llm_capacity,
+            llm_model_latency=args.llm_model_latency,
+            backend_latency_ms=args.backend_latency_ms,
+            backend_jitter_ms=args.backend_jitter_ms,
+            geocoder_latency_ms=args.geocoder_latency_ms,
+            redis=args.redis,
+            extra_env=dict(kv.split("=", 1) for kv in args.env),
+        )
+
+    def config(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "seed": self.seed, "redis": self.redis, **self.latencies, "env": self.extra_env}
+
+    def __enter__(self) -> "LocalStack":
+        llm_port, fleet_port, app_port = free_port(), free_port(), free_port()
+        base_env = {
+            **os.environ,
+            "PYTHONPATH": ROOT,
+            "BENCH_SEED": str(self.seed),
+            "BENCH_LLM_LATENCY_MS": str(self.latencies["llm_latency_ms"]),
+            "BENCH_LLM_JITTER_MS": str(self.latencies["llm_jitter_ms"]),
+            "BENCH_LLM_CAPACITY": str(self.latencies["llm_capacity"]),
+            "BENCH_LLM_MODEL_LATENCY_MS": self.latencies["llm_model_latency"],
+            "BENCH_BACKEND_LATENCY_MS": str(self.latencies["backend_latency_ms"]),
+            "BENCH_BACKEND_JITTER_MS": str(self.latencies["backend_jitter_ms"]),
+            "BENCH_GEOCODER_LATENCY_MS": str(self.latencies["geocoder_latency_ms"]),
+        }
+        app_env = {
+            **base_env,
+            "OPENAI_API_BASE": f"http://127.0.0.1:{llm_port}/v1",
+            "OPENAI_API_KEY": "sk-bench",
+            "BASE_URL": f"http://127.0.0.1:{fleet_port}",
+            "GEOCODER_URL": f"http://127.0.0.1:{fleet_port}/reverse",
+            "ELASTICSEARCH_URL": f"http://127.0.0.1:{free_port()}",   # unreachable: no ES log shipping
+            "LOG_LEVEL": "WARNING",
+            "DEBUG": "false",
+            "TRACING_EXPORTER": "none",
+            "RATE_LIMIT_ENABLED": "false",   # load tools drive few synthetic users hard
+            **self.extra_env,
+        }
+        redis_port = free_port()
+        if self.redis:
+            app_env = {"REDIS_URL": f"redis://127.0.0.1:{redis_port}/0", **app_env}
+        if self.workers > 1:
+            app_env.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prom-", dir=self.workdir))
+
+        try:
+            fake_llm = _start([sys.executable, os.path.join(BENCH_DIR, "fake_openai.py"), "--port", str(llm_port)],
+                              base_env, os.path.join(self.workdir, "fake_openai.log"))
+            self._procs.append(fake_llm)
+            fake_fleet = _start([sys.executable, os.path.join(BENCH_DIR, "fake_fleet.py"), "--port", str(fleet_port)],
+                                base_env, os.path.join(self.workdir, "fake_fleet.log"))
+            self._procs.append(fake_fleet)
+            if self.redis:
+                fake_redis = _start([sys.executable, os.path.join(BENCH_DIR, "fake_redis.py"), "--port", str(redis_port)],
+                                    base_env, os.path.join(self.workdir, "fake_redis.log"))
+                self._procs.append(fake_redis)
+                _wait_port(redis_port, fake_redis)
+            app = _start(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+                 "--workers", str(self.workers), "--log-level", "warning", "--no-access-log"],
+                app_env, os.path.join(self.workdir, "app.log"),
+            )
+            self._procs.append(app)
+
+            _wait_ready(f"http://127.0.0.1:{llm_port}/v1/models", fake_llm)
+            self.llm_url = f"http://127.0.0.1:{llm_port}"
+            _wait_ready(f"http://127.0.0.1:{fleet_port}/healthz", fake_fleet)
+            self.app_url = f"http://127.0.0.1:{app_port}"
+            self.app_pid = app.pid
+            _wait_ready(f"{self.app_url}/", app, timeout=60)
+        except BaseException:
+            self.__exit__()
+            raise
+        print(f"app ready at {self.app_url} (logs in {self.workdir})", file=sys.stderr)
+        return self
+
+    def llm_usage(self) -> Dict[str, Any]:
+        """Completions and tokens per model served by the fake LLM so far."""
+        return requests.get(f"{self.llm_url}/bench/usage", timeout=5).json()
+
+    def __exit__(self, *exc) -> None:
+        for proc in self._procs:
+            proc.terminate()
+        for proc in self._procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        self._procs = []
+
+
+# ── Resource sampling (Linux /proc) ───────────────────────────────────────────
+
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _process_tree(root_pid: int) -> List[int]:
+    """root_pid plus all descendants (uvicorn --workers forks children)."""
+    children: Dict[int, List[int]] = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    except OSError:
+        return [root_pid]
+    tree, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+def _cpu_seconds(pids: List[int]) -> float:
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += int(fields[11]) + int(fields[12])   # utime + stime
+        except (OSError, IndexError, ValueError):
+            continue
+    return total / _CLK_TCK
+
+
+def _rss_mb(pids: List[int]) -> float:
+    total_kb = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+
+class ResourceSampler:
+    """Polls CPU time and RSS of the app process tree while a load phase runs."""
+
+    def __init__(self, root_pid: int, interval: float = 0.1):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.peak_rss_mb = max(self.peak_rss_mb, _rss_mb(_process_tree(self.root_pid)))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.cpu_start = _cpu_seconds(_process_tree(self.root_pid))
+        self.wall_start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        pids = _process_tree(self.root_pid)
+        self.cpu_seconds = _cpu_seconds(pids) - self.cpu_start
+        self.wall_seconds = time.perf_counter() - self.wall_start
+        self.final_rss_mb = _rss_mb(pids)
+        self.peak_rss_mb = max(self.peak_rss_mb, self.final_rss_mb)
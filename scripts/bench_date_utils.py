@@ -0,0 +1,62 @@
+"""Micro-benchmark for app.core.date_utils.resolve_date
+
+Measures per-call cost for typical inputs in three modes:
+  cold   → memo cleared before every call (full parse path, precompiled regexes)
+  warm   → memo populated (what repeated calls within a day cost)
+  iso    → already-resolved UTC ISO fast path
+
+Run:
+  python scripts/bench_date_utils.py [--number 20000]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import date_utils  # noqa: E402
+
+INPUTS = [
+    ("دیروز", "start"),
+    ("هفته گذشته", "end"),
+    ("3 روز پیش", "start"),
+    ("last month", "start"),
+    ("1405/02/10", "start"),
+    ("2026-04-18", "end"),
+]
+ISO_INPUT = ("2026-04-18T00:00:00Z", "start")
+
+
+def _per_call_us(fn, number: int) -> float:
+    return timeit.timeit(fn, number=number) / number * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--number", type=int, default=20000)
+    args = ap.parse_args()
+
+    print(f"{'input':<24} {'position':<8} {'cold µs':>10} {'warm µs':>10} {'speedup':>8}")
+    print("-" * 64)
+    for text, position in INPUTS:
+        def cold():
+            date_utils.clear_cache()
+            date_utils.resolve_date(text, position)
+
+        def warm():
+            date_utils.resolve_date(text, position)
+
+        cold_us = _per_call_us(cold, args.number)
+        date_utils.resolve_date(text, position)
+        warm_us = _per_call_us(warm, args.number)
+        print(f"{text!r:<24} {position:<8} {cold_us:>10.2f} {warm_us:>10.2f} {cold_us / warm_us:>7.1f}x")
+
+    iso_text, iso_position = ISO_INPUT
+    iso_us = _per_call_us(lambda: date_utils.resolve_date(iso_text, iso_position), args.number)
+    print(f"{iso_text!r:<24} {iso_position:<8} {'':>10} {iso_us:>10.2f}   (fast path)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# No Elasticsearch / tracing output from unit tests
+os.environ.setdefault("ELASTICSEARCH_URL", "http://127.0.0.1:9")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("TRACING_EXPORTER", "none")
@@ -0,0 +1,38 @@
+from app.core import entity_memory
+from app.core.entity_memory import EntityMemory
+from app.core.llm import LLMClient
+from app.schema.Auth import AuthContext
+
+AUTH = AuthContext(access_token="test-token", user_id="answer-cache-test")
+MESSAGE = "دمای ماشین 211 چند درجه است؟"
+
+
+def _client(calls):
+    client = LLMClient()
+
+    def fake_chat(user_message, auth_context, conversation_history):
+        calls.append(user_message)
+        memory = entity_memory.current()
+        memory.remember_unit("211", {"title": "ماشین 211", "secondTitle": "12ب345"})
+        memory.remember_dates("2026-10-18T00:00:00Z", "2026-10-19T00:00:00Z")
+        return "دمای ماشین 211 چهار درجه است.", []
+
+    client._chat = fake_chat
+    return client
+
+
+def test_cache_hit_restores_entity_memory():
+    calls = []
+    first = EntityMemory()
+    with entity_memory.activate(first):
+        answer, _ = _client(calls).chat(MESSAGE, AUTH)
+
+    second = EntityMemory()
+    with entity_memory.activate(second):
+        cached, _ = _client(calls).chat(MESSAGE, AUTH)
+
+    assert cached == answer
+    assert len(calls) == 1
+    assert second.changed
+    assert second.to_state() == first.to_state()
+    assert second.current_unit["id"] == "211"
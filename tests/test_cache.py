@@ -0,0 +1,20 @@
+import sqlite3
+
+from app.core.cache import SQLiteBackend
+
+
+def test_sqlite_corrupt_row_is_a_miss_and_is_deleted(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = SQLiteBackend("units", max_entries=100, path=path)
+    cache.set("good", {"unit_id": "211"}, ttl=60)
+    cache.set("bad", {"unit_id": "212"}, ttl=60)
+
+    raw = sqlite3.connect(path, isolation_level=None)
+    raw.execute(f"UPDATE {cache._table} SET value = ? WHERE key = ?", ('{"unit_id": "21', "bad"))
+
+    assert cache.get("bad") is None
+    assert cache.get("good") == {"unit_id": "211"}
+    assert cache.get_many(["good", "bad"]) == {"good": {"unit_id": "211"}}
+    assert raw.execute(f"SELECT COUNT(*) FROM {cache._table} WHERE key = 'bad'").fetchone()[0] == 0
+    stats = cache.stats()
+    assert stats["errors"] == 1 and stats["hits"] == 2 and stats["misses"] == 2
@@ -0,0 +1,65 @@
+import pytest
+
+from app.core import fast_path
+from app.core.fast_path import FastPath
+from app.schema.Auth import AuthContext
+from app.tools.API_tools import ApiTool
+
+
+@pytest.mark.parametrize("message, query", [
+    ("ماشین 211 کجاست؟", "211"),
+    ("موقعیت ماشین 211", "211"),
+    ("211 کجاست", "211"),
+    ("91-ع-587-15 الان کجاست", "91-ع-587-15"),
+    ("موقعیت خودرو سعید شاکری نسب", "سعید شاکری نسب"),
+])
+def test_single_unit_location(message, query):
+    args = FastPath.match(message)
+    assert args == {"action": "vehicle_tracking_current", "query": query}
+
+
+@pytest.mark.parametrize("message", [
+    "موقعیت همه ماشین ها",
+    "موقعیت تمام خودروها",
+    "موقعیت کل ناوگان",
+    "موقعیت ماشین‌های فعال",
+    "موقعیت خودروهای آنلاین",
+    "موقعیت ماشین ها",
+    "دمای ماشین 211 کجاست",
+    "سوخت ماشین 211 کجاست",
+    "سرعت ماشین 211 کجاست",
+    "باتری ماشین 211 کجاست",
+    "چند ماشین کجاست",
+])
+def test_fleet_wide_and_sensor_questions_fall_through(message):
+    assert FastPath.match(message) is None
+
+
+def test_history_with_kojaha_still_matches():
+    args = FastPath.match("ماشین 211 دیروز کجاها بوده؟")
+    assert args is not None and args["action"] == "Unit_history" and args["query"] == "211"
+
+
+@pytest.mark.parametrize("message", [
+    "موقعیت ماشین 211 دیروز",       # a history question, not a live lookup
+    "ماشین 211 فردا کجاست",
+    "سلام ماشین 211 کجاست؟",
+    "ماشین من کجاست",
+    "ماشینم کجاست",
+    "ممنون کجاست",
+    "انبار کجاست",
+    "سعید شاکری نسب کجاست",          # no unit prefix, plate or id
+])
+def test_ambiguous_unit_text_falls_through(message):
+    assert FastPath.match(message) is None
+
+
+def test_tool_failure_goes_to_the_llm(monkeypatch):
+    not_found = {"success": False, "error": "واحدی با این مشخصات یافت نشد."}
+    monkeypatch.setattr(ApiTool, "call_backend_api", staticmethod(lambda **kwargs: not_found))
+    before = fast_path.stats.snapshot().get("tool_failed", 0)
+
+    answer = FastPath.try_answer("ماشین 999 کجاست؟", AuthContext(access_token="t", user_id="u"))
+
+    assert answer is None
+    assert fast_path.stats.snapshot()["tool_failed"] == before + 1
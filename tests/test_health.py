@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+
+from app.api import health as health_api
+from app.core import health
+
+
+def _down():
+    raise ConnectionError("backend unreachable")
+
+
+@pytest.fixture
+def checker(monkeypatch):
+    checker = health.HealthChecker()
+    checker._probes = {"openai": lambda: None, "backend": _down, "geocoder": lambda: None}
+    checker._statuses = {name: health.DependencyStatus(name) for name in checker._probes}
+    monkeypatch.setattr(checker, "start", lambda: None)
+    monkeypatch.setattr(health, "checker", checker)
+    checker.check_all()
+    return checker
+
+
+def test_readiness_ignores_dependencies_by_default(checker):
+    ready, dependencies = checker.ready()
+    assert ready
+    assert dependencies["backend"]["status"] == health.DOWN
+
+
+def test_readiness_counts_opted_in_dependencies(checker, monkeypatch):
+    monkeypatch.setattr(health.settings, "health_ready_dependencies", ["backend"])
+    assert checker.ready()[0] is False
+    monkeypatch.setattr(health.settings, "health_ready_dependencies", ["openai"])
+    assert checker.ready()[0] is True
+
+
+def test_health_is_degraded_when_any_dependency_is_down(checker):
+    assert checker.healthy()[0] is False
+    response = asyncio.run(health_api.health_check())
+    assert response.status == "degraded"
@@ -0,0 +1,83 @@
+import random
+from datetime import date
+
+import jdatetime
+import pytest
+
+from app.core import jalali
+
+YEARS = range(jalali.MIN_YEAR, jalali.MAX_YEAR + 1)
+
+
+def _reference(g: date):
+    j = jdatetime.date.fromgregorian(date=g)
+    return j.year, j.month, j.day
+
+
+def _assert_both_ways(ordinal: int):
+    g = date.fromordinal(ordinal)
+    expected = _reference(g)
+    assert jalali.gregorian_to_jalali(g) == expected, g
+    assert jalali.jalali_to_gregorian(*expected) == g, expected
+
+
+def test_sampled_days_match_jdatetime():
+    rng = random.Random(0)
+    for ordinal in rng.sample(range(jalali.MIN_ORDINAL, jalali.MAX_ORDINAL + 1), 5000):
+        _assert_both_ways(ordinal)
+
+
+def test_year_boundaries_match_jdatetime():
+    """Last day of Esfand and 1 Farvardin of every year — where a wrong leap year shows up."""
+    for year in YEARS:
+        first = jdatetime.date(year, 1, 1).togregorian().toordinal()
+        _assert_both_ways(first)
+        if year > jalali.MIN_YEAR:
+            _assert_both_ways(first - 1)
+
+
+def test_leap_years_match_jdatetime():
+    for year in YEARS:
+        assert jalali.is_leap(year) == jdatetime.date(year, 1, 1).isleap(), year
+        assert jalali.month_length(year, 12) == (30 if jalali.is_leap(year) else 29)
+
+
+def test_month_boundaries_match_jdatetime():
+    for year in (jalali.MIN_YEAR, 1403, 1404, 1405, jalali.MAX_YEAR):
+        for month in range(1, 13):
+            _assert_both_ways(jdatetime.date(year, month, 1).togregorian().toordinal())
+            last = jalali.month_length(year, month)
+            _assert_both_ways(jdatetime.date(year, month, last).togregorian().toordinal())
+
+
+def test_table_edges():
+    assert jalali.ordinal_to_jalali(jalali.MIN_ORDINAL) == (jalali.MIN_YEAR, 1, 1)
+    assert jalali.ordinal_to_jalali(jalali.MAX_ORDINAL) == _reference(date.fromordinal(jalali.MAX_ORDINAL))
+    assert jalali.ordinal_to_jalali(jalali.MAX_ORDINAL)[:2] == (jalali.MAX_YEAR, 12)
+    with pytest.raises(ValueError):
+        jalali.ordinal_to_jalali(jalali.MIN_ORDINAL - 1)
+    with pytest.raises(ValueError):
+        jalali.ordinal_to_jalali(jalali.MAX_ORDINAL + 1)
+    with pytest.raises(ValueError):
+        jalali.jalali_to_gregorian(jalali.MIN_YEAR - 1, 12, 29)
+    with pytest.raises(ValueError):
+        jalali.jalali_to_gregorian(jalali.MAX_YEAR + 1, 1, 1)
+
+
+@pytest.mark.parametrize("year, month, day", [
+    (1404, 12, 30),   # not a leap year
+    (1403, 7, 31),
+    (1405, 13, 1),
+    (1405, 0, 10),
+    (1405, 1, 0),
+])
+def test_invalid_dates_are_rejected_like_jdatetime(year, month, day):
+    with pytest.raises(ValueError):
+        jdatetime.date(year, month, day)
+    with pytest.raises(ValueError):
+        jalali.jalali_to_gregorian(year, month, day)
+
+
+def test_format_jalali():
+    assert jalali.format_jalali(date(2026, 4, 30)) == "1405/02/10"
+    assert jalali.format_jalali(date(2026, 4, 30), sep="-") == "1405-02-10"
@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.llm import LLMClient
+
+
+def _response(usage):
+    message = SimpleNamespace(content="ماشین 211 در تبریز است.", tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def _client(response):
+    client = LLMClient()
+    create = lambda **kwargs: response   # noqa: E731
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return client
+
+
+@pytest.mark.parametrize("usage, tokens", [
+    (None, 0),
+    (SimpleNamespace(prompt_tokens=None, completion_tokens=None), 0),
+    (SimpleNamespace(prompt_tokens=120, completion_tokens=None), 120),
+    (SimpleNamespace(prompt_tokens=120, completion_tokens=30), 150),
+])
+def test_missing_usage_does_not_fail_the_completion(usage, tokens):
+    response = _response(usage)
+    client = _client(response)
+    assert client._create([{"role": "user", "content": "x"}], "gpt-4o-mini", "strong", "interactive", "auto") is response
+    assert client.tokens_used == tokens
@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+from app.core import load_shed
+from app.core.load_shed import AdaptiveLimiter, Overloaded
+
+
+@pytest.fixture
+def shed_settings(monkeypatch):
+    """smoothing=1 makes every update land exactly on the AIMD target."""
+    def configure(**overrides):
+        values = {
+            "load_shed_enabled": True,
+            "load_shed_initial_limit": 16,
+            "load_shed_min_limit": 4,
+            "load_shed_max_limit": 40,
+            "load_shed_max_queue": 10,
+            "load_shed_queue_timeout": 2.0,
+            "load_shed_tolerance": 1.0,
+            "load_shed_smoothing": 1.0,
+            "load_shed_backoff": 0.5,
+        }
+        values.update(overrides)
+        for name, value in values.items():
+            monkeypatch.setattr(load_shed.settings, name, value)
+        return AdaptiveLimiter()
+    return configure
+
+
+def _finish(limiter: AdaptiveLimiter, in_flight: int, timed_out: bool = False) -> None:
+    """One request finishes while `in_flight` requests (itself included) were running."""
+    limiter.in_flight = in_flight
+    limiter._release(timed_out)
+
+
+def _steady(limiter: AdaptiveLimiter, seconds: float = 0.2, calls: int = 10) -> None:
+    for _ in range(calls):
+        limiter.observe("backend", seconds)
+
+
+# ── limit updates ─────────────────────────────────────────────────────────────
+
+def test_additive_increase_while_the_limit_is_used(shed_settings):
+    limiter = shed_settings()
+    _steady(limiter)
+    _finish(limiter, in_flight=8)
+    assert limiter.limit == pytest.approx(16 + 4)       # + √16
+
+
+def test_no_increase_while_the_limit_is_mostly_idle(shed_settings):
+    limiter = shed_settings()
+    _steady(limiter)
+    _finish(limiter, in_flight=2)
+    assert limiter.limit == pytest.approx(16)
+
+
+def test_multiplicative_decrease_when_latency_rises(shed_settings):
+    limiter = shed_settings()
+    _steady(limiter, 0.2)
+    _steady(limiter, 1.0, calls=3)          # current latency >2× baseline → gradient clamps at 0.5
+    _finish(limiter, in_flight=2)
+    assert limiter.limit == pytest.approx(8)
+
+
+def test_latency_within_tolerance_keeps_the_limit(shed_settings):
+    limiter = shed_settings(load_shed_tolerance=2.0)
+    _steady(limiter, 0.2)
+    _steady(limiter, 0.3, calls=3)
+    _finish(limiter, in_flight=2)
+    assert limiter.limit == pytest.approx(16)
+
+
+def test_worst_signal_drives_the_limit(shed_settings):
+    limiter = shed_settings()
+    _steady(limiter, 0.2)
+    for _ in range(3):
+        limiter.observe("llm:fast", 1.0)
+        limiter.observe("llm:fast", 10.0)
+    _finish(limiter, in_flight=2)
+    assert limiter.limit < 16
+
+
+def test_multiplicative_decrease_on_timeout(shed_settings):
+    limiter = shed_settings()
+    _steady(limiter)
+    _finish(limiter, in_flight=8, timed_out=True)
+    assert limiter.limit == pytest.approx(8)             # × backoff, no additive probe
+
+
+def test_smoothing_blends_old_and_new_limit(shed_settings):
+    limiter = shed_settings(load_shed_smoothing=0.25)
+    _finish(limiter, in_flight=1, timed_out=True)
+    assert limiter.limit == pytest.approx(16 * 0.75 + 8 * 0.25)
+
+
+def test_limit_never_drops_below_min(shed_settings):
+    limiter = shed_settings()
+    for _ in range(10):
+        _finish(limiter, in_flight=1, timed_out=True)
+    assert limiter.limit == 4
+
+
+def test_limit_never_grows_above_max(shed_settings):
+    limiter = shed_settings()
+    _steady(limiter)
+    for _ in range(10):
+        _finish(limiter, in_flight=int(limiter.limit))
+    assert limiter.limit == 40
+
+
+# ── admission ─────────────────────────────────────────────────────────────────
+
+def test_queued_request_times_out(shed_settings):
+    limiter = shed_settings(load_shed_initial_limit=1, load_shed_min_limit=1, load_shed_queue_timeout=0.05)
+
+    async def scenario():
+        async with limiter.slot():
+            with pytest.raises(Overloaded) as exc:
+                async with limiter.slot():
+                    pass
+            assert exc.value.reason == "queue_timeout"
+            assert limiter.stats()["queued"] == 0
+
+    asyncio.run(scenario())
+    assert limiter.shed == 1
+    assert limiter.in_flight == 0
+
+
+def test_request_deadline_caps_the_queue_wait(shed_settings):
+    limiter = shed_settings(load_shed_initial_limit=1, load_shed_min_limit=1, load_shed_queue_timeout=30.0)
+
+    async def scenario():
+        async with limiter.slot():
+            with pytest.raises(Overloaded) as exc:
+                await asyncio.wait_for(limiter.slot(max_wait=0.05).__aenter__(), 5)
+            assert exc.value.reason == "queue_timeout"
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_immediately(shed_settings):
+    limiter = shed_settings(load_shed_initial_limit=1, load_shed_min_limit=1, load_shed_max_queue=0)
+
+    async def scenario():
+        async with limiter.slot():
+            with pytest.raises(Overloaded) as exc:
+                async with limiter.slot():
+                    pass
+            assert exc.value.reason == "queue_full"
+
+    asyncio.run(scenario())
+
+
+def test_released_slot_is_handed_to_the_queued_request(shed_settings):
+    limiter = shed_settings(load_shed_initial_limit=1, load_shed_min_limit=1, load_shed_max_limit=1)
+    order = []
+
+    async def hold(name, entered=None):
+        async with limiter.slot():
+            order.append(name)
+            if entered:
+                entered.set()
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        entered = asyncio.Event()
+        first = asyncio.create_task(hold("first", entered))
+        await entered.wait()
+        await asyncio.gather(first, hold("second"))
+
+    asyncio.run(scenario())
+    assert order == ["first", "second"]
+    assert limiter.in_flight == 0
+    assert limiter.shed == 0
@@ -0,0 +1,143 @@
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import chat
+from app.core import load_shed, rate_limit
+from app.core.rate_limit import RateLimited, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", fake)
+    return fake
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    def configure(rpm=60.0, burst=2, concurrent=0, quota=0, window=60.0):
+        for name, value in (
+            ("rate_limit_enabled", True),
+            ("rate_limit_requests_per_minute", rpm),
+            ("rate_limit_burst", burst),
+            ("rate_limit_max_concurrent", concurrent),
+            ("rate_limit_llm_tokens_per_window", quota),
+            ("rate_limit_token_window", window),
+        ):
+            monkeypatch.setattr(rate_limit.settings, name, value)
+    return configure
+
+
+def _admit(limiter, user="u1"):
+    with limiter.admit(user) as ticket:
+        return ticket
+
+
+def _rejected(limiter, user="u1") -> RateLimited:
+    with pytest.raises(RateLimited) as e:
+        _admit(limiter, user)
+    return e.value
+
+
+def test_burst_then_reject(clock, limits):
+    limits(rpm=60, burst=3)
+    limiter = RateLimiter()
+    for _ in range(3):
+        _admit(limiter)
+    e = _rejected(limiter)
+    assert e.reason == "requests"
+    assert e.retry_after == pytest.approx(1.0)
+    _admit(limiter, user="u2")      # other users have their own bucket
+
+
+def test_refill_at_the_sustained_rate(clock, limits):
+    limits(rpm=60, burst=2)
+    limiter = RateLimiter()
+    _admit(limiter)
+    _admit(limiter)
+    clock.advance(0.5)
+    assert _rejected(limiter).retry_after == pytest.approx(0.5)
+    clock.advance(0.5)
+    _admit(limiter)
+    _rejected(limiter)
+
+
+def test_refill_is_capped_at_burst(clock, limits):
+    limits(rpm=60, burst=2)
+    limiter = RateLimiter()
+    clock.advance(3600)
+    _admit(limiter)
+    _admit(limiter)
+    _rejected(limiter)
+
+
+def test_concurrency_slot_is_released_on_exception(clock, limits):
+    limits(rpm=0, concurrent=1)
+    limiter = RateLimiter()
+    with limiter.admit("u1"):
+        assert _rejected(limiter).reason == "concurrency"
+    with pytest.raises(RuntimeError):
+        with limiter.admit("u1"):
+            raise RuntimeError("LLM failed")
+    assert limiter.stats()["in_flight"] == 0
+    _admit(limiter)
+
+
+def test_llm_token_quota_rolls_over_with_the_window(clock, limits):
+    limits(rpm=0, quota=1000, window=60)
+    limiter = RateLimiter()
+    with limiter.admit("u1") as ticket:
+        ticket.charge_tokens(1000)
+    clock.advance(20)
+    e = _rejected(limiter)
+    assert e.reason == "llm_tokens"
+    assert e.retry_after == pytest.approx(40)
+    clock.advance(40)
+    with limiter.admit("u1") as ticket:
+        ticket.charge_tokens(999)
+    _admit(limiter)
+
+
+def test_refund_returns_the_bucket_token_once(clock, limits):
+    limits(rpm=60, burst=1)
+    limiter = RateLimiter()
+    with limiter.admit("u1") as ticket:
+        ticket.refund()
+        ticket.refund()
+    _admit(limiter)
+    _rejected(limiter)
+
+
+def test_shed_request_gets_its_token_back(clock, limits, monkeypatch):
+    limits(rpm=60, burst=1)
+    limiter = RateLimiter()
+    monkeypatch.setattr(rate_limit, "limiter", limiter)
+
+    @asynccontextmanager
+    async def shed(max_wait=None):
+        raise load_shed.Overloaded("queue_full")
+        yield
+
+    monkeypatch.setattr(load_shed.limiter, "slot", shed)
+    app = FastAPI()
+    app.include_router(chat.router)
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer t", "X-User-Id": "u1"}
+    for _ in range(2):
+        response = client.post("/chat", json={"message": "ماشین 211 کجاست؟"}, headers=headers)
+        assert response.status_code == 503
+    _admit(limiter)
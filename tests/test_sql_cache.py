@@ -0,0 +1,36 @@
+import pytest
+
+from app.core import sql_cache
+
+
+def _same_key(a, b):
+    return sql_cache.make_key(a)[0] == sql_cache.make_key(b)[0]
+
+
+@pytest.mark.parametrize("a, b", [
+    ("SELECT * FROM t WHERE b = 2 AND a = 1", "select *\n  from t where a=1 and b=2;"),
+    ("SELECT * FROM t WHERE id IN (3, 1, 2)", "SELECT * FROM t WHERE id IN (1, 2, 3)"),
+    ("SELECT * FROM t WHERE x BETWEEN 1 AND 5 AND a = 1", "SELECT * FROM t WHERE a = 1 AND x BETWEEN 1 AND 5"),
+    ("SELECT * FROM t WHERE x = E'A\\'b'", "SELECT * FROM t WHERE x = e'A\\'b'"),
+])
+def test_equivalent_spellings_share_a_key(a, b):
+    assert _same_key(a, b)
+
+
+@pytest.mark.parametrize("a, b", [
+    # AND inside CASE ... END is not a top-level term
+    ("SELECT * FROM t WHERE CASE WHEN a=1 AND b=1 THEN 1 ELSE 0 END = 0 AND CASE WHEN c=1 AND d=1 THEN 1 ELSE 0 END = 1",
+     "SELECT * FROM t WHERE CASE WHEN a=1 AND d=1 THEN 1 ELSE 0 END = 1 AND CASE WHEN c=1 AND b=1 THEN 1 ELSE 0 END = 0"),
+    # dollar-quoted and E'...' literals keep their case
+    ("SELECT $$ABC$$", "SELECT $$abc$$"),
+    ("SELECT $fn$ABC$fn$", "SELECT $fn$abc$fn$"),
+    ("SELECT * FROM t WHERE x = E'ABC'", "SELECT * FROM t WHERE x = E'abc'"),
+    ("SELECT * FROM t WHERE x = 'ABC'", "SELECT * FROM t WHERE x = 'abc'"),
+])
+def test_different_queries_do_not_collide(a, b):
+    assert not _same_key(a, b)
+
+
+def test_dollar_quoted_body_is_one_token():
+    assert sql_cache.normalize("SELECT $q$ a AND b -- x $q$ FROM T") == "select $q$ a AND b -- x $q$ from t"
+    assert sql_cache.tables("SELECT * FROM a WHERE x = $$ from b $$") == ["a"]
@@ -0,0 +1,105 @@
+import json
+from types import SimpleNamespace
+
+from app.core.fast_path import FastPath
+from app.core.llm import LLMClient
+from app.core.tool_memo import ToolMemo
+from app.schema.Auth import AuthContext
+
+AUTH = AuthContext(access_token="test-token", user_id="tool-memo-test")
+ARGS = {"action": "get_unit_location", "unit_id": "211", "explanation": "x"}
+OK = {"success": True, "data": {"lat": 38.08, "lng": 46.29}}
+FAILED = {"success": False, "error": "درخواست با timeout مواجه شد."}
+
+
+# ── ToolMemo ──────────────────────────────────────────────────────────────────
+
+def test_key_ignores_explanation_digits_and_empty_values():
+    a = ToolMemo.key("call_backend_api", {"action": "get_unit_location", "unit_id": "۲۱۱", "explanation": "a"})
+    b = ToolMemo.key("call_backend_api", {"unit_id": "211", "action": "get_unit_location", "filters": {}})
+    assert a == b
+
+
+def test_successful_result_is_memoized():
+    memo = ToolMemo()
+    key = memo.key("call_backend_api", ARGS)
+    memo.put(key, OK)
+    assert memo.get(key) is OK
+    assert memo.hits == 1
+
+
+def test_failed_result_is_not_memoized():
+    memo = ToolMemo()
+    key = memo.key("call_backend_api", ARGS)
+    memo.put(key, FAILED)
+    memo.put(key, {"error": "Unknown tool: x"})
+    assert memo.get(key) is None
+    assert memo.hits == 0
+
+
+def test_round_with_a_new_call_is_not_a_loop():
+    memo = ToolMemo()
+    assert memo.end_round(["a"], new_calls=1) is None
+    assert memo.end_round(["a"], new_calls=1) is None     # the retry of a failed call ran again
+
+
+def test_repeat_and_cycle_when_everything_came_from_the_memo():
+    memo = ToolMemo()
+    assert memo.end_round(["a"], new_calls=1) is None
+    assert memo.end_round(["a"], new_calls=0) == "repeat"
+    assert memo.end_round(["b"], new_calls=1) is None
+    assert memo.end_round(["a"], new_calls=0) == "cycle"
+
+
+# ── tool loop ─────────────────────────────────────────────────────────────────
+
+def _tool_response(call_id):
+    call = SimpleNamespace(
+        id=call_id, type="function",
+        function=SimpleNamespace(name="call_backend_api", arguments=json.dumps(ARGS)),
+    )
+    message = SimpleNamespace(content=None, tool_calls=[call], role="assistant")
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def _text_response(text):
+    message = SimpleNamespace(content=text, tool_calls=None, role="assistant")
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def _client(monkeypatch, responses, results):
+    monkeypatch.setattr(FastPath, "try_answer", staticmethod(lambda message, auth_context: None))
+    client = LLMClient()
+    create = lambda **kwargs: responses.pop(0)   # noqa: E731
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    executed = []
+
+    def execute(function_name, arguments, auth_context):
+        executed.append(arguments)
+        return results.pop(0)
+
+    client._execute_tool = execute
+    return client, executed
+
+
+def test_retry_after_a_failed_call_reaches_the_backend(monkeypatch):
+    responses = [_tool_response("c1"), _tool_response("c2"), _text_response("ماشین 211 در تبریز است.")]
+    client, executed = _client(monkeypatch, responses, [FAILED, OK])
+
+    answer, tool_calls = client._chat("ماشین 211 الان کجاست؟", AUTH, None)
+
+    assert answer == "ماشین 211 در تبریز است."
+    assert len(executed) == 2
+    assert [call.result for call in tool_calls] == [FAILED, OK]
+    assert client.llm_calls == 3      # no loop stop: the retry asked for something new
+
+
+def test_repeat_of_a_successful_call_stops_the_loop(monkeypatch):
+    responses = [_tool_response("c1"), _tool_response("c2"), _text_response("ماشین 211 در تبریز است.")]
+    client, executed = _client(monkeypatch, responses, [OK])
+
+    answer, tool_calls = client._chat("ماشین 211 الان کجاست؟", AUTH, None)
+
+    assert answer == "ماشین 211 در تبریز است."
+    assert len(executed) == 1
+    assert len(tool_calls) == 1
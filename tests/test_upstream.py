@@ -0,0 +1,227 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from app.core import deadline, upstream
+from app.core.deadline import Deadline
+from app.core.upstream import CircuitBreaker, DeadlineExceeded, RetryBudget, SingleFlight
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(upstream.time, "monotonic", fake)
+    return fake
+
+
+def _breaker(threshold: int = 3, reset: float = 30.0) -> CircuitBreaker:
+    return CircuitBreaker("test/endpoint", failure_threshold=threshold, reset_timeout=reset)
+
+
+# ── CircuitBreaker ────────────────────────────────────────────────────────────
+
+def test_breaker_opens_after_threshold_consecutive_failures(clock):
+    breaker = _breaker(threshold=3)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_success_resets_the_failure_count(clock):
+    breaker = _breaker(threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.snapshot() == {"state": CircuitBreaker.CLOSED, "consecutive_failures": 2}
+
+
+def test_breaker_stays_open_until_reset_timeout(clock):
+    breaker = _breaker(threshold=1, reset=30.0)
+    breaker.record_failure()
+    clock.advance(29.9)
+    assert not breaker.allow()
+    assert breaker.snapshot()["retry_in_s"] == pytest.approx(0.1, abs=0.05)
+
+
+def test_half_open_lets_exactly_one_probe_through(clock):
+    breaker = _breaker(threshold=1, reset=30.0)
+    breaker.record_failure()
+    clock.advance(30.0)
+    assert breaker.allow()
+    assert breaker.snapshot()["state"] == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes_the_breaker(clock):
+    breaker = _breaker(threshold=1, reset=30.0)
+    breaker.record_failure()
+    clock.advance(30.0)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.snapshot() == {"state": CircuitBreaker.CLOSED, "consecutive_failures": 0}
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_probe_reopens_for_a_full_reset_timeout(clock):
+    breaker = _breaker(threshold=3, reset=30.0)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.advance(30.0)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.snapshot()["state"] == CircuitBreaker.OPEN
+    clock.advance(29.0)
+    assert not breaker.allow()
+    clock.advance(1.0)
+    assert breaker.allow()
+
+
+def test_neutral_probe_frees_the_probe_slot_without_closing(clock):
+    breaker = _breaker(threshold=1, reset=30.0)
+    breaker.record_failure()
+    clock.advance(30.0)
+    assert breaker.allow()
+    breaker.record_neutral()
+    assert breaker.snapshot()["state"] == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+# ── RetryBudget ───────────────────────────────────────────────────────────────
+
+def test_retry_budget_starts_full_and_runs_out():
+    budget = RetryBudget(ratio=0.1, max_tokens=3.0)
+    assert [budget.try_withdraw() for _ in range(4)] == [True, True, True, False]
+    assert budget.stats() == {"tokens": 0.0, "retries": 3, "exhausted": 1}
+
+
+def test_retry_budget_refills_by_ratio_per_request():
+    budget = RetryBudget(ratio=0.25, max_tokens=1.0)
+    assert budget.try_withdraw()
+    for _ in range(3):
+        budget.deposit()
+    assert not budget.try_withdraw()    # 0.75 tokens
+    budget.deposit()
+    assert budget.try_withdraw()        # 1.0 token
+
+
+def test_retry_budget_is_capped_at_max_tokens():
+    budget = RetryBudget(ratio=1.0, max_tokens=2.0)
+    for _ in range(10):
+        budget.deposit()
+    assert budget.stats()["tokens"] == 2.0
+    assert [budget.try_withdraw() for _ in range(3)] == [True, True, False]
+
+
+# ── SingleFlight ──────────────────────────────────────────────────────────────
+
+def _run(target, budget):
+    out = {}
+
+    def worker():
+        with deadline.activate(Deadline(budget) if budget else None):
+            try:
+                out["result"] = target()
+            except Exception as e:
+                out["error"] = e
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    return thread, out
+
+
+def test_waiter_retries_when_the_leader_runs_out_of_its_own_budget():
+    flight = SingleFlight()
+    leader_started = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(threading.current_thread().name)
+        if len(calls) == 1:
+            leader_started.set()
+            time.sleep(0.1)
+            raise DeadlineExceeded("leader budget spent")
+        return "fresh"
+
+    leader, leader_out = _run(lambda: flight.do("k", fn), budget=0.05)
+    leader_started.wait(1)
+    waiter, waiter_out = _run(lambda: flight.do("k", fn), budget=5)
+    leader.join()
+    waiter.join()
+
+    assert isinstance(leader_out["error"], DeadlineExceeded)
+    assert waiter_out == {"result": "fresh"}
+    assert len(calls) == 2
+    assert flight.stats()["retried"] == 1
+
+
+def test_waiter_still_shares_real_upstream_errors():
+    flight = SingleFlight()
+    leader_started = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        leader_started.set()
+        time.sleep(0.1)
+        raise requests.exceptions.ConnectionError("backend down")
+
+    leader, _ = _run(lambda: flight.do("k", fn), budget=None)
+    leader_started.wait(1)
+    waiter, waiter_out = _run(lambda: flight.do("k", fn), budget=None)
+    leader.join()
+    waiter.join()
+
+    assert isinstance(waiter_out["error"], requests.exceptions.ConnectionError)
+    assert len(calls) == 1
+
+
+class _SlowHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(0.6)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/slow"
+    server.shutdown()
+
+
+def test_short_leader_budget_does_not_fail_a_coalesced_waiter(slow_server):
+    get = lambda: upstream.get(slow_server, params={"unit": "211"}, timeout=10)   # noqa: E731
+    leader, leader_out = _run(get, budget=0.3)
+    time.sleep(0.05)
+    waiter, waiter_out = _run(get, budget=5)
+    leader.join()
+    waiter.join()
+
+    assert isinstance(leader_out["error"], DeadlineExceeded)
+    assert waiter_out["result"].status_code == 200